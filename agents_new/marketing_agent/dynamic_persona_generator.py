@@ -23,9 +23,9 @@ import os
 
 # GeminiClient import (utils에서 가져오기)
 try:
-    # agents_new/utils/gemini_client.py에서 import
-    sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
-    from gemini_client import GeminiClient
+    # agents_new/utils/gemini_client.py에서 import (run_analysis 등과 같은 패키지 경로로 → 설정/연결 풀 공유)
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from agents_new.utils.gemini_client import GeminiClient
 except ImportError:
     # Fallback: 간단한 로컬 구현
     import aiohttp
@@ -341,7 +341,7 @@ class DynamicPersonaGenerator:
                 }
             ]
             
-            response = self.gemini_client.chat_completion_json(
+            response = await self.gemini_client.achat_completion_json(
                 messages=messages,
                 temperature=0.7,
                 model="gemini-2.5-flash"
@@ -525,7 +525,7 @@ class DynamicPersonaGenerator:
                 }
             ]
             
-            response = self.gemini_client.chat_completion(
+            response = await self.gemini_client.achat_completion(
                 messages=messages,
                 temperature=0.8,
                 model="gemini-2.5-flash"
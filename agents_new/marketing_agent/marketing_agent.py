@@ -893,7 +893,7 @@ class MarketingAgent:
             """
             
             messages = [{"role": "user", "content": sns_prompt}]
-            response = gemini_client.chat_completion(
+            response = await gemini_client.achat_completion(
                 messages=messages,
                 temperature=0.8,
                 model="gemini-2.5-flash"
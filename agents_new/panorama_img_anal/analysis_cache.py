@@ -0,0 +1,154 @@
+"""
+파노라마 이미지 분석 결과 캐시 (내용 주소 방식)
+- 키: 이미지 파일 해시 + 섹션(인코딩 설정 포함) + 프롬프트 해시 + 모델 + temperature
+- 값: 파싱된 JSON 분석 결과 (오류 결과는 저장하지 않음)
+- 오래된 항목(마지막 사용 기준)과 용량 초과분(LRU)은 자동 삭제
+- 인접 매장의 300m 버퍼가 같은 이미지를 공유하므로 두 번째 매장부터는 모델 호출 없이 재사용
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".cache" / "image_analysis.sqlite"
+DEFAULT_MAX_MB = 200
+DEFAULT_MAX_AGE_DAYS = 90
+EVICT_EVERY_PUTS = 50
+HASH_CHUNK = 1 << 20
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def analysis_key(image_hash: str, section: str, prompt: str, model: str, temperature: float) -> str:
+    """캐시 키 (sha256)"""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    material = json.dumps([CACHE_VERSION, image_hash, section, prompt_hash, model, float(temperature)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ImageAnalysisCache:
+    """SQLite 기반 분석 결과 캐시 (스레드 안전 - 호출마다 연결)"""
+
+    def __init__(self, path: Optional[Path] = None,
+                 max_bytes: Optional[int] = None,
+                 max_age_sec: Optional[float] = None):
+        self.path = Path(path or os.getenv('PANORAMA_CACHE_PATH') or DEFAULT_CACHE_PATH)
+        self.max_bytes = int(max_bytes if max_bytes is not None
+                             else _env_float('PANORAMA_CACHE_MAX_MB', DEFAULT_MAX_MB) * 1024 * 1024)
+        self.max_age_sec = (max_age_sec if max_age_sec is not None
+                            else _env_float('PANORAMA_CACHE_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS) * 24 * 3600)
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " key TEXT PRIMARY KEY,"
+                " image_hash TEXT NOT NULL,"
+                " section TEXT,"
+                " model TEXT,"
+                " result TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+        self.evict()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def image_hash(self, image_path: str) -> str:
+        """이미지 파일 sha256 (경로+mtime+크기가 같으면 프로세스 안에서 재사용)"""
+        st = os.stat(image_path)
+        stat_key = (str(image_path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._hashes.get(stat_key)
+        if cached:
+            return cached
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self._hashes[stat_key] = value
+        return value
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """캐시 조회 (적중 시 마지막 사용 시각 갱신)"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT result, last_used FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_sec:
+                conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, image_hash: str, section: str, model: str, result: Dict[str, Any]):
+        """분석 결과 저장"""
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, image_hash, section, model, result, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, image_hash, section, model, payload, len(payload.encode('utf-8')), now, now),
+            )
+        with self._lock:
+            self._puts += 1
+            evict_now = self._puts % EVICT_EVERY_PUTS == 0
+        if evict_now:
+            self.evict()
+
+    def evict(self) -> int:
+        """오래된 항목 삭제 후, 용량 초과 시 마지막 사용이 오래된 순으로 삭제 → 삭제 건수"""
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM analyses WHERE last_used < ?",
+                                   (time.time() - self.max_age_sec,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM analyses ORDER BY last_used"):
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM analyses WHERE key = ?", victims)
+                removed += len(victims)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes, "path": str(self.path)}
+
+
+_cache: Optional[ImageAnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> ImageAnalysisCache:
+    """프로세스 공용 캐시 (최초 호출 시 생성)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageAnalysisCache()
+        return _cache
@@ -8,8 +8,6 @@
 
 import os
 import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point, Polygon
 import base64
 from openai import OpenAI
 import json
@@ -23,11 +21,39 @@ import numpy as np
 from typing import List, Dict, Optional
 import folium
 from folium import plugins
-import shutil
 import warnings
 import time
+import sys
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 warnings.filterwarnings('ignore')
 
+# 개별 이미지 분석 동시 호출 수 기본값 (PANORAMA_CONCURRENCY로 조정)
+DEFAULT_IMAGE_CONCURRENCY = 5
+
+# 개별 이미지 분석 설정 (분석 캐시 키에 포함)
+IMAGE_MODEL = "gemini-2.5-flash"
+IMAGE_TEMPERATURE = 0.3
+IMAGE_SECTION = 'front'
+IMAGE_QUALITY = 80
+IMAGE_MAX_DIM = 1024
+
+# 공용 지오코딩 (agents_new/utils/geocoding.py - spatial_matcher와 캐시 공유)
+sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
+from geocoding import geocode, kakao_provider, nominatim_provider
+from offline_geocoder import offline_provider
+from artifact_store import link_file
+from instrumentation import span, record_usage, traced
+
+try:
+    from .pano_index import get_panorama_index
+    from .analysis_cache import analysis_key, get_analysis_cache
+    from .tile_store import get_tile_store
+except ImportError:
+    from pano_index import get_panorama_index
+    from analysis_cache import analysis_key, get_analysis_cache
+    from tile_store import get_tile_store
+
 
 def init_openai_client():
     """Gemini OpenAI 호환 API 클라이언트 초기화"""
@@ -51,16 +77,16 @@ def init_openai_client():
     
     print(f"[Panorama] Using API key: {api_key[:20]}...")
     
-    # Gemini OpenAI 호환 API 사용
+    # Gemini OpenAI 호환 API 사용 (GEMINI_BASE_URL로 로컬 스텁 서버 등으로 교체 가능)
     return OpenAI(
         api_key=api_key,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+        base_url=os.getenv('GEMINI_BASE_URL') or "https://generativelanguage.googleapis.com/v1beta/openai/"
     )
 
 
 def address_to_coordinates(address: str) -> tuple:
     """
-    주소를 좌표로 변환 (Kakao API 사용)
+    주소를 좌표로 변환 (오프라인 색인 → Kakao API → Nominatim, 공용 지오코딩 캐시 경유)
     
     Parameters:
     -----------
@@ -71,40 +97,22 @@ def address_to_coordinates(address: str) -> tuple:
     --------
     tuple : (longitude, latitude)
     """
-    from geopy.geocoders import Nominatim
-    import requests
-    
     load_dotenv()
     kakao_key = os.getenv('KAKAO_REST_API_KEY')
     
-    # Kakao API 사용 (더 정확함)
+    # 로컬 주소 색인 우선, 없으면 Kakao API (더 정확함), 실패 시 Nominatim (무료, 느림)
+    providers = [("offline", offline_provider())]
     if kakao_key:
-        url = 'https://dapi.kakao.com/v2/local/search/address.json'
-        headers = {'Authorization': f'KakaoAK {kakao_key}'}
-        params = {'query': address}
-        try:
-            # Add sane timeouts to avoid hanging on network issues
-            response = requests.get(url, headers=headers, params=params, timeout=(5, 15))
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('documents'):
-                    doc = result['documents'][0]
-                    lon = float(doc['x'])
-                    lat = float(doc['y'])
-                    print(f"[OK] Kakao API: {address} -> ({lat:.6f}, {lon:.6f})")
-                    return lon, lat
-        except requests.RequestException as e:
-            print(f"[WARN] Kakao API 요청 실패: {e}")
-    
-    # Fallback: Nominatim (무료, 느림)
-    print("[INFO] Kakao API 미사용/실패로 Nominatim 사용 (느릴 수 있음)")
-    geolocator = Nominatim(user_agent="street_analyzer")
-    # Nominatim can be slow; provide a timeout
-    location = geolocator.geocode(address, timeout=15)
-    
-    if location:
-        print(f"[OK] Nominatim: {address} -> ({location.latitude:.6f}, {location.longitude:.6f})")
-        return location.longitude, location.latitude
+        providers.append(("kakao", kakao_provider(kakao_key)))
+    else:
+        print("[INFO] Kakao API 미사용으로 Nominatim 사용 (느릴 수 있음)")
+    providers.append(("nominatim", nominatim_provider()))
+    
+    coords = geocode(address, providers)
+    if coords:
+        lat, lon = coords
+        print(f"[OK] {address} -> ({lat:.6f}, {lon:.6f})")
+        return lon, lat
     else:
         raise ValueError(f"[ERROR] 주소를 찾을 수 없습니다: {address}")
 
@@ -132,64 +140,11 @@ def find_images_in_buffer(center_lon: float,
         
     Returns:
     --------
-    List[Dict] : 버퍼 내 이미지 정보 리스트
+    List[Dict] : 버퍼 내 이미지 정보 리스트 (거리순)
     """
-    # CSV 로드
-    df = pd.read_csv(data_csv_path)
-    
-    # GeoDataFrame 생성
-    geometry = [Point(xy) for xy in zip(df['pano_lon'], df['pano_lat'])]
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
-    
-    # UTM으로 투영 (미터 단위 계산을 위해)
-    gdf_utm = gdf.to_crs('EPSG:5179')  # 한국 중부 원점 (성동구 적합)
-    
-    # 중심점 생성 및 투영
-    center_point = gpd.GeoDataFrame(
-        [{'geometry': Point(center_lon, center_lat)}],
-        crs='EPSG:4326'
-    ).to_crs('EPSG:5179')
-    
-    # 버퍼 생성
-    buffer = center_point.geometry.buffer(buffer_meters)
-    
-    # 버퍼 내 점들 필터링
-    within_buffer_utm = gdf_utm[gdf_utm.geometry.within(buffer.iloc[0])].copy()
-    
-    # 중심점으로부터의 거리 계산 (UTM 좌표계에서 미터 단위로)
-    within_buffer_utm['distance_m'] = within_buffer_utm.geometry.distance(
-        center_point.geometry.iloc[0]
-    )
-    
-    # 다시 WGS84로 변환 (거리는 이미 계산됨)
-    within_buffer = within_buffer_utm.to_crs('EPSG:4326')
-    
-    # 이미지 정보 수집
-    images_info = []
-    image_folder_path = Path(image_folder)
-    
-    for idx, row in within_buffer.iterrows():
-        point_id = row['point_ID']
-        pano_id = row['pano_id']
-        
-        # 이미지 파일 경로
-        image_filename = f"point_{point_id}_pano_{pano_id}.jpg"
-        image_path = image_folder_path / image_filename
-        
-        if image_path.exists():
-            images_info.append({
-                'point_id': int(point_id),
-                'pano_id': pano_id,
-                'lon': float(row['pano_lon']),
-                'lat': float(row['pano_lat']),
-                'distance_m': float(row['distance_m']),
-                'image_path': str(image_path)
-            })
-    
-    # 거리순 정렬
-    images_info.sort(key=lambda x: x['distance_m'])
-    
-    return images_info
+    # 색인(투영 좌표 + KD-tree + 이미지 존재 여부)은 CSV/폴더가 바뀔 때만 재구성
+    index = get_panorama_index(data_csv_path, image_folder)
+    return index.query(center_lon, center_lat, buffer_meters)
 
 
 def extract_panorama_section(image_path: str, section: str = 'front') -> Image.Image:
@@ -235,12 +190,17 @@ def _downscale_if_needed(pil_image: Image.Image, max_dim: int = 1024) -> Image.I
     return img
 
 
-def encode_image_pil(pil_image: Image.Image, quality: int = 80, max_dim: int = 1024) -> str:
-    """PIL 이미지를 base64로 인코딩 (크기 제한 및 품질 조정 포함)"""
+def encode_image_jpeg(pil_image: Image.Image, quality: int = 80, max_dim: int = 1024) -> bytes:
+    """PIL 이미지를 JPEG 바이트로 인코딩 (크기 제한 및 품질 조정 포함)"""
     img = _downscale_if_needed(pil_image, max_dim=max_dim)
     buffer = io.BytesIO()
     img.save(buffer, format='JPEG', quality=quality)
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return buffer.getvalue()
+
+
+def encode_image_pil(pil_image: Image.Image, quality: int = 80, max_dim: int = 1024) -> str:
+    """PIL 이미지를 base64로 인코딩 (크기 제한 및 품질 조정 포함)"""
+    return base64.b64encode(encode_image_jpeg(pil_image, quality=quality, max_dim=max_dim)).decode('utf-8')
 
 
 def get_individual_analysis_prompt() -> str:
@@ -430,7 +390,10 @@ def _chat_with_retry(client: OpenAI, *, messages, model: str = "gemini-2.5-flash
             }
             if timeout is not None:
                 kwargs["timeout"] = timeout
-            return client.chat.completions.create(**kwargs)
+            with span("gemini.chat", "llm", model=model, attempt=attempt) as current:
+                response = client.chat.completions.create(**kwargs)
+                record_usage(current, response)
+            return response
         except Exception as e:
             last_err = e
             wait = backoff_base ** attempt + (0.1 * attempt)
@@ -445,8 +408,9 @@ def _chat_with_retry(client: OpenAI, *, messages, model: str = "gemini-2.5-flash
 
 def analyze_image_with_gpt(client: OpenAI, 
                            image_path: str, 
-                           prompt: str) -> Dict:
-    """Gemini 2.5 Flash로 단일 이미지 분석"""
+                           prompt: str,
+                           use_cache: bool = True) -> Dict:
+    """Gemini 2.5 Flash로 단일 이미지 분석 (같은 이미지·프롬프트·모델 설정이면 캐시 재사용)"""
     # 시뮬레이션 모드 (테스트/네트워크 문제 방지)
     if os.getenv("SIMULATE_OPENAI", "0") == "1":
         return {
@@ -454,9 +418,30 @@ def analyze_image_with_gpt(client: OpenAI,
             "visit_summary": {"location_headline": "시뮬레이션 응답", "overall_impression_prose": "테스트용 더미 응답"},
         }
 
-    # 이미지 추출 및 인코딩
-    extracted_image = extract_panorama_section(image_path, 'front')
-    base64_image = encode_image_pil(extracted_image, quality=80, max_dim=1024)
+    # 분석 캐시 조회 (이미지 내용 기준이라 다른 매장 버퍼에서 같은 이미지가 나와도 적중)
+    cache = cache_key = image_hash = None
+    section = f"{IMAGE_SECTION}@{IMAGE_MAX_DIM}q{IMAGE_QUALITY}"
+    if use_cache:
+        try:
+            cache = get_analysis_cache()
+            image_hash = cache.image_hash(image_path)
+            cache_key = analysis_key(image_hash, section, prompt, IMAGE_MODEL, IMAGE_TEMPERATURE)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print("      [캐시] 이전 분석 결과 재사용 (모델 호출 생략)")
+                return cached
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"      [WARN] 분석 캐시 사용 불가: {e}")
+            cache = None
+
+    # 이미지 추출 및 인코딩 (타일 저장소에 미리 인코딩된 섹션이 있으면 디코딩 없이 사용)
+    tile = get_tile_store(str(Path(image_path).parent), IMAGE_SECTION,
+                          IMAGE_QUALITY, IMAGE_MAX_DIM).get(image_path)
+    if tile is not None:
+        base64_image = base64.b64encode(tile).decode('utf-8')
+    else:
+        extracted_image = extract_panorama_section(image_path, IMAGE_SECTION)
+        base64_image = encode_image_pil(extracted_image, quality=IMAGE_QUALITY, max_dim=IMAGE_MAX_DIM)
 
     # 환경설정 기반 타임아웃과 재시도 설정 (기본: 타임아웃 없음)
     load_dotenv()
@@ -488,8 +473,8 @@ def analyze_image_with_gpt(client: OpenAI,
                 ],
             }
         ],
-        model="gemini-2.5-flash",
-        temperature=0.3,
+        model=IMAGE_MODEL,
+        temperature=IMAGE_TEMPERATURE,
         timeout=timeout_s,
         max_retries=max_retries,
     )
@@ -516,7 +501,7 @@ def analyze_image_with_gpt(client: OpenAI,
         else:
             json_str = result_text.strip()
         
-        return json.loads(json_str)
+        analysis = json.loads(json_str)
     except Exception as e:
         print(f"[ERROR] JSON 파싱 오류: {e}")
         print(f"[DEBUG] 응답 미리보기 (처음 200자): {result_text[:200]}")
@@ -525,6 +510,58 @@ def analyze_image_with_gpt(client: OpenAI,
             "raw_response": result_text,
             "description": "이미지 분석 실패 (JSON 파싱 오류)"
         }
+    
+    # 정상 분석만 캐시에 저장 (빈 응답/파싱 오류는 다음 실행에서 재시도)
+    if cache is not None and isinstance(analysis, dict) and "error" not in analysis:
+        try:
+            cache.put(cache_key, image_hash, section, IMAGE_MODEL, analysis)
+        except sqlite3.Error as e:
+            print(f"      [WARN] 분석 캐시 저장 실패: {e}")
+    return analysis
+
+
+def _resolve_image_concurrency(max_concurrency: Optional[int]) -> int:
+    if max_concurrency is None:
+        try:
+            max_concurrency = int(os.getenv("PANORAMA_CONCURRENCY", str(DEFAULT_IMAGE_CONCURRENCY)))
+        except ValueError:
+            max_concurrency = DEFAULT_IMAGE_CONCURRENCY
+    return max(1, max_concurrency)
+
+
+def analyze_images_concurrently(client: OpenAI,
+                                images_info: List[Dict],
+                                prompt: str,
+                                max_concurrency: Optional[int] = None) -> List[Dict]:
+    """
+    여러 이미지를 동시에 분석 (스레드 풀, 입력 순서대로 결과 반환)
+    
+    이미지별 오류는 해당 이미지 결과의 analysis.error로 기록하고 나머지 분석은 계속
+    """
+    total = len(images_info)
+    workers = min(_resolve_image_concurrency(max_concurrency), total) or 1
+    results: List[Optional[Dict]] = [None] * total
+    
+    print(f"  [INFO] 동시 분석 {workers}개씩 진행")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pano-analysis") as executor:
+        futures = {
+            executor.submit(analyze_image_with_gpt, client, img_info['image_path'], prompt): i
+            for i, img_info in enumerate(images_info)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            img_info = images_info[i]
+            try:
+                analysis = future.result()
+                vsum = analysis.get('visit_summary', {})
+                print(f"  [{done}/{total}] Point {img_info['point_id']} (거리: {img_info['distance_m']:.1f}m) "
+                      f"[OK] 완료 - {vsum.get('location_headline', 'N/A')[:40]}...")
+            except Exception as e:
+                print(f"  [{done}/{total}] Point {img_info['point_id']} [ERROR] 오류: {e}")
+                analysis = {"error": str(e)}
+            results[i] = {**img_info, 'analysis': analysis}
+    
+    return results
 
 
 def synthesize_analysis(client: OpenAI, individual_results: List[Dict]) -> Dict:
@@ -602,6 +639,7 @@ def synthesize_analysis(client: OpenAI, individual_results: List[Dict]) -> Dict:
         }
 
 
+@traced("panorama.map", "render")
 def create_analysis_map(center_lon: float, 
                         center_lat: float, 
                         buffer_meters: float,
@@ -756,7 +794,8 @@ def analyze_area_by_address(address: str,
                             max_images: int = 5,
                             output_json_path: Optional[str] = None,
                             create_map: bool = True,
-                            map_output_path: Optional[str] = None) -> Dict:
+                            map_output_path: Optional[str] = None,
+                            max_concurrency: Optional[int] = None) -> Dict:
     """
     주소를 입력받아 해당 지역의 종합 분석 수행
     
@@ -778,6 +817,8 @@ def analyze_area_by_address(address: str,
         지도 시각화 생성 여부, 기본값 True
     map_output_path : str, optional
         지도 HTML 파일 저장 경로 (기본값: 자동 생성)
+    max_concurrency : int, optional
+        개별 이미지 분석 동시 호출 수 (기본값: PANORAMA_CONCURRENCY 또는 5)
         
     Returns:
     --------
@@ -838,36 +879,12 @@ def analyze_area_by_address(address: str,
     print(f"\n[API] Gemini API 초기화 중...")
     client = init_openai_client()
     
-    # 5. 개별 이미지 분석
+    # 5. 개별 이미지 분석 (동시 호출, 결과는 거리순 유지)
     print(f"\n[분석] 개별 이미지 분석 중 (총 {len(images_info)}개)...")
-    individual_results = []
     individual_prompt = get_individual_analysis_prompt()
-    
-    for i, img_info in enumerate(images_info, 1):
-        print(f"  [{i}/{len(images_info)}] Point {img_info['point_id']} (거리: {img_info['distance_m']:.1f}m) 분석 중...")
-        
-        try:
-            analysis = analyze_image_with_gpt(
-                client, 
-                img_info['image_path'], 
-                individual_prompt
-            )
-            
-            individual_results.append({
-                **img_info,
-                'analysis': analysis
-            })
-            
-            # 간단한 결과 출력
-            vsum = analysis.get('visit_summary', {})
-            print(f"      [OK] 완료 - {vsum.get('location_headline', 'N/A')[:40]}...")
-            
-        except Exception as e:
-            print(f"      [ERROR] 오류: {e}")
-            individual_results.append({
-                **img_info,
-                'analysis': {"error": str(e)}
-            })
+    individual_results = analyze_images_concurrently(
+        client, images_info, individual_prompt, max_concurrency
+    )
     
     # 6. 종합 분석
     print(f"\n[종합] 종합 분석 생성 중...")
@@ -912,7 +929,8 @@ def analyze_area_by_address(address: str,
         src_path = img_info['image_path']
         filename = Path(src_path).name
         dst_path = f"{output_folder}/images/{filename}"
-        shutil.copy2(src_path, dst_path)
+        # 원본과 같은 내용은 산출물 저장소 객체의 하드링크로 배치 (실제 복사 없음)
+        link_file(src_path, dst_path)
         print(f"  [{i}/{len(individual_results)}] {filename}")
     print(f"  [OK] 총 {len(individual_results)}개 이미지 복사 완료")
     
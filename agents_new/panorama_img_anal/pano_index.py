@@ -0,0 +1,128 @@
+"""
+파노라마 포인트 공간 색인
+- PANOID_FILE CSV를 한 번만 읽어 EPSG:5179 x/y 배열 + cKDTree 구성
+- 이미지 폴더는 한 번만 스캔해 존재하는 파일명 집합 보관 (후보마다 exists() 호출 없음)
+- CSV(mtime/크기) 또는 이미지 폴더(mtime)가 바뀌면 다음 조회에서 재구성
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    # scipy가 없으면 전체 거리 계산 (포인트 수천 개 수준에서는 충분히 빠름)
+    SCIPY_AVAILABLE = False
+
+METRIC_CRS = "EPSG:5179"   # 한국 중부 원점 (성동구 적합)
+IMAGE_NAME_FORMAT = "point_{point_id}_pano_{pano_id}.jpg"
+
+_to_metric = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return 0, 0
+
+
+def _scan_images(image_folder: Path) -> Set[str]:
+    """이미지 폴더의 파일명 집합 (폴더가 없으면 빈 집합)"""
+    try:
+        with os.scandir(image_folder) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+
+class PanoramaIndex:
+    """파노라마 포인트 반경 검색 색인 (CSV 행 순서 유지)"""
+
+    def __init__(self, data_csv_path: str, image_folder: str):
+        self.data_csv_path = Path(data_csv_path)
+        self.image_folder = Path(image_folder)
+        self.csv_key = _stat_key(self.data_csv_path)
+        self.folder_key = _stat_key(self.image_folder)
+
+        df = pd.read_csv(self.data_csv_path)
+        self.point_ids = df['point_ID'].to_numpy()
+        self.pano_ids = df['pano_id'].astype(str).to_numpy()
+        self.lons = df['pano_lon'].to_numpy(dtype=float)
+        self.lats = df['pano_lat'].to_numpy(dtype=float)
+        x, y = _to_metric.transform(self.lons, self.lats)
+        self.xy = np.column_stack([x, y])
+        self.tree = cKDTree(self.xy) if SCIPY_AVAILABLE else None
+
+        existing = _scan_images(self.image_folder)
+        image_names = [IMAGE_NAME_FORMAT.format(point_id=pid, pano_id=pano)
+                       for pid, pano in zip(self.point_ids, self.pano_ids)]
+        self.has_image = np.array([name in existing for name in image_names], dtype=bool)
+
+        # 결과 레코드용 값은 파이썬 객체로 미리 변환 (조회 시 numpy 스칼라 변환/경로 결합 없음)
+        self._records = [
+            (int(pid), pano, float(lon), float(lat), str(self.image_folder / name))
+            for pid, pano, lon, lat, name in zip(self.point_ids, self.pano_ids, self.lons, self.lats, image_names)
+        ]
+
+    def is_current(self) -> bool:
+        """원본 CSV와 이미지 폴더가 색인 구축 이후 그대로인지"""
+        return (_stat_key(self.data_csv_path) == self.csv_key
+                and _stat_key(self.image_folder) == self.folder_key)
+
+    def query(self, center_lon: float, center_lat: float, buffer_meters: float,
+              require_image: bool = True) -> List[Dict]:
+        """
+        중심점 반경 내 포인트 (거리순, 같은 거리는 CSV 순서)
+
+        Returns:
+            [{'point_id', 'pano_id', 'lon', 'lat', 'distance_m', 'image_path'}, ...]
+        """
+        cx, cy = _to_metric.transform(center_lon, center_lat)
+        if self.tree is not None:
+            candidates = np.asarray(self.tree.query_ball_point([cx, cy], r=buffer_meters), dtype=int)
+        else:
+            candidates = np.arange(len(self.xy))
+        if require_image:
+            candidates = candidates[self.has_image[candidates]]
+
+        distances = np.hypot(self.xy[candidates, 0] - cx, self.xy[candidates, 1] - cy)
+        inside = distances <= buffer_meters
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.lexsort((candidates, distances))
+
+        results = []
+        for i, distance in zip(candidates[order].tolist(), distances[order].tolist()):
+            point_id, pano_id, lon, lat, image_path = self._records[i]
+            results.append({
+                'point_id': point_id,
+                'pano_id': pano_id,
+                'lon': lon,
+                'lat': lat,
+                'distance_m': distance,
+                'image_path': image_path,
+            })
+        return results
+
+
+_indexes: Dict[Tuple[str, str], PanoramaIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_panorama_index(data_csv_path: str, image_folder: str) -> PanoramaIndex:
+    """(CSV, 이미지 폴더)별 공용 색인 - 원본이 바뀌었으면 재구성"""
+    key = (str(data_csv_path), str(image_folder))
+    with _indexes_lock:
+        index: Optional[PanoramaIndex] = _indexes.get(key)
+        if index is None or not index.is_current():
+            index = PanoramaIndex(data_csv_path, image_folder)
+            _indexes[key] = index
+            print(f"[Panorama] 포인트 색인 구축: {len(index.xy)}개 포인트, 이미지 {int(index.has_image.sum())}개")
+        return index
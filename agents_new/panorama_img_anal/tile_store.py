@@ -0,0 +1,229 @@
+"""
+파노라마 타일 저장소
+- 사전 처리: 이미지 폴더의 모든 파노라마에서 분석용 섹션을 잘라 축소/JPEG 인코딩 (프로세스 풀, 코어 수만큼)
+- 결과는 Arrow IPC 파일(이미지명, mtime, 크기, JPEG 바이트) 하나로 저장 → memory-map으로 읽음
+- 분석 시에는 준비된 JPEG 바이트를 그대로 전송 (PIL 디코딩/크롭/리샘플링 없음)
+- 원본 이미지의 mtime/크기가 다르면 해당 타일은 사용하지 않고 기존 방식으로 인코딩
+
+    python tile_store.py --image-folder C:/img_gpt/downloaded_img --workers 8
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # pyarrow가 없으면 타일 저장소 없이 매번 인코딩
+    PYARROW_AVAILABLE = False
+
+TILE_VERSION = 1
+DEFAULT_TILE_DIR = Path(__file__).parent / ".cache" / "tiles"
+DEFAULT_CHUNK_SIZE = 64
+IMAGE_SUFFIXES = {'.jpg', '.jpeg'}
+
+
+def _tile_dir() -> Path:
+    return Path(os.getenv('PANORAMA_TILE_DIR') or DEFAULT_TILE_DIR)
+
+
+def tile_store_path(image_folder: str, section: str, quality: int, max_dim: int,
+                    tile_dir: Optional[Path] = None) -> Path:
+    """(이미지 폴더, 인코딩 설정)별 타일 파일 경로"""
+    folder_hash = hashlib.sha1(str(Path(image_folder).resolve()).encode('utf-8')).hexdigest()[:10]
+    return (tile_dir or _tile_dir()) / f"tiles_{folder_hash}_{section}_{max_dim}q{quality}_v{TILE_VERSION}.arrow"
+
+
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# 조회
+# ----------------------------------------------------------------------
+class TileStore:
+    """memory-map된 타일 파일 (이미지명 → 행)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file_stat = _stat(path)
+        self._table = None
+        self._rows: Dict[str, Tuple[int, int, int]] = {}
+        if PYARROW_AVAILABLE and self.file_stat is not None:
+            try:
+                self._table = pa_ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+                names = self._table.column('name').to_pylist()
+                mtimes = self._table.column('mtime_ns').to_pylist()
+                sizes = self._table.column('size').to_pylist()
+                self._rows = {name: (row, mtime, size)
+                              for row, (name, mtime, size) in enumerate(zip(names, mtimes, sizes))}
+            except (OSError, pa.ArrowException, KeyError) as e:
+                print(f"[WARN] 타일 저장소 읽기 실패, 사용 안 함: {e}")
+                self._table, self._rows = None, {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def is_current(self) -> bool:
+        return _stat(self.path) == self.file_stat
+
+    def get(self, image_path: str) -> Optional[memoryview]:
+        """원본과 mtime/크기가 같은 타일의 JPEG 바이트 (복사 없는 memoryview), 없으면 None"""
+        entry = self._rows.get(Path(image_path).name)
+        if entry is None:
+            return None
+        row, mtime, size = entry
+        if _stat(Path(image_path)) != (mtime, size):
+            return None
+        return memoryview(self._table.column('jpeg')[row].as_buffer())
+
+    def entries(self) -> Dict[str, Tuple[int, int, int]]:
+        return self._rows
+
+    def tile_bytes(self, row: int) -> bytes:
+        return self._table.column('jpeg')[row].as_py()
+
+
+_stores: Dict[Path, TileStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_tile_store(image_folder: str, section: str, quality: int, max_dim: int) -> TileStore:
+    """이미지 폴더·인코딩 설정별 공용 타일 저장소 (파일이 다시 생성되면 재로드)"""
+    path = tile_store_path(image_folder, section, quality, max_dim)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None or not store.is_current():
+            store = TileStore(path)
+            _stores[path] = store
+        return store
+
+
+# ----------------------------------------------------------------------
+# 사전 처리
+# ----------------------------------------------------------------------
+def _encode_chunk(args) -> List[Tuple[str, int, int, Optional[bytes], Optional[str]]]:
+    """워커: 이미지 묶음 → (이름, mtime, 크기, JPEG 바이트, 오류)"""
+    image_paths, section, quality, max_dim = args
+    # 분석 경로와 같은 크롭/인코딩 함수 사용 (워커에서만 import)
+    from analyze_area_by_address import extract_panorama_section, encode_image_jpeg
+
+    results = []
+    for image_path in image_paths:
+        path = Path(image_path)
+        stat = _stat(path)
+        if stat is None:
+            continue
+        try:
+            tile = encode_image_jpeg(extract_panorama_section(image_path, section),
+                                     quality=quality, max_dim=max_dim)
+            results.append((path.name, stat[0], stat[1], tile, None))
+        except Exception as e:
+            results.append((path.name, stat[0], stat[1], None, str(e)))
+    return results
+
+
+def _init_worker(module_dir: str):
+    import sys
+    sys.path.insert(0, module_dir)
+
+
+def build_tile_store(image_folder: str, section: str, quality: int, max_dim: int,
+                     workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     tile_dir: Optional[Path] = None) -> Dict[str, int]:
+    """
+    이미지 폴더 전체 타일 생성/갱신
+
+    기존 타일 중 원본 mtime/크기가 같은 것은 재사용하고, 새로 생기거나 바뀐 이미지만 인코딩
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow가 설치되어 있지 않아 타일 저장소를 만들 수 없습니다.")
+
+    folder = Path(image_folder)
+    path = tile_store_path(image_folder, section, quality, max_dim, tile_dir)
+    existing = TileStore(path)
+
+    images = sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES and p.is_file())
+    reused: List[Tuple[str, int, int, bytes]] = []
+    pending: List[str] = []
+    for image in images:
+        entry = existing.entries().get(image.name)
+        if entry is not None and _stat(image) == entry[1:]:
+            reused.append((image.name, entry[1], entry[2], existing.tile_bytes(entry[0])))
+        else:
+            pending.append(str(image))
+
+    workers = workers or os.cpu_count() or 1
+    print(f"[타일] 이미지 {len(images)}개 (재사용 {len(reused)}, 인코딩 {len(pending)}), 워커 {workers}")
+
+    started = time.perf_counter()
+    encoded: List[Tuple[str, int, int, bytes]] = []
+    failed = 0
+    chunks = [(pending[i:i + chunk_size], section, quality, max_dim)
+              for i in range(0, len(pending), chunk_size)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(Path(__file__).parent),)) as executor:
+            for done, results in enumerate(executor.map(_encode_chunk, chunks), 1):
+                for name, mtime, size, tile, error in results:
+                    if tile is None:
+                        failed += 1
+                        print(f"[WARN] 타일 생성 실패: {name} ({error})")
+                    else:
+                        encoded.append((name, mtime, size, tile))
+                print(f"[타일] 진행 {min(done * chunk_size, len(pending))}/{len(pending)}")
+
+    rows = sorted(reused + encoded)
+    table = pa.table({
+        'name': pa.array([r[0] for r in rows], type=pa.string()),
+        'mtime_ns': pa.array([r[1] for r in rows], type=pa.int64()),
+        'size': pa.array([r[2] for r in rows], type=pa.int64()),
+        'jpeg': pa.array([r[3] for r in rows], type=pa.binary()),
+    }).replace_schema_metadata({
+        'version': str(TILE_VERSION), 'image_folder': str(folder.resolve()),
+        'section': section, 'quality': str(quality), 'max_dim': str(max_dim),
+    })
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    del existing
+    os.replace(tmp_path, path)
+
+    summary = {"images": len(images), "reused": len(reused), "encoded": len(encoded),
+               "failed": failed, "bytes": int(sum(len(r[3]) for r in rows)),
+               "elapsed_sec": round(time.perf_counter() - started, 2)}
+    print(f"[타일] 저장 완료: {path.name} {summary}")
+    return summary
+
+
+def main():
+    # 분석 경로와 같은 섹션/인코딩 설정 사용
+    from analyze_area_by_address import IMAGE_SECTION, IMAGE_QUALITY, IMAGE_MAX_DIM
+
+    parser = argparse.ArgumentParser(description="파노라마 분석용 섹션 타일 사전 생성")
+    parser.add_argument("--image-folder", default=os.getenv('IMAGE_FOLDER') or "C:/img_gpt/downloaded_img",
+                        help="파노라마 이미지 폴더 (기본: IMAGE_FOLDER)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="워커에 한 번에 넘길 이미지 수")
+    args = parser.parse_args()
+
+    build_tile_store(args.image_folder, IMAGE_SECTION, IMAGE_QUALITY, IMAGE_MAX_DIM,
+                     workers=args.workers, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
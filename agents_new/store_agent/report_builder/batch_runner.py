@@ -0,0 +1,192 @@
+"""
+Batch Runner
+전체 매장 리포트 일괄 생성 - 프로세스 풀 + JSONL 스트리밍 저장 + 완료 목록 기반 재시작
+(실패한 매장은 실행마다 새로 쓰는 오류 파일에 기록 → 재실행 시 다시 시도)
+"""
+
+from typing import Dict, Any, Optional, List, Iterable, Set
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+try:
+    from .store_table import get_store_table
+    from .store_agent_module import StoreAgentModule
+except ImportError:
+    from store_table import get_store_table
+    from store_agent_module import StoreAgentModule
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50
+
+
+def _default_output_path() -> Path:
+    """기본 출력 경로 (store_agent/outputs/batch/store_reports.jsonl)"""
+    return Path(__file__).parent.parent / "outputs" / "batch" / "store_reports.jsonl"
+
+
+def _manifest_path_for(output_path: Path) -> Path:
+    return output_path.with_suffix(".done.txt")
+
+
+def _errors_path_for(output_path: Path) -> Path:
+    return output_path.with_suffix(".errors.jsonl")
+
+
+def load_completed_codes(manifest_path: Path) -> Set[str]:
+    """완료 목록(매장코드 한 줄씩) 로드"""
+    if not manifest_path.exists():
+        return set()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def _chunked(codes: List[str], chunk_size: int) -> Iterable[List[str]]:
+    for start in range(0, len(codes), chunk_size):
+        yield codes[start:start + chunk_size]
+
+
+# ----------------------------------------------------------------------
+# 워커 프로세스
+# ----------------------------------------------------------------------
+_worker_agent: Optional[StoreAgentModule] = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(data_path: Optional[str], render_charts: bool):
+    """워커마다 한 번: 캐시 테이블(memory-map)과 집계 로드"""
+    global _worker_agent, _worker_loop
+    logging.getLogger().setLevel(logging.WARNING)
+    # 매장 단위로 이미 병렬이므로 워커 안에서는 차트를 순차 렌더링
+    _worker_agent = StoreAgentModule(data_path, render_charts=render_charts, chart_workers=1)
+    _worker_loop = asyncio.new_event_loop()
+    _worker_loop.run_until_complete(_worker_agent._load_data())
+
+
+def _analyze_chunk(store_codes: List[str]) -> List[Dict[str, Any]]:
+    """매장코드 묶음 분석 → 매장별 결과 레코드"""
+    records = []
+    for store_code in store_codes:
+        try:
+            report = _worker_loop.run_until_complete(_worker_agent.build_store_report(store_code))
+            if report is None:
+                records.append({"store_code": store_code, "error": "매장 데이터 없음"})
+            else:
+                records.append({"store_code": store_code, "json_output": report["json_output"]})
+        except Exception as e:
+            records.append({"store_code": store_code, "error": str(e)})
+    return records
+
+
+# ----------------------------------------------------------------------
+# 일괄 실행
+# ----------------------------------------------------------------------
+def run_batch(data_path: Optional[str] = None,
+              output_path: Optional[str] = None,
+              manifest_path: Optional[str] = None,
+              errors_path: Optional[str] = None,
+              workers: Optional[int] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE,
+              render_charts: bool = False,
+              store_codes: Optional[List[str]] = None,
+              limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    전체(또는 지정) 매장 리포트 일괄 생성
+
+    - 테이블은 메인 프로세스에서 한 번만 캐시/인덱싱하고, 워커는 캐시를 memory-map으로 공유
+    - 결과는 완료되는 대로 JSONL 한 줄씩 기록 (매장당 {"store_code", "json_output"})
+    - 성공한 매장코드는 완료 목록에 기록되며, 재실행 시 목록에 있는 매장은 건너뜀
+    - 실패한 매장({"store_code", "error"})은 오류 파일에 기록 - 재실행 때 다시 시도하므로 실행마다 새로 씀
+    """
+    output_path = Path(output_path) if output_path else _default_output_path()
+    manifest_path = Path(manifest_path) if manifest_path else _manifest_path_for(output_path)
+    errors_path = Path(errors_path) if errors_path else _errors_path_for(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    errors_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 캐시 생성/검증은 워커 시작 전에 한 번만
+    table = get_store_table(data_path)
+    codes = list(store_codes) if store_codes else table.store_codes
+
+    completed = load_completed_codes(manifest_path)
+    pending = [code for code in codes if code not in completed]
+    skipped = len(codes) - len(pending)
+    if limit is not None:
+        pending = pending[:limit]
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+    summary = {
+        "total": len(codes),
+        "skipped": skipped,
+        "succeeded": 0,
+        "failed": 0,
+        "output_path": str(output_path),
+        "manifest_path": str(manifest_path),
+        "errors_path": str(errors_path),
+    }
+    logger.info(f"일괄 분석 시작: 대상 {len(pending)} 매장 (완료 {len(completed)}), 워커 {workers}, 청크 {chunk_size}")
+    # 이전 실행의 오류 기록은 이번 실행 결과로 대체
+    errors_path.unlink(missing_ok=True)
+    if not pending:
+        return summary
+
+    started = time.perf_counter()
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest, \
+            open(errors_path, 'w', encoding='utf-8') as errors, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(data_path, render_charts)) as executor:
+        futures = [executor.submit(_analyze_chunk, chunk) for chunk in _chunked(pending, chunk_size)]
+        for future in as_completed(futures):
+            records = future.result()
+            for record in records:
+                target = errors if "error" in record else out
+                target.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            errors.flush()
+
+            # 결과가 기록된 뒤에 완료 목록 갱신 (중단 시 완료 목록 ⊆ 결과 파일)
+            done_codes = [r["store_code"] for r in records if "error" not in r]
+            if done_codes:
+                manifest.write("\n".join(done_codes) + "\n")
+                manifest.flush()
+
+            summary["succeeded"] += len(done_codes)
+            summary["failed"] += len(records) - len(done_codes)
+            processed = summary["succeeded"] + summary["failed"]
+            logger.info(f"진행: {processed}/{len(pending)} (실패 {summary['failed']})")
+
+    summary["elapsed_sec"] = round(time.perf_counter() - started, 2)
+    logger.info(f"일괄 분석 완료: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전체 매장 리포트 일괄 생성")
+    parser.add_argument("--data-path", default=None, help="final_merged_data.csv 경로")
+    parser.add_argument("--output", default=None, help="결과 JSONL 경로")
+    parser.add_argument("--manifest", default=None, help="완료 매장코드 목록 경로 (기본: <output>.done.txt)")
+    parser.add_argument("--errors", default=None, help="실패 매장 기록 경로 (기본: <output>.errors.jsonl, 실행마다 새로 씀)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="워커에 한 번에 넘길 매장 수")
+    parser.add_argument("--charts", action="store_true", help="차트 이미지도 생성 (기본: 생략)")
+    parser.add_argument("--limit", type=int, default=None, help="이번 실행에서 처리할 최대 매장 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    summary = run_batch(data_path=args.data_path, output_path=args.output, manifest_path=args.manifest,
+                        errors_path=args.errors, workers=args.workers, chunk_size=args.chunk_size,
+                        render_charts=args.charts, limit=args.limit)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
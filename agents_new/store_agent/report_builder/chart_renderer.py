@@ -0,0 +1,360 @@
+"""
+Chart Renderer
+매장 분석 차트 렌더링 - 입력 데이터 해시 기반 PNG 캐시 + 프로세스 풀 병렬 렌더링
+"""
+
+from typing import Dict, Any, Optional, List
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import matplotlib
+# pyplot을 먼저 import한 뒤 백엔드 지정 - 파이프라인의 다른 단계 스레드가 pyplot을 import하는 중이면
+# matplotlib.use()가 초기화 중인 pyplot에 접근해 실패하므로 (import는 모듈 잠금으로 완료까지 대기)
+import matplotlib.pyplot as plt
+matplotlib.use('Agg')
+
+# 파이프라인 계측 (agents_new/utils/instrumentation.py)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "utils"))
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# 렌더링 코드가 바뀌면 올려서 기존 PNG를 무효화
+CHART_VERSION = 1
+CHART_DPI = 150
+
+MALE_COLUMNS = ['남20대이하', '남30대', '남40대', '남50대', '남60대이상']
+FEMALE_COLUMNS = ['여20대이하', '여30대', '여40대', '여50대', '여60대이상']
+
+
+def configure_fonts():
+    """한글 폰트 설정"""
+    system = platform.system()
+    if system == "Windows":
+        plt.rcParams['font.family'] = 'Malgun Gothic'
+    elif system == "Darwin":
+        plt.rcParams['font.family'] = 'AppleGothic'
+    else:
+        plt.rcParams['font.family'] = 'NanumGothic'
+    matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+configure_fonts()
+
+
+def _default_chart_dir() -> Path:
+    """기본 차트 경로 (store_agent/outputs/charts)"""
+    return Path(__file__).parent.parent / "outputs" / "charts"
+
+
+# ----------------------------------------------------------------------
+# 차트 입력 데이터 추출 (매장 DataFrame → 직렬화 가능한 dict)
+# ----------------------------------------------------------------------
+def _values(series: pd.Series) -> List[Any]:
+    return [None if pd.isna(v) else v for v in series.tolist()]
+
+
+def _series_points(sales_data: pd.DataFrame, column: str) -> Dict[str, List[Any]]:
+    """결측 제외 (월, 값) 목록"""
+    values = sales_data[column].dropna()
+    return {"months": sales_data.loc[values.index, '기준년월'].tolist(), "values": values.tolist()}
+
+
+def build_chart_specs(store_data: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """매장 데이터에서 차트별 입력 데이터 추출"""
+    sales_data = store_data.sort_values('기준년월')
+    months = sales_data['기준년월'].tolist()
+    latest_data = store_data.iloc[-1]
+
+    # 상위 5개 고객층 (최신 데이터 기준)
+    customer_ratios = {col: latest_data[col] for col in MALE_COLUMNS + FEMALE_COLUMNS if pd.notna(latest_data[col])}
+    top_customers = sorted(customer_ratios.items(), key=lambda x: x[1], reverse=True)[:5]
+
+    detailed_ratios = sorted(customer_ratios.items(), key=lambda x: x[1], reverse=True)
+
+    return {
+        "sales_trend": {
+            "months": months,
+            **{col: _values(sales_data[col]) for col in ['매출금액', '매출건수', '유니크고객수', '객단가']}
+        },
+        "gender_pie": {
+            "male": float(sum(latest_data[col] for col in MALE_COLUMNS if pd.notna(latest_data[col]))),
+            "female": float(sum(latest_data[col] for col in FEMALE_COLUMNS if pd.notna(latest_data[col])))
+        },
+        "age_pie": {
+            "sizes": [float(latest_data[m] + latest_data[f]) for m, f in zip(MALE_COLUMNS, FEMALE_COLUMNS)]
+        },
+        "detailed_pie": {
+            "labels": [label for label, _ in detailed_ratios],
+            "sizes": [float(size) for _, size in detailed_ratios]
+        },
+        "ranking_trend": {
+            "months": months,
+            "industry_rank": _values(sales_data['동종매출순위%']),
+            "commercial_rank": _values(sales_data['동일상권매출순위%'])
+        },
+        "customer_trends": {
+            "segments": [{"name": name, **_series_points(sales_data, name)} for name, _ in top_customers]
+        },
+        "new_returning_trends": {
+            "new": _series_points(sales_data, '신규고객'),
+            "returning": _series_points(sales_data, '재방문고객')
+        }
+    }
+
+
+def chart_key(chart_name: str, spec: Dict[str, Any]) -> str:
+    """차트 입력 데이터 해시 (같은 데이터면 같은 키)"""
+    payload = json.dumps({"chart": chart_name, "version": CHART_VERSION, "dpi": CHART_DPI, "data": spec},
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+# ----------------------------------------------------------------------
+# 렌더링 (워커 프로세스에서 실행되므로 모듈 수준 함수)
+# ----------------------------------------------------------------------
+def _as_float(values: List[Any]) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _plot_with_trend(ax, x_data, y_data, title, ylabel, color, invert=False):
+    """추세선이 포함된 플롯 생성"""
+    y_data = _as_float(y_data)
+    # 데이터 플롯
+    ax.plot(x_data, y_data, marker='o', color=color, linewidth=2, markersize=4, label='Data')
+
+    # 추세선 계산 및 그리기
+    if len(y_data) > 1:
+        x_numeric = np.arange(len(y_data))
+        z = np.polyfit(x_numeric, y_data, 1)
+        p = np.poly1d(z)
+        trend_line = p(x_numeric)
+        ax.plot(x_data, trend_line, '--', color=color, alpha=0.7, linewidth=2, label='Trend')
+
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+
+    # y축 스케일을 0-100으로 고정
+    ax.set_ylim(0, 100)
+
+    if invert:
+        ax.invert_yaxis()
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+def _render_sales_trend(spec: Dict[str, Any]):
+    """매출 트렌드 차트 (추세선 포함)"""
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle('Store Sales Analysis with Trend Lines', fontsize=16)
+
+    months = spec['months']
+    _plot_with_trend(axes[0, 0], months, spec['매출금액'],
+                     'Sales Amount Trend (Inverted Scale)', 'Sales Amount', 'red', invert=True)
+    _plot_with_trend(axes[0, 1], months, spec['매출건수'],
+                     'Sales Count Trend (Inverted Scale)', 'Sales Count', 'blue', invert=True)
+    _plot_with_trend(axes[1, 0], months, spec['유니크고객수'],
+                     'Unique Customers Trend (Inverted Scale)', 'Unique Customers', 'green', invert=True)
+    _plot_with_trend(axes[1, 1], months, spec['객단가'],
+                     'Average Transaction Value Trend (Inverted Scale)', 'Avg Transaction Value', 'orange', invert=True)
+
+    plt.tight_layout()
+
+
+def _render_customer_trends(spec: Dict[str, Any]):
+    """고객층별 시계열 트렌드 차트 (상위 5개 고객층)"""
+    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    fig.suptitle('Customer Segment Trends (Top 5 Segments)', fontsize=16)
+
+    colors = ['red', 'blue', 'green', 'orange', 'purple']
+    segments = spec['segments']
+    for i, segment in enumerate(segments[:5]):
+        if len(segment['values']) > 0:
+            _plot_with_trend(axes[i // 3, i % 3], segment['months'], segment['values'],
+                             f"{segment['name']} Trend", 'Ratio (%)', colors[i])
+
+    # 빈 subplot 숨기기
+    if len(segments) < 6:
+        axes[1, 2].set_visible(False)
+
+    plt.tight_layout()
+
+
+def _render_new_returning_trends(spec: Dict[str, Any]):
+    """신규/재방문 고객 트렌드 차트"""
+    fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+    fig.suptitle('New vs Returning Customer Trends', fontsize=16)
+
+    panels = [
+        (axes[0], spec['new'], 'New Customers Trend', 'blue', 'No New Customer Data'),
+        (axes[1], spec['returning'], 'Returning Customers Trend', 'green', 'No Returning Customer Data'),
+    ]
+    for ax, points, title, color, empty_text in panels:
+        if len(points['values']) > 0:
+            _plot_with_trend(ax, points['months'], points['values'], title, 'Ratio (%)', color)
+        else:
+            ax.text(0.5, 0.5, empty_text, ha='center', va='center', transform=ax.transAxes)
+            ax.set_title(f'{title} (No Data)')
+
+    plt.tight_layout()
+
+
+def _render_gender_pie(spec: Dict[str, Any]):
+    """성별 파이차트"""
+    plt.figure(figsize=(8, 8))
+    plt.pie([spec['male'], spec['female']], labels=['Male', 'Female'], colors=['lightblue', 'lightpink'],
+            autopct='%1.1f%%', startangle=90)
+    plt.title('Gender Distribution')
+
+
+def _render_age_pie(spec: Dict[str, Any]):
+    """연령대 파이차트"""
+    plt.figure(figsize=(8, 8))
+    labels = ["20s and below", "30s", "40s", "50s", "60s and above"]
+    colors = ['lightcoral', 'lightskyblue', 'lightgreen', 'gold', 'lightgray']
+    plt.pie(spec['sizes'], labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+    plt.title('Age Group Distribution')
+
+
+def _render_detailed_pie(spec: Dict[str, Any]):
+    """세부 비율 파이차트 (비율 순)"""
+    plt.figure(figsize=(10, 10))
+    labels = spec['labels']
+    colors = plt.cm.Set3(np.linspace(0, 1, len(labels)))
+    plt.pie(spec['sizes'], labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+    plt.title('Detailed Customer Distribution (Top to Bottom)')
+
+
+def _render_ranking_trend(spec: Dict[str, Any]):
+    """순위 트렌드 차트 (추세선 포함)"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    months = spec['months']
+
+    # 업종 내 순위 (추세선 포함)
+    _plot_with_trend(ax, months, spec['industry_rank'],
+                     'Sales Ranking Trends (Inverted Scale)', 'Rank (%)', 'blue', invert=True)
+
+    # 상권 내 순위 (추세선 포함)
+    commercial_rank = _as_float(spec['commercial_rank'])
+    ax.plot(months, commercial_rank, marker='s', color='red',
+            linewidth=2, markersize=4, label='Commercial Area Rank')
+    if len(months) > 1:
+        x_numeric = np.arange(len(months))
+        trend_line = np.poly1d(np.polyfit(x_numeric, commercial_rank, 1))(x_numeric)
+        ax.plot(months, trend_line, '--', color='red', alpha=0.7, linewidth=2,
+                label='Commercial Area Trend')
+
+    ax.set_xlabel('Month')
+    ax.legend()
+    ax.invert_yaxis()  # 순위는 낮을수록 좋으므로 역스케일
+    ax.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+
+
+CHART_RENDERERS = {
+    "sales_trend": _render_sales_trend,
+    "gender_pie": _render_gender_pie,
+    "age_pie": _render_age_pie,
+    "detailed_pie": _render_detailed_pie,
+    "ranking_trend": _render_ranking_trend,
+    "customer_trends": _render_customer_trends,
+    "new_returning_trends": _render_new_returning_trends,
+}
+
+
+def render_chart(chart_name: str, spec: Dict[str, Any], output_path: str) -> str:
+    """차트 하나를 PNG로 저장 (임시 파일에 쓰고 교체하므로 동시 실행에도 안전)"""
+    output_path = Path(output_path)
+    if output_path.exists():
+        return str(output_path)
+
+    tmp_path = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp.png")
+    try:
+        CHART_RENDERERS[chart_name](spec)
+        plt.savefig(tmp_path, format='png', dpi=CHART_DPI, bbox_inches='tight')
+    finally:
+        plt.close('all')
+    os.replace(tmp_path, output_path)
+    return str(output_path)
+
+
+# ----------------------------------------------------------------------
+# 렌더러
+# ----------------------------------------------------------------------
+_executors: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """워커 수별 공유 프로세스 풀 (첫 사용 시 생성)"""
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=configure_fonts)
+        _executors[workers] = executor
+    return executor
+
+
+class ChartRenderer:
+    """
+    매장 차트 렌더러
+
+    - 차트 파일명: `{매장코드}_{차트명}_{입력 데이터 해시}.png` - 같은 데이터로 재실행하면 기존 PNG 재사용
+    - 새로 그려야 하는 차트만 프로세스 풀(Agg 백엔드)에서 병렬 렌더링
+    - workers=1이면 현재 프로세스에서 순차 렌더링 (일괄 생성 워커 안에서 사용)
+    """
+
+    def __init__(self, chart_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.chart_dir = Path(chart_dir) if chart_dir else _default_chart_dir()
+        self.workers = workers if workers is not None else min(len(CHART_RENDERERS), os.cpu_count() or 1)
+
+    def chart_path(self, store_code: str, chart_name: str, spec: Dict[str, Any]) -> Path:
+        return self.chart_dir / f"{store_code}_{chart_name}_{chart_key(chart_name, spec)}.png"
+
+    async def render_all(self, store_code: str, store_data: pd.DataFrame) -> Dict[str, Optional[str]]:
+        """매장 차트 전체 렌더링 → 차트명: PNG 경로 (실패한 차트는 None)"""
+        self.chart_dir.mkdir(parents=True, exist_ok=True)
+        specs = build_chart_specs(store_data)
+
+        chart_files: Dict[str, Optional[str]] = {}
+        pending = {}
+        for chart_name, spec in specs.items():
+            path = self.chart_path(store_code, chart_name, spec)
+            chart_files[chart_name] = str(path)
+            if not path.exists():
+                pending[chart_name] = (spec, str(path))
+
+        if pending:
+            logger.info(f"차트 렌더링: {len(pending)}개 (캐시 재사용 {len(specs) - len(pending)}개)")
+            with span("charts.render_all", "render", rendered=len(pending), reused=len(specs) - len(pending)):
+                if self.workers > 1 and len(pending) > 1:
+                    loop = asyncio.get_running_loop()
+                    executor = _get_executor(self.workers)
+                    names = list(pending.keys())
+                    results = await asyncio.gather(
+                        *(loop.run_in_executor(executor, render_chart, name, *pending[name]) for name in names),
+                        return_exceptions=True)
+                    errors = dict(zip(names, results))
+                else:
+                    errors = {}
+                    for name, (spec, path) in pending.items():
+                        try:
+                            render_chart(name, spec, path)
+                        except Exception as e:
+                            errors[name] = e
+
+            for name, result in errors.items():
+                if isinstance(result, Exception):
+                    logger.error(f"차트 생성 실패 {name}: {result}")
+                    chart_files[name] = None
+        else:
+            logger.info(f"차트 캐시 재사용: {len(specs)}개")
+
+        return chart_files
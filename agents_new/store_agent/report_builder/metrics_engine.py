@@ -0,0 +1,320 @@
+"""
+Metrics Engine
+설정(configs/*.yml) 기반 복합 지표(CVI/ASI/SCI/GMI) 계산 + 처방 매핑 - 전체 매장 벡터 계산
+"""
+
+from typing import Dict, Any, Optional, List
+from itertools import compress
+from pathlib import Path
+import logging
+
+import numpy as np
+import pandas as pd
+import yaml
+
+try:
+    from .store_table import get_store_table
+    from . import trend_engine
+except ImportError:
+    from store_table import get_store_table
+    import trend_engine
+
+logger = logging.getLogger(__name__)
+
+CODE_COLUMN = "코드"
+MONTH_COLUMN = "기준년월"
+INDICES = ["cvi", "asi", "sci", "gmi"]
+# (임계값 키, 해당 임계값 미만일 때 등급) - 모든 임계값 이상이면 excellent
+LEVEL_BOUNDS = [("critical", "critical"), ("warning", "warning"), ("good", "normal"), ("excellent", "good")]
+SEVERITY_ORDER = {"critical": 0, "warning": 1}
+
+# 매장 데이터에서 파생하는 컬럼 (component_sources에서 사용)
+DERIVED_COLUMNS = {
+    "상권_매장수": ["상권코드"],
+    "상권_동종매장수": ["상권코드", "업종_소분류"],
+}
+# 상권 밖 매장의 상권코드 (store_agent_module과 동일) - 하나의 상권으로 묶이지 않도록 파생 매장 수는 결측 처리
+NO_COMMERCIAL_AREA = "미표기"
+
+
+def _default_config_dir() -> Path:
+    """기본 설정 경로 (프로젝트 루트/configs)"""
+    return Path(__file__).resolve().parents[3] / "configs"
+
+
+def _load_yaml(path: Path) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _compare(values: np.ndarray, operator: str, threshold: float) -> np.ndarray:
+    """처방 조건 비교 (결측은 항상 False)"""
+    with np.errstate(invalid='ignore'):
+        if operator == "below":
+            return values < threshold
+        if operator == "above":
+            return values > threshold
+    raise ValueError(f"지원하지 않는 조건: {operator}")
+
+
+def _weighted_scores(components: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """결측 세부 지표를 제외하고 가중치를 재정규화한 가중 평균 (모두 결측이면 NaN)"""
+    present = ~np.isnan(components)
+    weight_sum = (present * weights).sum(axis=1)
+    total = (np.where(present, components, 0.0) * weights).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(weight_sum > 0, total / weight_sum, np.nan)
+
+
+class MetricsEngine:
+    """
+    복합 지표 엔진
+
+    - weights.yml: 전체/세부 가중치, 세부 지표 → 데이터 컬럼 매핑(component_sources)
+    - thresholds.yml: 지표별 등급 임계값, 종합 건강도 기준
+    - prescriptions.yml: 지표별/복합 처방
+    설정은 생성 시 한 번만 읽고, 전체 매장 지표는 한 번 계산 후 재사용
+    """
+
+    def __init__(self, config_dir: Optional[str] = None, data_path: Optional[str] = None):
+        self.data_path = data_path
+        self.config_dir = Path(config_dir) if config_dir else _default_config_dir()
+        weights = _load_yaml(self.config_dir / "weights.yml")
+        thresholds = _load_yaml(self.config_dir / "thresholds.yml")
+        prescriptions = _load_yaml(self.config_dir / "prescriptions.yml")
+
+        self.overall_weights = {name: float(weights["overall_weights"][name]) for name in INDICES}
+        self.component_weights = {name: {k: float(v) for k, v in weights[f"{name}_weights"].items()}
+                                   for name in INDICES}
+        self.component_sources = weights.get("component_sources", {})
+        self.thresholds = {name: thresholds[f"{name}_thresholds"] for name in INDICES}
+        self.overall_health = thresholds.get("overall_health", {})
+
+        # 처방 규칙: (규칙명, 대상 지표, [(지표, 조건, 기준값)], 심각도, 액션)
+        self.prescription_rules: List[Dict[str, Any]] = []
+        for name in INDICES:
+            for rule_name, rule in prescriptions.get(f"{name}_prescriptions", {}).items():
+                self.prescription_rules.append({
+                    "rule": rule_name,
+                    "metric": name,
+                    "conditions": [(name, rule["condition"], float(rule["threshold"]))],
+                    "severity": rule.get("severity", "warning"),
+                    "actions": rule.get("actions", []),
+                })
+        for rule_name, rule in prescriptions.get("combined_prescriptions", {}).items():
+            self.prescription_rules.append({
+                "rule": rule_name,
+                "metric": "combined",
+                "conditions": [(c["metric"], c["operator"], float(c["value"])) for c in rule["conditions"]],
+                "severity": rule.get("severity", "warning"),
+                "actions": rule.get("actions", []),
+            })
+
+        self._table: Optional[pd.DataFrame] = None
+
+    # ------------------------------------------------------------------
+    # 세부 지표
+    # ------------------------------------------------------------------
+    def _store_features(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """매장별 최신월 값 + 파생 컬럼 + 월별 기울기"""
+        ordered = frame.sort_values([CODE_COLUMN, MONTH_COLUMN], kind='mergesort')
+        latest = ordered.groupby(CODE_COLUMN, sort=True).tail(1).copy()
+        latest[CODE_COLUMN] = latest[CODE_COLUMN].astype(str)
+
+        outside_area = latest["상권코드"].astype(str) == NO_COMMERCIAL_AREA if "상권코드" in latest.columns else None
+        for derived, keys in DERIVED_COLUMNS.items():
+            latest[derived] = latest.groupby(keys)[CODE_COLUMN].transform('size').astype(float)
+            if outside_area is not None:
+                # 결측 세부 지표는 가중 합산에서 빠지고 나머지 가중치로 다시 정규화됨
+                latest.loc[outside_area, derived] = np.nan
+        features = latest.set_index(CODE_COLUMN)
+
+        slope_columns = sorted({source["column"] for sources in self.component_sources.values()
+                                for source in sources.values()
+                                if source.get("column") and source.get("transform") in ("slope", "inverse_slope")})
+        if slope_columns:
+            trends = trend_engine.compute_store_trends(frame, columns=slope_columns, rank_columns=())
+            for col in slope_columns:
+                features[f"{col}_slope"] = trends[f"{col}_slope"]
+        return features
+
+    @staticmethod
+    def _transform(values: pd.Series, transform: str) -> pd.Series:
+        """원본 값 → 0~100 점수"""
+        values = pd.to_numeric(values, errors='coerce').astype(float)
+        if transform == "percentile":
+            scores = values.rank(pct=True) * 100
+        elif transform == "inverse_percentile":
+            scores = values.rank(pct=True, ascending=False) * 100
+        elif transform == "inverse":
+            scores = 100 - values
+        elif transform == "grade":
+            scores = (6 - values) / 5 * 100
+        elif transform == "slope":
+            scores = 50 + 10 * values
+        elif transform == "inverse_slope":
+            scores = 50 - 10 * values
+        elif transform == "score":
+            scores = values
+        else:
+            raise ValueError(f"지원하지 않는 변환: {transform}")
+        return scores.clip(0, 100)
+
+    def _component_scores(self, features: pd.DataFrame, name: str,
+                          extra_components: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """한 지표의 세부 지표 점수 (매장 × 세부 지표)"""
+        scores = pd.DataFrame(index=features.index)
+        for component in self.component_weights[name]:
+            if extra_components is not None and component in extra_components.columns:
+                # 외부 분석(파노라마/유동인구 등) 점수가 있으면 우선 사용 (이미 0~100 점수)
+                scores[component] = self._transform(extra_components[component].reindex(features.index), "score")
+                continue
+
+            source = self.component_sources.get(name, {}).get(component) or {}
+            column, transform = source.get("column"), source.get("transform", "percentile")
+            if transform in ("slope", "inverse_slope") and column:
+                column = f"{column}_slope"
+            if not column or column not in features.columns:
+                scores[component] = np.nan
+            else:
+                scores[component] = self._transform(features[column], transform)
+        return scores
+
+    # ------------------------------------------------------------------
+    # 전체 매장 계산
+    # ------------------------------------------------------------------
+    def _levels(self, values: np.ndarray, name: str) -> np.ndarray:
+        limits = self.thresholds[name]
+        with np.errstate(invalid='ignore'):
+            levels = np.select([values < float(limits[key]) for key, _ in LEVEL_BOUNDS],
+                               [label for _, label in LEVEL_BOUNDS], "excellent")
+        return np.where(np.isnan(values), "unknown", levels)
+
+    def _health(self, overall: np.ndarray, critical_issues: np.ndarray, warning_issues: np.ndarray) -> np.ndarray:
+        """종합 건강도 - 설정 순서대로 처음 만족하는 단계 (모두 불만족이면 마지막 단계)"""
+        names = list(self.overall_health.keys())
+        conditions = []
+        with np.errstate(invalid='ignore'):
+            for name in names:
+                spec = self.overall_health[name]
+                conditions.append((overall >= float(spec["min_score"]))
+                                  & (critical_issues <= spec["max_critical_issues"])
+                                  & (warning_issues <= spec["max_warning_issues"]))
+        health = np.select(conditions, names, names[-1]) if names else np.full(len(overall), "unknown")
+        return np.where(np.isnan(overall), "unknown", health)
+
+    def compute_table(self, frame: pd.DataFrame, extra_components: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        전체 매장 지표 테이블
+
+        반환: 매장코드 인덱스, 컬럼
+        `{지표}`, `{지표}_level`, `{지표}.{세부 지표}`, `overall`, `overall_level`,
+        `critical_issues`, `warning_issues`, `health`, `prescriptions`(규칙명 목록)
+        """
+        features = self._store_features(frame)
+        table = pd.DataFrame(index=features.index)
+
+        for name in INDICES:
+            components = self._component_scores(features, name, extra_components)
+            weights = np.array([self.component_weights[name][c] for c in components.columns])
+            table[name] = _weighted_scores(components.to_numpy(dtype=float), weights)
+            table[f"{name}_level"] = self._levels(table[name].to_numpy(), name)
+            for component in components.columns:
+                table[f"{name}.{component}"] = components[component]
+
+        index_values = table[INDICES].to_numpy(dtype=float)
+        overall_weights = np.array([self.overall_weights[name] for name in INDICES])
+        table["overall"] = _weighted_scores(index_values, overall_weights)
+
+        levels = table[[f"{name}_level" for name in INDICES]].to_numpy()
+        table["critical_issues"] = (levels == "critical").sum(axis=1)
+        table["warning_issues"] = (levels == "warning").sum(axis=1)
+        table["health"] = self._health(table["overall"].to_numpy(), table["critical_issues"].to_numpy(),
+                                       table["warning_issues"].to_numpy())
+
+        # 처방 규칙 매칭 (모든 조건 AND)
+        rule_masks = []
+        for rule in self.prescription_rules:
+            mask = np.ones(len(table), dtype=bool)
+            for metric, operator, threshold in rule["conditions"]:
+                mask &= _compare(table[metric].to_numpy(dtype=float), operator, threshold)
+            rule_masks.append(mask)
+        rule_names = [rule["rule"] for rule in self.prescription_rules]
+        if rule_masks:
+            matched = np.column_stack(rule_masks)
+            table["prescriptions"] = [list(compress(rule_names, row)) for row in matched]
+        else:
+            table["prescriptions"] = [[] for _ in range(len(table))]
+
+        logger.info(f"지표 테이블 계산 완료: {len(table)} 매장")
+        return table
+
+    # ------------------------------------------------------------------
+    # 조회 API
+    # ------------------------------------------------------------------
+    @property
+    def table(self) -> pd.DataFrame:
+        """전체 매장 지표 테이블 (매장 테이블 캐시 기준, 한 번만 계산)"""
+        if self._table is None:
+            self._table = self.compute_table(get_store_table(self.data_path).frame)
+        return self._table
+
+    def rank(self, by: str = "overall", top: Optional[int] = None, ascending: bool = False) -> pd.DataFrame:
+        """지표 기준 매장 순위"""
+        ranked = self.table.sort_values(by, ascending=ascending, kind='mergesort')
+        return ranked.head(top) if top else ranked
+
+    def prescriptions_for(self, rule_names: List[str]) -> List[Dict[str, Any]]:
+        """규칙명 목록 → 처방 상세 (심각도 순)"""
+        rules = {rule["rule"]: rule for rule in self.prescription_rules}
+        details = [{"rule": name, "metric": rules[name]["metric"], "severity": rules[name]["severity"],
+                    "actions": rules[name]["actions"]} for name in rule_names if name in rules]
+        return sorted(details, key=lambda d: SEVERITY_ORDER.get(d["severity"], len(SEVERITY_ORDER)))
+
+    def store_metrics(self, store_code: str, table: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        """한 매장의 지표 + 처방 (없으면 None)"""
+        table = self.table if table is None else table
+        if store_code not in table.index:
+            return None
+        row = table.loc[store_code]
+
+        def _score(value):
+            return round(float(value), 1) if pd.notna(value) else None
+
+        return {
+            "store_code": store_code,
+            "overall": {"score": _score(row["overall"]), "health": row["health"]},
+            "indices": {
+                name: {
+                    "score": _score(row[name]),
+                    "level": row[f"{name}_level"],
+                    "weight": self.overall_weights[name],
+                    "components": {component: _score(row[f"{name}.{component}"])
+                                   for component in self.component_weights[name]}
+                }
+                for name in INDICES
+            },
+            "issues": {"critical": int(row["critical_issues"]), "warning": int(row["warning_issues"])},
+            "prescriptions": self.prescriptions_for(row["prescriptions"])
+        }
+
+
+# 싱글톤 인스턴스
+_metrics_engine: Optional[MetricsEngine] = None
+
+
+def get_metrics_engine() -> MetricsEngine:
+    """Get singleton MetricsEngine instance"""
+    global _metrics_engine
+    if _metrics_engine is None:
+        _metrics_engine = MetricsEngine()
+    return _metrics_engine
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = MetricsEngine(data_path=sys.argv[1] if len(sys.argv) > 1 else None)
+    ranked = engine.rank(top=20)
+    print(ranked[["overall", "health"] + INDICES].round(1).to_string())
@@ -7,27 +7,20 @@ from typing import Dict, Any, Optional, List, Tuple, TypedDict
 import logging
 import pandas as pd
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import re
-from io import BytesIO
-import base64
 import json
 import os
 from pathlib import Path
-import platform
 
-# 한글 폰트 설정
-system = platform.system()
-if system == "Windows":
-    plt.rcParams['font.family'] = 'Malgun Gothic'
-elif system == "Darwin":
-    plt.rcParams['font.family'] = 'AppleGothic'
-else:
-    plt.rcParams['font.family'] = 'NanumGothic'
-matplotlib.rcParams['axes.unicode_minus'] = False
+try:
+    from .store_table import get_store_table
+    from .chart_renderer import ChartRenderer
+    from . import trend_engine
+except ImportError:
+    from store_table import get_store_table
+    from chart_renderer import ChartRenderer
+    import trend_engine
 
 logger = logging.getLogger(__name__)
 
@@ -40,14 +33,31 @@ class StoreAgentState(TypedDict):
     store_analysis: Optional[Dict[str, Any]]
     error: Optional[str]
 
+# 분석 결과 섹션 → 계산 메서드
+ANALYSIS_SECTIONS = {
+    "store_overview": "_analyze_store_overview",
+    "sales_analysis": "_analyze_sales",
+    "customer_analysis": "_analyze_customers",
+    "commercial_area_analysis": "_analyze_commercial_area",
+    "industry_analysis": "_analyze_industry",
+}
+
 class StoreAgentModule:
     """매장 분석 모듈"""
     
-    def __init__(self, data_path: Optional[str] = None):
+    def __init__(self, data_path: Optional[str] = None, render_charts: bool = True,
+                 chart_workers: Optional[int] = None):
         self.agent_name = "StoreAgent"
         self.data_path = data_path or self._get_default_data_path()
-        self.data = None
+        # 일괄 생성 시 차트 렌더링을 끌 수 있음 (분석 수치는 동일, 자가 평가에서는 시각화 항목을 제외)
+        self.render_charts = render_charts
+        self.chart_renderer = ChartRenderer(workers=chart_workers)
+        self.store_table = None
+        self.aggregates = None
         self.store_data = None
+        self.store_code = None
+        # 매장코드 → 섹션별 분석 결과 (실행당 각 섹션을 한 번만 계산)
+        self._analysis_context: Dict[str, Dict[str, Any]] = {}
         logger.info(f"매장 분석 에이전트 모듈 초기화 완료 - 데이터 경로: {self.data_path}")
     
     def _get_default_data_path(self) -> str:
@@ -81,20 +91,12 @@ class StoreAgentModule:
                 if not store_code:
                     return {**state, "error": "매장 코드를 찾을 수 없습니다. 쿼리에 매장 코드를 포함하거나 JSON 파일을 제공해주세요."}
             
-            # 데이터 로드
-            await self._load_data()
-            
-            # 특정 매장 데이터 필터링
-            self.store_data = self._filter_store_data(store_code)
-            if self.store_data.empty:
+            report = await self.build_store_report(store_code, user_query, user_id, context)
+            if report is None:
                 return {**state, "error": f"매장 코드 {store_code}에 대한 데이터를 찾을 수 없습니다."}
-            
-            # 분석 수행 (memory_insights 제거)
-            analysis_result = await self._perform_store_analysis(user_query, user_id, context)
-            evaluation_result = await self._perform_self_evaluation(analysis_result, user_query)
-            
-            # JSON 형태로 결과 출력
-            json_output = self._format_json_output(analysis_result, evaluation_result, store_code)
+            analysis_result = report["analysis_result"]
+            evaluation_result = report["evaluation"]
+            json_output = report["json_output"]
             
             # JSON 파일로 저장
             output_file_path = await self._save_json_report(json_output, store_code, session_id)
@@ -119,12 +121,44 @@ class StoreAgentModule:
             logger.error(f"매장 분석 에러: {e}")
             return {**state, "error": str(e)}
     
+    async def build_store_report(self, store_code: str, user_query: Optional[str] = None,
+                                 user_id: str = "", context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        매장코드 하나에 대한 분석 + 자가 평가 + JSON 출력 생성 (파일 저장 없음)
+        
+        매장 데이터가 없으면 None 반환. 일괄 생성(batch_runner)에서도 이 메서드를 사용
+        """
+        user_query = user_query or f"{store_code} 매장 분석"
+        
+        # 데이터 로드
+        await self._load_data()
+        
+        # 특정 매장 데이터 필터링
+        self.store_data = self._filter_store_data(store_code)
+        if self.store_data.empty:
+            return None
+        self._reset_analysis_context(store_code)
+        
+        # 분석 수행 (memory_insights 제거)
+        analysis_result = await self._perform_store_analysis(user_query, user_id, context or {})
+        evaluation_result = await self._perform_self_evaluation(analysis_result, user_query)
+        
+        # JSON 형태로 결과 출력
+        json_output = self._format_json_output(analysis_result, evaluation_result, store_code)
+        
+        return {
+            "analysis_result": analysis_result,
+            "evaluation": evaluation_result,
+            "json_output": json_output
+        }
+    
     async def _load_data(self):
-        """데이터 로드"""
+        """데이터 로드 (컬럼형 캐시 사용, CSV는 변경 시에만 재파싱)"""
         try:
-            if self.data is None:
-                self.data = pd.read_csv(self.data_path)
-                logger.info(f"데이터 로드 완료: {len(self.data)} 행 - 경로: {self.data_path}")
+            if self.store_table is None:
+                self.store_table = get_store_table(self.data_path)
+                self.aggregates = self.store_table.aggregates
+                logger.info(f"데이터 로드 완료: {len(self.store_table.index)} 매장 - 경로: {self.data_path}")
         except Exception as e:
             logger.error(f"데이터 로드 실패: {e}")
             raise
@@ -137,8 +171,8 @@ class StoreAgentModule:
         return match.group(0) if match else None
     
     def _filter_store_data(self, store_code: str) -> pd.DataFrame:
-        """특정 매장의 데이터 필터링"""
-        return self.data[self.data['코드'] == store_code].copy()
+        """특정 매장의 데이터 필터링 (매장코드 인덱스로 해당 구간만 조회)"""
+        return self.store_table.get_store(store_code)
     
     def _check_json_input(self, user_query: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """JSON 입력 확인 및 파싱"""
@@ -209,28 +243,12 @@ class StoreAgentModule:
         industry_analysis = analysis_result['industry_analysis']
         summary = analysis_result['summary']
         
-        # Base64 이미지를 파일 경로로 변환
-        visualizations = {}
-        current_dir = Path(__file__).parent.parent
-        chart_dir = current_dir / "outputs" / "charts"
-        chart_dir.mkdir(parents=True, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # 차트 파일 저장
-        chart_files = {}
-        for chart_name, base64_data in analysis_result['visualizations'].items():
-            if base64_data:
-                chart_filename = f"{store_code}_{chart_name}_{timestamp}.png"
-                chart_path = chart_dir / chart_filename
-                
-                try:
-                    with open(chart_path, 'wb') as f:
-                        f.write(base64.b64decode(base64_data))
-                    chart_files[chart_name] = str(chart_path)
-                except Exception as e:
-                    logger.error(f"차트 저장 실패 {chart_name}: {e}")
-                    chart_files[chart_name] = None
+        # 차트는 렌더링 시 이미 파일로 저장됨 (경로만 참조)
+        chart_files = {
+            chart_name: chart_path
+            for chart_name, chart_path in analysis_result['visualizations'].items()
+            if chart_path
+        }
         
         json_output = {
             "report_metadata": {
@@ -398,18 +416,27 @@ class StoreAgentModule:
         """매장 분석 수행"""
         logger.info("매장 분석 시작")
         
-        analysis_result = {
-            "store_overview": await self._analyze_store_overview(),
-            "sales_analysis": await self._analyze_sales(),
-            "customer_analysis": await self._analyze_customers(),
-            "commercial_area_analysis": await self._analyze_commercial_area(),
-            "industry_analysis": await self._analyze_industry(),
-            "visualizations": await self._create_visualizations(),
-            "summary": await self._generate_summary()
-        }
+        # 분석 컨텍스트에 섹션 결과를 채워 그대로 분석 결과로 사용
+        analysis_result = self._analysis_context.setdefault(self.store_code, {})
+        for section in ANALYSIS_SECTIONS:
+            await self._get_section(section)
+        analysis_result["visualizations"] = await self._create_visualizations() if self.render_charts else {}
+        analysis_result["summary"] = await self._generate_summary()
         
         return analysis_result
     
+    def _reset_analysis_context(self, store_code: str):
+        """새 분석 실행 시 매장별 결과 컨텍스트 초기화"""
+        self.store_code = store_code
+        self._analysis_context = {store_code: {}}
+    
+    async def _get_section(self, section: str) -> Dict[str, Any]:
+        """섹션 분석 결과 조회 (컨텍스트에 없을 때만 계산)"""
+        context = self._analysis_context.setdefault(self.store_code, {})
+        if section not in context:
+            context[section] = await getattr(self, ANALYSIS_SECTIONS[section])()
+        return context[section]
+    
     async def _analyze_store_overview(self) -> Dict[str, Any]:
         """1. 점포 개요 분석"""
         store_info = self.store_data.iloc[0]
@@ -425,12 +452,8 @@ class StoreAgentModule:
         industry_sub = store_info['업종_소분류']
         industry_mid = store_info['업종_중분류']
         
-        # 소분류가 100개 이상인지 확인
-        sub_count = len(self.data[self.data['업종_소분류'] == industry_sub])
-        if sub_count >= 100:
-            industry_category = industry_sub
-        else:
-            industry_category = industry_mid
+        # 소분류가 100개 이상인지 확인 (사전 집계된 행 수 사용)
+        industry_category, _ = self.aggregates.select_industry(industry_sub, industry_mid)
         
         # 브랜드 처리
         brand_code = store_info['브랜드코드']
@@ -475,31 +498,35 @@ class StoreAgentModule:
         # 매출 데이터 정렬 (시간순)
         sales_data = self.store_data.sort_values('기준년월')
         
+        # 추세/안정성은 지표 전체를 한 번에 계산
+        stats = trend_engine.frame_stats(
+            sales_data, trend_engine.SALES_TREND_COLUMNS + trend_engine.RANK_TREND_COLUMNS)
+        
         # 매출 분석
         sales_analysis = {
             "sales_amount": {
                 "data": sales_data['매출금액'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['매출금액']),
-                "stability": self._calculate_stability(sales_data['매출금액'])
+                "trend": stats['매출금액']['trend'],
+                "stability": stats['매출금액']['stability']
             },
             "sales_count": {
                 "data": sales_data['매출건수'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['매출건수']),
-                "stability": self._calculate_stability(sales_data['매출건수'])
+                "trend": stats['매출건수']['trend'],
+                "stability": stats['매출건수']['stability']
             },
             "unique_customers": {
                 "data": sales_data['유니크고객수'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['유니크고객수']),
-                "stability": self._calculate_stability(sales_data['유니크고객수'])
+                "trend": stats['유니크고객수']['trend'],
+                "stability": stats['유니크고객수']['stability']
             },
             "avg_transaction": {
                 "data": sales_data['객단가'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['객단가']),
-                "stability": self._calculate_stability(sales_data['객단가'])
+                "trend": stats['객단가']['trend'],
+                "stability": stats['객단가']['stability']
             }
         }
         
@@ -508,13 +535,13 @@ class StoreAgentModule:
             "same_industry_sales_amount": {
                 "data": sales_data['동종매출금액%'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['동종매출금액%']),
+                "trend": stats['동종매출금액%']['trend'],
                 "average": sales_data['동종매출금액%'].mean()
             },
             "same_industry_sales_count": {
                 "data": sales_data['동종매출건수%'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_trend(sales_data['동종매출건수%']),
+                "trend": stats['동종매출건수%']['trend'],
                 "average": sales_data['동종매출건수%'].mean()
             }
         }
@@ -524,13 +551,13 @@ class StoreAgentModule:
             "industry_rank": {
                 "data": sales_data['동종매출순위%'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_rank_trend(sales_data['동종매출순위%']),
+                "trend": stats['동종매출순위%']['rank_trend'],
                 "average": sales_data['동종매출순위%'].mean()
             },
             "commercial_rank": {
                 "data": sales_data['동일상권매출순위%'].tolist(),
                 "months": sales_data['기준년월'].tolist(),
-                "trend": self._calculate_rank_trend(sales_data['동일상권매출순위%']),
+                "trend": stats['동일상권매출순위%']['rank_trend'],
                 "average": sales_data['동일상권매출순위%'].mean()
             }
         }
@@ -637,46 +664,28 @@ class StoreAgentModule:
                 "reason": "상권코드가 미표기로 상권 분석 불가"
             }
         
-        # 동일 상권 내 매장들 필터링
-        commercial_stores = self.data[self.data['상권코드'] == commercial_code]
+        # 동일 상권 사전 집계 조회
+        commercial_stats = self.aggregates.commercial(commercial_code)
         
-        if len(commercial_stores) == 0:
+        if not commercial_stats or commercial_stats['rows'] == 0:
             return {
                 "commercial_area": commercial_code,
                 "analysis_available": False,
                 "reason": "상권 내 다른 매장 데이터 없음"
             }
         
-        # 상권 평균 매출 분석
-        commercial_avg_sales = commercial_stores.groupby('기준년월').agg({
-            '매출금액': 'mean',
-            '매출건수': 'mean',
-            '유니크고객수': 'mean',
-            '객단가': 'mean'
-        }).reset_index()
-        
         # 상권 해지가맹점 비중
-        termination_ratio = commercial_stores['동일상권해지가맹점비중'].mean()
+        termination_ratio = commercial_stats['termination_ratio']
         
         # 상권 고객층 분석 (평균)
-        customer_columns = ['남20대이하', '남30대', '남40대', '남50대', '남60대이상',
-                          '여20대이하', '여30대', '여40대', '여50대', '여60대이상']
-        
-        commercial_customer_avg = {}
-        for col in customer_columns:
-            commercial_customer_avg[col] = commercial_stores[col].mean()
+        commercial_customer_avg = commercial_stats['customer_segments']
         
         # 상권 분석 결과
         commercial_analysis = {
             "commercial_area": commercial_code,
             "analysis_available": True,
-            "total_stores_in_area": len(commercial_stores['코드'].unique()),
-            "average_sales_analysis": {
-                "sales_amount_trend": self._calculate_trend(commercial_avg_sales['매출금액']),
-                "sales_count_trend": self._calculate_trend(commercial_avg_sales['매출건수']),
-                "unique_customers_trend": self._calculate_trend(commercial_avg_sales['유니크고객수']),
-                "avg_transaction_trend": self._calculate_trend(commercial_avg_sales['객단가'])
-            },
+            "total_stores_in_area": commercial_stats['stores'],
+            "average_sales_analysis": self._average_sales_trends(commercial_stats),
             "termination_analysis": {
                 "termination_ratio": round(termination_ratio, 2) if pd.notna(termination_ratio) else None,
                 "area_health": "건전한 상권" if termination_ratio < 10 else "위험한 상권" if termination_ratio > 20 else "보통 상권"
@@ -694,62 +703,38 @@ class StoreAgentModule:
         industry_sub = store_info['업종_소분류']
         industry_mid = store_info['업종_중분류']
         
-        # 소분류가 100개 이상인지 확인하여 업종 선택
-        sub_count = len(self.data[self.data['업종_소분류'] == industry_sub])
-        if sub_count >= 100:
-            industry_category = industry_sub
-            industry_stores = self.data[self.data['업종_소분류'] == industry_sub]
-        else:
-            industry_category = industry_mid
-            industry_stores = self.data[self.data['업종_중분류'] == industry_mid]
+        # 소분류가 100개 이상인지 확인하여 업종 선택 (사전 집계 조회)
+        industry_category, industry_stats = self.aggregates.select_industry(industry_sub, industry_mid)
         
-        if len(industry_stores) == 0:
+        if not industry_stats or industry_stats['rows'] == 0:
             return {
                 "industry": industry_category,
                 "analysis_available": False,
                 "reason": "업종 내 다른 매장 데이터 없음"
             }
         
-        # 업종 평균 매출 분석
-        industry_avg_sales = industry_stores.groupby('기준년월').agg({
-            '매출금액': 'mean',
-            '매출건수': 'mean',
-            '유니크고객수': 'mean',
-            '객단가': 'mean'
-        }).reset_index()
-        
         # 업종 해지가맹점 비중
-        termination_ratio = industry_stores['동종해지가맹점%'].mean()
+        termination_ratio = industry_stats['termination_ratio']
         
         # 업종 평균 배달 분석
-        delivery_ratio = industry_stores['배달매출비율'].mean()
+        delivery_ratio = industry_stats['delivery_ratio']
         
         # 업종 고객층 분석 (평균)
-        customer_columns = ['남20대이하', '남30대', '남40대', '남50대', '남60대이상',
-                          '여20대이하', '여30대', '여40대', '여50대', '여60대이상']
-        
-        industry_customer_avg = {}
-        for col in customer_columns:
-            industry_customer_avg[col] = industry_stores[col].mean()
+        industry_customer_avg = industry_stats['customer_segments']
         
         # 업종 분석 결과
         industry_analysis = {
             "industry": industry_category,
             "analysis_available": True,
-            "total_stores_in_industry": len(industry_stores['코드'].unique()),
-            "average_sales_analysis": {
-                "sales_amount_trend": self._calculate_trend(industry_avg_sales['매출금액']),
-                "sales_count_trend": self._calculate_trend(industry_avg_sales['매출건수']),
-                "unique_customers_trend": self._calculate_trend(industry_avg_sales['유니크고객수']),
-                "avg_transaction_trend": self._calculate_trend(industry_avg_sales['객단가'])
-            },
+            "total_stores_in_industry": industry_stats['stores'],
+            "average_sales_analysis": self._average_sales_trends(industry_stats),
             "termination_analysis": {
                 "termination_ratio": round(termination_ratio, 2) if pd.notna(termination_ratio) else None,
                 "industry_health": "건전한 업종" if termination_ratio < 10 else "위험한 업종" if termination_ratio > 20 else "보통 업종"
             },
             "delivery_analysis": {
                 "average_delivery_ratio": round(delivery_ratio, 2) if pd.notna(delivery_ratio) else None,
-                "delivery_trend": self._calculate_trend(industry_stores['배달매출비율'].dropna()) if len(industry_stores['배달매출비율'].dropna()) > 1 else "데이터 부족"
+                "delivery_trend": self._trend_label(industry_stats['delivery_slope']) if industry_stats['delivery_points'] > 1 else "데이터 부족"
             },
             "average_customer_segments": {
                 col: round(ratio, 1) for col, ratio in industry_customer_avg.items() if pd.notna(ratio)
@@ -758,358 +743,36 @@ class StoreAgentModule:
         
         return industry_analysis
     
-    async def _create_visualizations(self) -> Dict[str, str]:
-        """시각화 생성"""
-        visualizations = {}
-        
-        # 매출 시계열 그래프 (추세선 포함)
-        visualizations['sales_trend'] = self._create_sales_trend_chart()
-        
-        # 고객층 파이차트
-        visualizations['gender_pie'] = self._create_gender_pie_chart()
-        visualizations['age_pie'] = self._create_age_pie_chart()
-        visualizations['detailed_pie'] = self._create_detailed_pie_chart()
-        
-        # 순위 시계열 그래프 (추세선 포함)
-        visualizations['ranking_trend'] = self._create_ranking_trend_chart()
-        
-        # 고객층별 시계열 트렌드 차트 (추세선 포함)
-        visualizations['customer_trends'] = self._create_customer_trends_chart()
-        visualizations['new_returning_trends'] = self._create_new_returning_trends_chart()
-        
-        return visualizations
-    
-    def _create_sales_trend_chart(self) -> str:
-        """매출 트렌드 차트 생성 (추세선 포함)"""
-        # 매출 데이터 정렬
-        sales_data = self.store_data.sort_values('기준년월')
-        
-        # 4개 지표를 하나의 차트에 표시
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-        fig.suptitle('Store Sales Analysis with Trend Lines', fontsize=16)
-        
-        # 매출금액 (역스케일 + 추세선)
-        self._plot_with_trend(axes[0,0], sales_data['기준년월'], sales_data['매출금액'], 
-                             'Sales Amount Trend (Inverted Scale)', 'Sales Amount', 'red', invert=True)
-        
-        # 매출건수 (역스케일 + 추세선)
-        self._plot_with_trend(axes[0,1], sales_data['기준년월'], sales_data['매출건수'], 
-                             'Sales Count Trend (Inverted Scale)', 'Sales Count', 'blue', invert=True)
-        
-        # 유니크고객수 (역스케일 + 추세선)
-        self._plot_with_trend(axes[1,0], sales_data['기준년월'], sales_data['유니크고객수'], 
-                             'Unique Customers Trend (Inverted Scale)', 'Unique Customers', 'green', invert=True)
-        
-        # 객단가 (역스케일 + 추세선)
-        self._plot_with_trend(axes[1,1], sales_data['기준년월'], sales_data['객단가'], 
-                             'Average Transaction Value Trend (Inverted Scale)', 'Avg Transaction Value', 'orange', invert=True)
-        
-        plt.tight_layout()
-        
-        # Base64 인코딩
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
-    
-    def _plot_with_trend(self, ax, x_data, y_data, title, ylabel, color, invert=False):
-        """추세선이 포함된 플롯 생성"""
-        # 데이터 플롯
-        ax.plot(x_data, y_data, marker='o', color=color, linewidth=2, markersize=4, label='Data')
-        
-        # 추세선 계산 및 그리기
-        if len(y_data) > 1:
-            x_numeric = np.arange(len(y_data))
-            z = np.polyfit(x_numeric, y_data, 1)
-            p = np.poly1d(z)
-            trend_line = p(x_numeric)
-            ax.plot(x_data, trend_line, '--', color=color, alpha=0.7, linewidth=2, label='Trend')
-        
-        ax.set_title(title)
-        ax.set_ylabel(ylabel)
-        
-        # y축 스케일을 0-100으로 고정
-        ax.set_ylim(0, 100)
-        
-        if invert:
-            ax.invert_yaxis()
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-    
-    def _create_customer_trends_chart(self) -> str:
-        """고객층별 시계열 트렌드 차트 생성"""
-        sales_data = self.store_data.sort_values('기준년월')
-        
-        # 고객층 데이터 추출
-        customer_columns = {
-            '남20대이하': '남20대이하',
-            '남30대': '남30대', 
-            '남40대': '남40대',
-            '남50대': '남50대',
-            '남60대이상': '남60대이상',
-            '여20대이하': '여20대이하',
-            '여30대': '여30대',
-            '여40대': '여40대',
-            '여50대': '여50대',
-            '여60대이상': '여60대이상'
-        }
-        
-        # 상위 5개 고객층만 선택 (최신 데이터 기준)
-        latest_data = self.store_data.iloc[-1]
-        customer_ratios = {}
-        for col, display_name in customer_columns.items():
-            if pd.notna(latest_data[col]):
-                customer_ratios[display_name] = latest_data[col]
-        
-        # 비율 순으로 정렬하여 상위 5개 선택
-        top_customers = dict(sorted(customer_ratios.items(), key=lambda x: x[1], reverse=True)[:5])
-        
-        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-        fig.suptitle('Customer Segment Trends (Top 5 Segments)', fontsize=16)
-        
-        colors = ['red', 'blue', 'green', 'orange', 'purple']
-        
-        for i, (customer_type, ratio) in enumerate(top_customers.items()):
-            if i < 5:  # 최대 5개만 표시
-                row = i // 3
-                col = i % 3
-                
-                if row < 2 and col < 3:
-                    customer_data = sales_data[customer_columns[customer_type]].dropna()
-                    if len(customer_data) > 0:
-                        self._plot_with_trend(axes[row, col], 
-                                            sales_data.loc[customer_data.index, '기준년월'], 
-                                            customer_data,
-                                            f'{customer_type} Trend', 
-                                            'Ratio (%)', 
-                                            colors[i])
-        
-        # 빈 subplot 숨기기
-        if len(top_customers) < 6:
-            axes[1, 2].set_visible(False)
-        
-        plt.tight_layout()
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
-    
-    def _create_new_returning_trends_chart(self) -> str:
-        """신규/재방문 고객 트렌드 차트 생성"""
-        sales_data = self.store_data.sort_values('기준년월')
-        
-        fig, axes = plt.subplots(1, 2, figsize=(15, 6))
-        fig.suptitle('New vs Returning Customer Trends', fontsize=16)
-        
-        # 신규고객 트렌드
-        new_customer_data = sales_data['신규고객'].dropna()
-        if len(new_customer_data) > 0:
-            self._plot_with_trend(axes[0], 
-                                sales_data.loc[new_customer_data.index, '기준년월'], 
-                                new_customer_data,
-                                'New Customers Trend', 
-                                'Ratio (%)', 
-                                'blue')
-        else:
-            axes[0].text(0.5, 0.5, 'No New Customer Data', ha='center', va='center', transform=axes[0].transAxes)
-            axes[0].set_title('New Customers Trend (No Data)')
-        
-        # 재방문고객 트렌드
-        returning_customer_data = sales_data['재방문고객'].dropna()
-        if len(returning_customer_data) > 0:
-            self._plot_with_trend(axes[1], 
-                                sales_data.loc[returning_customer_data.index, '기준년월'], 
-                                returning_customer_data,
-                                'Returning Customers Trend', 
-                                'Ratio (%)', 
-                                'green')
-        else:
-            axes[1].text(0.5, 0.5, 'No Returning Customer Data', ha='center', va='center', transform=axes[1].transAxes)
-            axes[1].set_title('Returning Customers Trend (No Data)')
-        
-        plt.tight_layout()
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+    async def _create_visualizations(self) -> Dict[str, Optional[str]]:
+        """시각화 생성 (차트명 → PNG 경로, 입력 데이터가 같으면 기존 파일 재사용)"""
+        return await self.chart_renderer.render_all(self.store_code, self.store_data)
     
-    def _create_gender_pie_chart(self) -> str:
-        """성별 파이차트 생성"""
-        plt.figure(figsize=(8, 8))
-        
-        latest_data = self.store_data.iloc[-1]
-        male_ratio = sum([latest_data[col] for col in ['남20대이하', '남30대', '남40대', '남50대', '남60대이상'] if pd.notna(latest_data[col])])
-        female_ratio = sum([latest_data[col] for col in ['여20대이하', '여30대', '여40대', '여50대', '여60대이상'] if pd.notna(latest_data[col])])
-        
-        labels = ['Male', 'Female']
-        sizes = [male_ratio, female_ratio]
-        colors = ['lightblue', 'lightpink']
-        
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        plt.title('Gender Distribution')
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+    def _calculate_trend(self, data: pd.Series) -> str:
+        """트렌드 계산"""
+        return trend_engine.series_stats([data.values])["trend"][0]
     
-    def _create_age_pie_chart(self) -> str:
-        """연령대 파이차트 생성"""
-        plt.figure(figsize=(8, 8))
-        
-        latest_data = self.store_data.iloc[-1]
-        age_groups = {
-            "20s and below": latest_data['남20대이하'] + latest_data['여20대이하'],
-            "30s": latest_data['남30대'] + latest_data['여30대'],
-            "40s": latest_data['남40대'] + latest_data['여40대'],
-            "50s": latest_data['남50대'] + latest_data['여50대'],
-            "60s and above": latest_data['남60대이상'] + latest_data['여60대이상']
+    def _average_sales_trends(self, group_stats: Dict[str, Any]) -> Dict[str, str]:
+        """상권/업종 월별 평균 매출 지표 4종 추세 (한 번에 계산)"""
+        columns = {
+            "sales_amount_trend": '매출금액',
+            "sales_count_trend": '매출건수',
+            "unique_customers_trend": '유니크고객수',
+            "avg_transaction_trend": '객단가'
         }
-        
-        labels = list(age_groups.keys())
-        sizes = list(age_groups.values())
-        colors = ['lightcoral', 'lightskyblue', 'lightgreen', 'gold', 'lightgray']
-        
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        plt.title('Age Group Distribution')
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
-    
-    def _create_detailed_pie_chart(self) -> str:
-        """세부 비율 파이차트 생성"""
-        plt.figure(figsize=(10, 10))
-        
-        latest_data = self.store_data.iloc[-1]
-        detailed_ratios = {}
-        
-        for col in ['남20대이하', '남30대', '남40대', '남50대', '남60대이상', 
-                   '여20대이하', '여30대', '여40대', '여50대', '여60대이상']:
-            if pd.notna(latest_data[col]):
-                detailed_ratios[col] = latest_data[col]
-        
-        # 비율 순으로 정렬
-        detailed_ratios = dict(sorted(detailed_ratios.items(), key=lambda x: x[1], reverse=True))
-        
-        labels = list(detailed_ratios.keys())
-        sizes = list(detailed_ratios.values())
-        colors = plt.cm.Set3(np.linspace(0, 1, len(labels)))
-        
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        plt.title('Detailed Customer Distribution (Top to Bottom)')
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        series_list = [self.aggregates.monthly_series(group_stats, col).values for col in columns.values()]
+        return dict(zip(columns.keys(), trend_engine.series_stats(series_list)["trend"]))
     
-    def _create_ranking_trend_chart(self) -> str:
-        """순위 트렌드 차트 생성 (추세선 포함)"""
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        sales_data = self.store_data.sort_values('기준년월')
-        
-        # 업종 내 순위 (추세선 포함)
-        self._plot_with_trend(ax, sales_data['기준년월'], sales_data['동종매출순위%'], 
-                             'Sales Ranking Trends (Inverted Scale)', 'Rank (%)', 'blue', invert=True)
-        
-        # 상권 내 순위 (추세선 포함)
-        ax.plot(sales_data['기준년월'], sales_data['동일상권매출순위%'], marker='s', color='red', 
-                linewidth=2, markersize=4, label='Commercial Area Rank')
-        
-        # 상권 내 순위 추세선
-        if len(sales_data) > 1:
-            x_numeric = np.arange(len(sales_data))
-            z = np.polyfit(x_numeric, sales_data['동일상권매출순위%'], 1)
-            p = np.poly1d(z)
-            trend_line = p(x_numeric)
-            ax.plot(sales_data['기준년월'], trend_line, '--', color='red', alpha=0.7, linewidth=2, 
-                   label='Commercial Area Trend')
-        
-        ax.set_xlabel('Month')
-        ax.legend()
-        ax.invert_yaxis()  # 순위는 낮을수록 좋으므로 역스케일
-        ax.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
-    
-    def _calculate_trend(self, data: pd.Series) -> str:
-        """트렌드 계산"""
-        if len(data) < 2:
-            return "데이터 부족"
-        
-        # 선형 회귀로 트렌드 계산
-        x = np.arange(len(data))
-        y = data.values
-        slope = np.polyfit(x, y, 1)[0]
-        
-        if slope > 0.1:
-            return "상승 추세"
-        elif slope < -0.1:
-            return "하락 추세"
-        else:
-            return "안정 추세"
+    def _trend_label(self, slope: float) -> str:
+        """기울기 → 트렌드 라벨"""
+        return trend_engine.trend_label(slope)
     
     def _calculate_stability(self, data: pd.Series) -> str:
         """안정성 계산"""
-        if len(data) < 2:
-            return "데이터 부족"
-        
-        cv = data.std() / data.mean() if data.mean() != 0 else float('inf')
-        
-        if cv < 0.1:
-            return "매우 안정적"
-        elif cv < 0.2:
-            return "안정적"
-        elif cv < 0.3:
-            return "보통"
-        else:
-            return "불안정"
+        return trend_engine.series_stats([data.values])["stability"][0]
     
     def _calculate_rank_trend(self, data: pd.Series) -> str:
         """순위 트렌드 계산 (낮을수록 좋음)"""
-        if len(data) < 2:
-            return "데이터 부족"
-        
-        x = np.arange(len(data))
-        y = data.values
-        slope = np.polyfit(x, y, 1)[0]
-        
-        if slope > 0.1:
-            return "순위 하락 (악화)"
-        elif slope < -0.1:
-            return "순위 상승 (개선)"
-        else:
-            return "순위 안정"
+        return trend_engine.series_stats([data.values])["rank_trend"][0]
     
     def _get_cancellation_recommendation(self, cancellation_data: pd.Series) -> str:
         """취소율 개선 권고사항"""
@@ -1133,11 +796,11 @@ class StoreAgentModule:
     
     async def _generate_summary(self) -> Dict[str, Any]:
         """분석 결과 종합 요약"""
-        store_overview = await self._analyze_store_overview()
-        sales_analysis = await self._analyze_sales()
-        customer_analysis = await self._analyze_customers()
-        commercial_analysis = await self._analyze_commercial_area()
-        industry_analysis = await self._analyze_industry()
+        store_overview = await self._get_section("store_overview")
+        sales_analysis = await self._get_section("sales_analysis")
+        customer_analysis = await self._get_section("customer_analysis")
+        commercial_analysis = await self._get_section("commercial_area_analysis")
+        industry_analysis = await self._get_section("industry_analysis")
         
         # 핵심 인사이트 추출
         key_insights = []
@@ -1179,10 +842,7 @@ class StoreAgentModule:
             problems.append("업종 위험 상황")
         
         # 구체적인 개선 권고사항 생성
-        recommendations = self._generate_detailed_recommendations(
-            store_overview, sales_analysis, customer_analysis, 
-            commercial_analysis, industry_analysis
-        )
+        recommendations = self._generate_detailed_recommendations()
         
         return {
             "store_summary": store_overview,
@@ -1192,9 +852,13 @@ class StoreAgentModule:
             "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     
-    def _generate_detailed_recommendations(self, store_overview, sales_analysis, customer_analysis, 
-                                         commercial_analysis, industry_analysis) -> List[Dict[str, Any]]:
-        """구체적이고 실행 가능한 권고사항 생성"""
+    def _generate_detailed_recommendations(self) -> List[Dict[str, Any]]:
+        """구체적이고 실행 가능한 권고사항 생성 (분석 컨텍스트의 섹션 결과 사용)"""
+        context = self._analysis_context[self.store_code]
+        sales_analysis = context["sales_analysis"]
+        customer_analysis = context["customer_analysis"]
+        commercial_analysis = context["commercial_area_analysis"]
+        industry_analysis = context["industry_analysis"]
         recommendations = []
         
         # 1. 매출 개선 권고사항
@@ -1337,19 +1001,11 @@ class StoreAgentModule:
     async def _perform_self_evaluation(self, analysis_result: Dict[str, Any], user_query: str) -> Dict[str, Any]:
         """자가 평가 수행"""
         # 분석 완성도 평가
-        completeness_score = 0.0
-        total_sections = 5  # 점포개요, 매출분석, 고객분석, 시각화, 요약
-        
-        if analysis_result.get('store_overview'):
-            completeness_score += 0.2
-        if analysis_result.get('sales_analysis'):
-            completeness_score += 0.2
-        if analysis_result.get('customer_analysis'):
-            completeness_score += 0.2
-        if analysis_result.get('visualizations'):
-            completeness_score += 0.2
-        if analysis_result.get('summary'):
-            completeness_score += 0.2
+        sections = ['store_overview', 'sales_analysis', 'customer_analysis', 'visualizations', 'summary']  # 점포개요, 매출분석, 고객분석, 시각화, 요약
+        # 차트 렌더링을 끈 경우(일괄 생성) 시각화는 만들지 않은 것이므로 평가에서 제외 → 대화형 경로와 같은 점수
+        if not self.render_charts:
+            sections.remove('visualizations')
+        completeness_score = sum(1 for section in sections if analysis_result.get(section)) / len(sections)
         
         # 정확성 평가 (데이터 활용도)
         accuracy_score = 0.9 if self.store_data is not None and len(self.store_data) > 0 else 0.5
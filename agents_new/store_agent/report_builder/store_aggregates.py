@@ -0,0 +1,143 @@
+"""
+Store Aggregates
+상권코드 / 업종_소분류 / 업종_중분류 단위 사전 집계 테이블
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MONTH_COLUMN = "기준년월"
+CODE_COLUMN = "코드"
+SALES_COLUMNS = ['매출금액', '매출건수', '유니크고객수', '객단가']
+CUSTOMER_COLUMNS = ['남20대이하', '남30대', '남40대', '남50대', '남60대이상',
+                    '여20대이하', '여30대', '여40대', '여50대', '여60대이상']
+
+# 업종_소분류 행 수가 이 값 이상이면 소분류, 아니면 중분류로 비교
+INDUSTRY_SUB_MIN_ROWS = 100
+
+GROUP_SPECS = {
+    "commercial": {"key": "상권코드", "termination": "동일상권해지가맹점비중", "delivery": False},
+    "industry_sub": {"key": "업종_소분류", "termination": "동종해지가맹점%", "delivery": True},
+    "industry_mid": {"key": "업종_중분류", "termination": "동종해지가맹점%", "delivery": True},
+}
+
+
+def _float(value) -> float:
+    return float(value) if pd.notna(value) else float('nan')
+
+
+def _row_order_slopes(df: pd.DataFrame, key: str, column: str) -> pd.DataFrame:
+    """
+    그룹별 결측 제거 후 행 순서(0, 1, 2, ...)에 대한 1차 회귀 기울기
+
+    `np.polyfit(np.arange(n), series.dropna(), 1)[0]`과 같은 값을 닫힌 식으로 계산
+    """
+    valid = df.loc[df[column].notna(), [key, column]]
+    x = valid.groupby(key, sort=False).cumcount().astype(float)
+    y = valid[column].astype(float)
+    frame = pd.DataFrame({key: valid[key], "x": x, "y": y, "xy": x * y, "xx": x * x})
+    sums = frame.groupby(key, sort=False).agg(n=("x", "size"), sx=("x", "sum"), sy=("y", "sum"),
+                                              sxy=("xy", "sum"), sxx=("xx", "sum"))
+    denom = sums["n"] * sums["sxx"] - sums["sx"] ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sums["slope"] = (sums["n"] * sums["sxy"] - sums["sx"] * sums["sy"]) / denom
+    return sums[["n", "slope"]]
+
+
+def _build_group_table(df: pd.DataFrame, key: str, termination_col: str, include_delivery: bool) -> Dict[str, Dict[str, Any]]:
+    """한 그룹 기준(상권/업종)의 집계 테이블 생성"""
+    grouped = df.groupby(key, sort=False)
+    rows = grouped.size()
+    stores = grouped[CODE_COLUMN].nunique()
+    termination = grouped[termination_col].mean()
+    customers = grouped[CUSTOMER_COLUMNS].mean()
+    monthly = df.groupby([key, MONTH_COLUMN])[SALES_COLUMNS].mean()
+
+    if include_delivery:
+        delivery = grouped['배달매출비율'].mean()
+        delivery_slopes = _row_order_slopes(df, key, '배달매출비율')
+
+    months_by_group = {group_value: group_monthly.droplevel(0)
+                       for group_value, group_monthly in monthly.groupby(level=0, sort=False)}
+
+    table: Dict[str, Dict[str, Any]] = {}
+    for group_value in rows.index:
+        # 기준년월이 모두 결측인 그룹도 행/매장 수는 유지
+        group_monthly = months_by_group.get(group_value)
+        if group_monthly is None:
+            group_monthly = pd.DataFrame(columns=SALES_COLUMNS)
+
+        entry: Dict[str, Any] = {
+            "rows": int(rows[group_value]),
+            "stores": int(stores[group_value]),
+            "monthly": {
+                "months": group_monthly.index.tolist(),
+                **{col: [_float(v) for v in group_monthly[col]] for col in SALES_COLUMNS}
+            },
+            "termination_ratio": _float(termination[group_value]),
+            "customer_segments": {col: _float(customers.at[group_value, col]) for col in CUSTOMER_COLUMNS},
+        }
+        if include_delivery:
+            entry["delivery_ratio"] = _float(delivery[group_value])
+            if group_value in delivery_slopes.index:
+                entry["delivery_points"] = int(delivery_slopes.at[group_value, "n"])
+                entry["delivery_slope"] = _float(delivery_slopes.at[group_value, "slope"])
+            else:
+                entry["delivery_points"] = 0
+                entry["delivery_slope"] = float('nan')
+        table[str(group_value)] = entry
+    return table
+
+
+def build_aggregates(df: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    전체 매장 테이블에서 상권/업종별 집계 생성
+
+    원본 CSV 행 순서 기준 계산(배달 추세)이 있으므로 정렬 전 DataFrame을 넘겨야 함
+    """
+    aggregates = {}
+    for name, spec in GROUP_SPECS.items():
+        aggregates[name] = _build_group_table(df, spec["key"], spec["termination"], spec["delivery"])
+        logger.info(f"집계 테이블 생성: {name} ({len(aggregates[name])} 그룹)")
+    return aggregates
+
+
+class StoreAggregates:
+    """사전 집계 테이블 조회"""
+
+    def __init__(self, data: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.data = data
+
+    def commercial(self, commercial_code: Any) -> Optional[Dict[str, Any]]:
+        """상권코드 집계"""
+        return self.data.get("commercial", {}).get(str(commercial_code))
+
+    def industry_sub(self, industry_sub: Any) -> Optional[Dict[str, Any]]:
+        """업종_소분류 집계"""
+        return self.data.get("industry_sub", {}).get(str(industry_sub))
+
+    def industry_mid(self, industry_mid: Any) -> Optional[Dict[str, Any]]:
+        """업종_중분류 집계"""
+        return self.data.get("industry_mid", {}).get(str(industry_mid))
+
+    def industry_row_count(self, industry_sub: Any) -> int:
+        """업종_소분류 행 수"""
+        entry = self.industry_sub(industry_sub)
+        return entry["rows"] if entry else 0
+
+    def select_industry(self, industry_sub: Any, industry_mid: Any) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """소분류 행 수 기준으로 비교 업종(소분류/중분류)과 집계 선택"""
+        if self.industry_row_count(industry_sub) >= INDUSTRY_SUB_MIN_ROWS:
+            return industry_sub, self.industry_sub(industry_sub)
+        return industry_mid, self.industry_mid(industry_mid)
+
+    @staticmethod
+    def monthly_series(entry: Dict[str, Any], column: str) -> pd.Series:
+        """월별 평균 시계열 (기준년월 순)"""
+        monthly = entry["monthly"]
+        return pd.Series(monthly[column], index=monthly["months"], dtype=float)
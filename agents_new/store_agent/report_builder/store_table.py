@@ -0,0 +1,327 @@
+"""
+Store Table
+final_merged_data.csv → 컬럼형(Arrow IPC) 캐시 + 매장코드 인덱스
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # pyarrow가 없으면 pandas pickle로 폴백
+    PYARROW_AVAILABLE = False
+
+try:
+    from .store_aggregates import StoreAggregates, build_aggregates
+except ImportError:
+    from store_aggregates import StoreAggregates, build_aggregates
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CODE_COLUMN = "코드"
+CSV_ENCODINGS = ['utf-8', 'cp949', 'euc-kr', 'latin1']
+
+
+def _default_csv_path() -> Path:
+    """기본 CSV 경로 (store_agent/store_data/final_merged_data.csv)"""
+    return Path(__file__).parent.parent / "store_data" / "final_merged_data.csv"
+
+
+def _file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """파일 내용 해시"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_store_csv(csv_path: Path) -> pd.DataFrame:
+    """여러 인코딩을 시도하여 원본 CSV 로드"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            df = pd.read_csv(csv_path, encoding=encoding, low_memory=False)
+            logger.info(f"CSV 로드 완료: {csv_path} ({encoding}, {len(df)} 행)")
+            return df
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"CSV 인코딩 판별 실패: {csv_path}")
+
+
+def _normalize_object_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Arrow 변환이 가능하도록 타입이 섞인 object 컬럼을 문자열로 통일"""
+    for col in df.columns:
+        if df[col].dtype == object:
+            inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+            if inferred not in ('string', 'empty'):
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+class StoreTable:
+    """
+    매장 데이터 컬럼형 캐시
+
+    - 원본 CSV를 한 번만 파싱하여 `코드` 기준으로 정렬된 Arrow IPC 파일로 저장
+    - 매장코드 → (시작 행, 행 수) 인덱스로 한 매장 조회 시 해당 구간만 슬라이스
+    - 상권/업종별 집계 테이블(store_aggregates)도 같은 시점에 생성하여 함께 저장
+    - 원본 CSV의 mtime/크기가 바뀌면 해시를 비교하여 내용이 바뀐 경우에만 재생성
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.csv_path = Path(csv_path) if csv_path else _default_csv_path()
+        self.cache_dir = Path(cache_dir) if cache_dir else self.csv_path.parent / ".cache"
+        stem = self.csv_path.stem
+        suffix = "arrow" if PYARROW_AVAILABLE else "pkl"
+        self.table_path = self.cache_dir / f"{stem}.{suffix}"
+        self.meta_path = self.cache_dir / f"{stem}.meta.json"
+        self.aggregates_path = self.cache_dir / f"{stem}.aggregates.json"
+
+        self._meta: Optional[Dict[str, Any]] = None
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+        self._table = None
+        self._frame: Optional[pd.DataFrame] = None
+        self._aggregates: Optional[StoreAggregates] = None
+
+    # ------------------------------------------------------------------
+    # 캐시 관리
+    # ------------------------------------------------------------------
+    def _source_stat(self) -> Dict[str, int]:
+        stat = self.csv_path.stat()
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        if not all(p.exists() for p in (self.meta_path, self.table_path, self.aggregates_path)):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"캐시 메타데이터 읽기 실패: {e}")
+            return None
+        if meta.get("version") != CACHE_VERSION or meta.get("backend") != self.table_path.suffix[1:]:
+            return None
+        return meta
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    def is_fresh(self) -> bool:
+        """캐시가 원본 CSV와 일치하는지 확인 (mtime/크기 → 해시 순)"""
+        meta = self._read_meta()
+        if meta is None:
+            return False
+
+        source = meta.get("source", {})
+        stat = self._source_stat()
+        if source.get("mtime_ns") == stat["mtime_ns"] and source.get("size") == stat["size"]:
+            return True
+
+        # mtime만 바뀐 경우(복사/touch)는 해시로 재확인 후 메타데이터만 갱신
+        if source.get("size") == stat["size"] and source.get("sha256") == _file_sha256(self.csv_path):
+            meta["source"].update(stat)
+            self._write_meta(meta)
+            return True
+        return False
+
+    def build(self) -> Dict[str, Any]:
+        """원본 CSV → 컬럼형 캐시 + 인덱스 생성"""
+        if not self.csv_path.exists():
+            raise FileNotFoundError(f"매장 데이터 파일이 없습니다: {self.csv_path}")
+
+        logger.info(f"매장 테이블 캐시 생성 시작: {self.csv_path}")
+        stat = self._source_stat()
+        sha256 = _file_sha256(self.csv_path)
+
+        df = read_store_csv(self.csv_path)
+        df[CODE_COLUMN] = df[CODE_COLUMN].astype(str)
+        df = _normalize_object_columns(df)
+
+        # 집계는 원본 행 순서 기준 계산이 있으므로 정렬 전에 생성
+        aggregates = build_aggregates(df)
+
+        # 매장 내 원래 행 순서를 유지하는 안정 정렬
+        df = df.sort_values(CODE_COLUMN, kind='mergesort').reset_index(drop=True)
+
+        codes = df[CODE_COLUMN].to_numpy()
+        index: Dict[str, Tuple[int, int]] = {}
+        if len(codes):
+            starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+            stops = np.append(starts[1:], len(codes))
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                index[str(codes[start])] = (start, stop - start)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.table_path.with_suffix(self.table_path.suffix + ".tmp")
+        if PYARROW_AVAILABLE:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # 압축 없이 저장해야 memory-map 시 zero-copy로 읽힘
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa_ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, self.table_path)
+
+        tmp_aggregates_path = self.aggregates_path.with_suffix(".tmp")
+        with open(tmp_aggregates_path, 'w', encoding='utf-8') as f:
+            json.dump(aggregates, f, ensure_ascii=False)
+        os.replace(tmp_aggregates_path, self.aggregates_path)
+
+        meta = {
+            "version": CACHE_VERSION,
+            "backend": self.table_path.suffix[1:],
+            "source": {**stat, "sha256": sha256, "path": str(self.csv_path)},
+            "rows": len(df),
+            "index": index,
+        }
+        self._write_meta(meta)
+        logger.info(f"매장 테이블 캐시 생성 완료: {len(df)} 행, {len(index)} 매장 → {self.table_path}")
+
+        self._meta = meta
+        self._index = index
+        self._table = None
+        self._frame = None
+        self._aggregates = StoreAggregates(aggregates)
+        return meta
+
+    def ensure(self) -> "StoreTable":
+        """캐시가 없거나 오래되었으면 재생성 후 인덱스 로드"""
+        if self._index is not None:
+            return self
+        if not self.is_fresh():
+            self.build()
+        else:
+            self._meta = self._read_meta()
+            self._index = {code: tuple(span) for code, span in self._meta["index"].items()}
+        return self
+
+    def _open_table(self):
+        if self._table is None:
+            if PYARROW_AVAILABLE:
+                source = pa.memory_map(str(self.table_path), 'r')
+                self._table = pa_ipc.open_file(source).read_all()
+            else:
+                self._table = pd.read_pickle(self.table_path)
+        return self._table
+
+    # ------------------------------------------------------------------
+    # 조회 API
+    # ------------------------------------------------------------------
+    @property
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        """매장코드 → (시작 행, 행 수)"""
+        self.ensure()
+        return self._index
+
+    @property
+    def store_codes(self):
+        """캐시에 있는 매장코드 목록 (정렬됨)"""
+        return list(self.index.keys())
+
+    @property
+    def columns(self):
+        """컬럼 목록"""
+        self.ensure()
+        table = self._open_table()
+        return list(table.column_names) if PYARROW_AVAILABLE else list(table.columns)
+
+    def __contains__(self, store_code: str) -> bool:
+        return store_code in self.index
+
+    def get_store(self, store_code: str) -> pd.DataFrame:
+        """한 매장의 행만 슬라이스하여 반환 (없으면 빈 DataFrame)"""
+        span = self.index.get(store_code)
+        table = self._open_table()
+        if span is None:
+            if PYARROW_AVAILABLE:
+                return table.slice(0, 0).to_pandas()
+            return table.iloc[0:0].copy()
+
+        start, length = span
+        if PYARROW_AVAILABLE:
+            return table.slice(start, length).to_pandas()
+        return table.iloc[start:start + length].reset_index(drop=True)
+
+    def get_first_value(self, store_code: str, column: str) -> Any:
+        """한 매장의 첫 행에서 특정 컬럼 값 조회 (주소 등)"""
+        span = self.index.get(store_code)
+        if span is None:
+            return None
+        table = self._open_table()
+        if PYARROW_AVAILABLE:
+            if column not in table.column_names:
+                return None
+            return table.column(column)[span[0]].as_py()
+        if column not in table.columns:
+            return None
+        return table[column].iloc[span[0]]
+
+    def fingerprint(self, store_code: str) -> Optional[str]:
+        """
+        한 매장 분석 입력의 해시 (매장 행 + 상권/업종 집계 테이블)
+
+        다른 매장 행만 바뀌어도 집계가 달라지면 값이 바뀜 (비교 지표가 집계에 의존)
+        """
+        if store_code not in self:
+            return None
+        self.ensure()
+        rows = pd.util.hash_pandas_object(self.get_store(store_code), index=False)
+        digest = hashlib.sha256(rows.to_numpy().tobytes())
+        digest.update(_file_sha256(self.aggregates_path).encode('ascii'))
+        return digest.hexdigest()
+
+    @property
+    def aggregates(self) -> StoreAggregates:
+        """상권/업종별 사전 집계 테이블"""
+        if self._aggregates is None:
+            self.ensure()
+            with open(self.aggregates_path, 'r', encoding='utf-8') as f:
+                self._aggregates = StoreAggregates(json.load(f))
+        return self._aggregates
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """전체 테이블 (업종/상권 비교용, 프로세스당 한 번만 변환)"""
+        if self._frame is None:
+            self.ensure()
+            table = self._open_table()
+            self._frame = table.to_pandas() if PYARROW_AVAILABLE else table
+        return self._frame
+
+
+# 경로별 싱글톤 인스턴스
+_store_tables: Dict[str, StoreTable] = {}
+
+
+def get_store_table(csv_path: Optional[str] = None) -> StoreTable:
+    """Get cached StoreTable instance for the given CSV path"""
+    key = str((Path(csv_path) if csv_path else _default_csv_path()).resolve())
+    table = _store_tables.get(key)
+    if table is None:
+        table = StoreTable(key)
+        _store_tables[key] = table
+    return table.ensure()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store_table = StoreTable(sys.argv[1] if len(sys.argv) > 1 else None)
+    store_table.build()
+    print(f"[OK] {len(store_table.index)} stores cached: {store_table.table_path}")
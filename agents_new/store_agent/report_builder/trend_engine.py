@@ -0,0 +1,188 @@
+"""
+Trend Engine
+추세(OLS 기울기)·안정성(변동계수) 벡터 계산 - 시계열 여러 개를 한 번에 처리
+"""
+
+from typing import Dict, Any, List, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CODE_COLUMN = "코드"
+MONTH_COLUMN = "기준년월"
+
+# 라벨 기준 (StoreAgentModule 기존 기준과 동일)
+TREND_THRESHOLD = 0.1
+STABILITY_THRESHOLDS = [(0.1, "매우 안정적"), (0.2, "안정적"), (0.3, "보통")]
+INSUFFICIENT_LABEL = "데이터 부족"
+
+# 매장 매출 분석에서 추세/안정성을 보는 컬럼
+SALES_TREND_COLUMNS = ['매출금액', '매출건수', '유니크고객수', '객단가', '동종매출금액%', '동종매출건수%']
+RANK_TREND_COLUMNS = ['동종매출순위%', '동일상권매출순위%']
+
+
+# ----------------------------------------------------------------------
+# 행렬 계산
+# ----------------------------------------------------------------------
+def series_matrix(series_list: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    길이가 다른 시계열 목록 → (시계열 × 위치) 행렬 + 시계열별 길이
+
+    길이를 넘는 칸은 NaN으로 채우며, 계산 시 길이로 구분하므로 시계열 내부 결측과 섞이지 않음
+    """
+    lengths = np.array([len(values) for values in series_list], dtype=int)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(series_list), width), np.nan)
+    for row, values in enumerate(series_list):
+        matrix[row, :lengths[row]] = np.asarray(values, dtype=float)
+    return matrix, lengths
+
+
+def _valid_mask(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    return np.arange(matrix.shape[1])[None, :] < lengths[:, None]
+
+
+def ols_slopes(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    각 행의 위치(0, 1, ..., n-1)에 대한 1차 회귀 기울기
+
+    `np.polyfit(np.arange(n), y, 1)[0]`의 닫힌 식 - 내부에 결측이 있으면 polyfit처럼 NaN
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    positions = np.arange(matrix.shape[1], dtype=float)[None, :]
+    centered_x = np.where(_valid_mask(matrix, lengths), positions - (lengths[:, None] - 1) / 2, 0.0)
+    y = np.where(_valid_mask(matrix, lengths), matrix, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_mean = y.sum(axis=1) / lengths
+        sxy = (centered_x * (y - y_mean[:, None])).sum(axis=1)
+        sxx = lengths * (lengths ** 2 - 1) / 12
+        slopes = sxy / sxx
+    slopes[lengths < 2] = np.nan
+    return slopes
+
+
+def coefficients_of_variation(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    각 행의 변동계수 (표본표준편차 / 평균, 결측 제외 - pandas std/mean과 동일)
+
+    평균이 0이면 inf
+    """
+    values = np.where(_valid_mask(matrix, lengths), matrix, np.nan)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(present, values, 0.0).sum(axis=1) / counts
+        squares = np.where(present, (values - means[:, None]) ** 2, 0.0).sum(axis=1)
+        stds = np.sqrt(squares / (counts - 1))
+        stds[counts < 2] = np.nan
+        cvs = np.where(means != 0, stds / means, np.inf)
+    return cvs
+
+
+# ----------------------------------------------------------------------
+# 라벨
+# ----------------------------------------------------------------------
+def trend_labels(slopes: np.ndarray, lengths: np.ndarray) -> List[str]:
+    """기울기 → 추세 라벨 (상승/하락/안정)"""
+    labels = np.select([slopes > TREND_THRESHOLD, slopes < -TREND_THRESHOLD],
+                       ["상승 추세", "하락 추세"], "안정 추세")
+    return np.where(np.asarray(lengths) < 2, INSUFFICIENT_LABEL, labels).tolist()
+
+
+def rank_trend_labels(slopes: np.ndarray, lengths: np.ndarray) -> List[str]:
+    """순위 기울기 → 추세 라벨 (순위%는 낮을수록 좋음)"""
+    labels = np.select([slopes > TREND_THRESHOLD, slopes < -TREND_THRESHOLD],
+                       ["순위 하락 (악화)", "순위 상승 (개선)"], "순위 안정")
+    return np.where(np.asarray(lengths) < 2, INSUFFICIENT_LABEL, labels).tolist()
+
+
+def stability_labels(cvs: np.ndarray, lengths: np.ndarray) -> List[str]:
+    """변동계수 → 안정성 라벨"""
+    labels = np.select([cvs < limit for limit, _ in STABILITY_THRESHOLDS],
+                       [label for _, label in STABILITY_THRESHOLDS], "불안정")
+    return np.where(np.asarray(lengths) < 2, INSUFFICIENT_LABEL, labels).tolist()
+
+
+def trend_label(slope: float) -> str:
+    """단일 기울기 → 추세 라벨"""
+    return trend_labels(np.array([slope], dtype=float), np.array([2]))[0]
+
+
+# ----------------------------------------------------------------------
+# 조회 API
+# ----------------------------------------------------------------------
+def series_stats(series_list: Sequence[Sequence[float]]) -> Dict[str, List[Any]]:
+    """시계열 목록의 기울기/변동계수/라벨을 한 번에 계산"""
+    matrix, lengths = series_matrix(series_list)
+    slopes = ols_slopes(matrix, lengths)
+    cvs = coefficients_of_variation(matrix, lengths)
+    return {
+        "points": lengths.tolist(),
+        "slope": slopes.tolist(),
+        "cv": cvs.tolist(),
+        "trend": trend_labels(slopes, lengths),
+        "rank_trend": rank_trend_labels(slopes, lengths),
+        "stability": stability_labels(cvs, lengths),
+    }
+
+
+def frame_stats(df: pd.DataFrame, columns: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """한 매장(정렬된 DataFrame)의 여러 컬럼 통계를 한 번에 계산 → 컬럼별 dict"""
+    matrix = df[list(columns)].to_numpy(dtype=float).T
+    lengths = np.full(len(columns), len(df), dtype=int)
+    slopes = ols_slopes(matrix, lengths)
+    cvs = coefficients_of_variation(matrix, lengths)
+    trends = trend_labels(slopes, lengths)
+    rank_trends = rank_trend_labels(slopes, lengths)
+    stabilities = stability_labels(cvs, lengths)
+    return {
+        col: {
+            "points": int(lengths[i]),
+            "slope": float(slopes[i]),
+            "cv": float(cvs[i]),
+            "trend": trends[i],
+            "rank_trend": rank_trends[i],
+            "stability": stabilities[i],
+        }
+        for i, col in enumerate(columns)
+    }
+
+
+def compute_store_trends(frame: pd.DataFrame,
+                         columns: Sequence[str] = SALES_TREND_COLUMNS,
+                         rank_columns: Sequence[str] = RANK_TREND_COLUMNS,
+                         key: str = CODE_COLUMN,
+                         order_by: str = MONTH_COLUMN) -> pd.DataFrame:
+    """
+    전체 테이블의 (매장, 지표)별 추세/안정성을 한 번에 계산
+
+    매장 × 월 × 지표 텐서를 만들어 기울기/변동계수를 벡터로 계산.
+    반환: 매장코드 인덱스, 컬럼 `points`, `{지표}_slope`, `{지표}_cv`, `{지표}_trend`, `{지표}_stability`
+    (순위 지표는 `{지표}_trend`에 순위 라벨)
+    """
+    metrics = list(columns) + list(rank_columns)
+    ordered = frame.sort_values([key, order_by], kind='mergesort')
+    codes, store_idx = np.unique(ordered[key].astype(str).to_numpy(), return_inverse=True)
+    position = ordered.groupby(key, sort=False).cumcount().to_numpy()
+    lengths = np.bincount(store_idx, minlength=len(codes))
+    width = int(lengths.max()) if len(lengths) else 0
+
+    result = pd.DataFrame(index=pd.Index(codes, name=key))
+    result["points"] = lengths
+    for metric in metrics:
+        matrix = np.full((len(codes), width), np.nan)
+        matrix[store_idx, position] = ordered[metric].to_numpy(dtype=float)
+        slopes = ols_slopes(matrix, lengths)
+        cvs = coefficients_of_variation(matrix, lengths)
+        result[f"{metric}_slope"] = slopes
+        result[f"{metric}_cv"] = cvs
+        if metric in rank_columns:
+            result[f"{metric}_trend"] = rank_trend_labels(slopes, lengths)
+        else:
+            result[f"{metric}_trend"] = trend_labels(slopes, lengths)
+        result[f"{metric}_stability"] = stability_labels(cvs, lengths)
+    logger.info(f"추세 테이블 계산 완료: {len(codes)} 매장 × {len(metrics)} 지표")
+    return result
@@ -6,12 +6,16 @@ import asyncio
 import json
 import shutil
 import os
+import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
 from wrappers.marketplace_wrapper import run_marketplace_analysis
 from wrappers.data_loader import get_data_loader
-from utils.gemini_client import get_gemini_client
+
+# Gemini 클라이언트는 다른 호출부와 같은 패키지 경로로 import (설정/연결 풀/전역 클라이언트 공유)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agents_new.utils.gemini_client import get_gemini_client
 
 
 class UltraSimpleAgent:
@@ -670,7 +674,7 @@ class UltraSimpleAgent:
 """
         
         try:
-            response = self.gemini.chat_completion_json(
+            response = await self.gemini.achat_completion_json(
                 messages=[{"role": "user", "content": prompt}],
                 model="gemini-2.0-flash-exp",
                 temperature=0.3
@@ -0,0 +1,143 @@
+"""
+내용 주소 방식 산출물 저장소
+- 파일은 sha256 기준으로 저장소(.artifacts/objects)에 한 번만 기록
+- 결과 폴더에는 저장소 객체의 하드링크를 배치 (디스크 사용량/쓰기 I/O는 새 데이터에만 비례)
+- 하드링크가 불가능한 경우(다른 드라이브, 지원하지 않는 파일시스템)에는 복사로 대체
+- 연결된 결과 파일은 읽기 전용으로 취급 (제자리 수정 시 같은 객체를 공유하는 다른 결과에도 반영됨)
+"""
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .instrumentation import span
+except ImportError:
+    from instrumentation import span
+
+# 프로젝트 루트
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DEFAULT_STORE_DIR = PROJECT_ROOT / ".artifacts"
+HASH_CHUNK = 1 << 20
+
+
+class ArtifactStore:
+    """sha256 → objects/ab/abcdef... 파일, 결과 폴더에는 하드링크"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or os.getenv('ARTIFACT_STORE_DIR') or DEFAULT_STORE_DIR)
+        self.objects = self.root / "objects"
+        # (장치, inode, mtime, 크기) → 해시: 같은 파일/하드링크는 다시 읽지 않음
+        self._digests: Dict[Tuple[int, int, int, int], str] = {}
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "stored_bytes": 0, "linked": 0, "copied": 0}
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> Tuple[int, int, int, int]:
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    def digest(self, path: Path) -> str:
+        """파일 sha256 (같은 inode·mtime·크기면 재사용)"""
+        key = self._stat_key(os.stat(path))
+        with self._lock:
+            cached = self._digests.get(key)
+        if cached:
+            return cached
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                sha.update(chunk)
+        value = sha.hexdigest()
+        with self._lock:
+            self._digests[key] = value
+        return value
+
+    def put(self, src: Path) -> Path:
+        """파일을 저장소에 등록 (이미 있으면 쓰지 않음) → 객체 경로"""
+        src = Path(src)
+        digest = self.digest(src)
+        obj = self._object_path(digest)
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copy2(src, tmp)
+            os.replace(tmp, obj)
+            with self._lock:
+                self.stats["stored"] += 1
+                self.stats["stored_bytes"] += obj.stat().st_size
+        with self._lock:
+            self._digests[self._stat_key(obj.stat())] = digest
+        return obj
+
+    def link(self, src: Path, dest: Path) -> Path:
+        """
+        src 내용을 dest에 배치 (저장소 객체의 하드링크, 불가능하면 복사)
+
+        dest가 이미 같은 객체를 가리키면 아무것도 하지 않음
+        """
+        src, dest = Path(src), Path(dest)
+        with span("artifact.link", "io", file=dest.name) as current:
+            obj = self.put(src)
+            current.set(bytes=obj.stat().st_size)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                if dest.exists() and os.path.samefile(obj, dest):
+                    current.set(mode="existing")
+                    return dest
+            except OSError:
+                pass
+
+            tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                os.link(obj, tmp)
+                counter = "linked"
+            except OSError:
+                shutil.copy2(obj, tmp)
+                counter = "copied"
+            os.replace(tmp, dest)
+            current.set(mode=counter)
+        with self._lock:
+            self.stats[counter] += 1
+        return dest
+
+    def link_tree(self, src_dir: Path, dest_dir: Path) -> List[Path]:
+        """폴더 전체 배치 (shutil.copytree(..., dirs_exist_ok=True) 대체)"""
+        src_dir, dest_dir = Path(src_dir), Path(dest_dir)
+        placed = []
+        for root, _, files in os.walk(src_dir):
+            for name in files:
+                src = Path(root) / name
+                placed.append(self.link(src, dest_dir / src.relative_to(src_dir)))
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        return placed
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """프로세스 공용 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
+
+
+def link_file(src, dest) -> Path:
+    """shutil.copy2(src, dest) 대체 - dest가 폴더면 같은 파일명으로 배치"""
+    dest = Path(dest)
+    if dest.is_dir():
+        dest = dest / Path(src).name
+    return get_artifact_store().link(Path(src), dest)
+
+
+def link_tree(src_dir, dest_dir) -> List[Path]:
+    """shutil.copytree(src_dir, dest_dir, dirs_exist_ok=True) 대체"""
+    return get_artifact_store().link_tree(Path(src_dir), Path(dest_dir))
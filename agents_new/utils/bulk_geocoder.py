@@ -0,0 +1,244 @@
+"""
+일괄 지오코딩
+- 매장 테이블 주소 → 정규화 후 중복 제거 → 캐시/오프라인 색인에 있는 주소 제외
+- 나머지는 비동기 HTTP(연결 풀) + 토큰 버킷 속도 제한 + 동시 요청 수 제한 + 재시도
+- 결과는 일정 건수마다 지오코딩 캐시(SQLite)에 한 번에 기록 → 중단 후 재실행하면 이어서 진행
+- --google-url / --kakao-url로 로컬 스텁 서버(geocode_stub_server.py)에 붙여 테스트 가능
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+
+try:
+    from .geocoding import (Coordinates, GeocodingError, GeocodeCache, get_geocode_cache, normalize_address,
+                            parse_google_response, parse_kakao_response,
+                            GOOGLE_GEOCODE_URL, KAKAO_ADDRESS_URL)
+    from .offline_geocoder import get_offline_geocoder, DEFAULT_STORE_CSV
+except ImportError:
+    from geocoding import (Coordinates, GeocodingError, GeocodeCache, get_geocode_cache, normalize_address,
+                           parse_google_response, parse_kakao_response,
+                           GOOGLE_GEOCODE_URL, KAKAO_ADDRESS_URL)
+    from offline_geocoder import get_offline_geocoder, DEFAULT_STORE_CSV
+
+ADDRESS_COLUMN = '기준면적'
+
+DEFAULT_RATE = 10.0          # 초당 요청 수
+DEFAULT_CONCURRENCY = 8      # 동시 요청 수 (= 연결 풀 크기)
+DEFAULT_RETRIES = 3
+DEFAULT_CHECKPOINT_EVERY = 50
+BACKOFF_BASE_SEC = 0.5
+REQUEST_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+
+
+class TokenBucket:
+    """토큰 버킷 속도 제한 (초당 rate개 보충, 최대 burst개 누적)"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ----------------------------------------------------------------------
+# 제공자별 요청
+# ----------------------------------------------------------------------
+def _google_request(address: str, api_key: str, url: str) -> Dict[str, Any]:
+    return {"url": url, "params": {"address": address, "key": api_key}}
+
+
+def _kakao_request(address: str, api_key: str, url: str) -> Dict[str, Any]:
+    return {"url": url, "params": {"query": address}, "headers": {"Authorization": f"KakaoAK {api_key}"}}
+
+
+PROVIDERS = {
+    "google": (_google_request, parse_google_response, GOOGLE_GEOCODE_URL, 'GOOGLE_API_KEY'),
+    "kakao": (_kakao_request, parse_kakao_response, KAKAO_ADDRESS_URL, 'KAKAO_REST_API_KEY'),
+}
+
+
+async def _geocode_one(client: httpx.AsyncClient, bucket: TokenBucket, provider: str,
+                       address: str, api_key: str, url: str, retries: int) -> Optional[Coordinates]:
+    """주소 1건 (재시도 가능한 오류는 지수 백오프 후 재시도, 끝까지 실패하면 GeocodingError)"""
+    build_request, parse_response, _, _ = PROVIDERS[provider]
+    request = build_request(address, api_key, url)
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            response = await client.get(request["url"], params=request["params"], headers=request.get("headers"))
+            data = response.json() if response.status_code == 200 else {}
+            return parse_response(response.status_code, data)
+        except (httpx.HTTPError, ValueError) as e:
+            error = GeocodingError(f"{provider} 요청 실패: {e}")
+        except GeocodingError as e:
+            error = e
+        if not error.retryable or attempt == retries:
+            raise error
+        await asyncio.sleep(BACKOFF_BASE_SEC * (2 ** attempt) * (0.5 + random.random()))
+
+
+# ----------------------------------------------------------------------
+# 대상 주소
+# ----------------------------------------------------------------------
+def load_store_addresses(data_path: Optional[str] = None) -> List[str]:
+    """매장 테이블의 주소 목록 (원본 표기, 등장 순서)"""
+    data_path = Path(data_path) if data_path else DEFAULT_STORE_CSV
+    addresses = pd.read_csv(data_path, usecols=[ADDRESS_COLUMN])[ADDRESS_COLUMN].dropna().astype(str)
+    return addresses.tolist()
+
+
+def plan_addresses(addresses: List[str], provider: str,
+                   cache: GeocodeCache, use_offline: bool = True) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    정규화 키 기준 중복 제거 후 캐시/오프라인 색인에 없는 주소만 선별
+
+    반환: ({정규화 키: 요청에 쓸 원본 주소}, 집계)
+    """
+    unique: Dict[str, str] = {}
+    for address in addresses:
+        key = normalize_address(address)
+        if key and key not in unique:
+            unique[key] = address
+
+    offline = get_offline_geocoder() if use_offline else None
+    pending: Dict[str, str] = {}
+    cached = offline_hits = 0
+    for key, address in unique.items():
+        hit, _ = cache.lookup(key, [provider])
+        if hit:
+            cached += 1
+        elif offline is not None and offline.lookup(address):
+            offline_hits += 1
+        else:
+            pending[key] = address
+    stats = {"addresses": len(addresses), "unique": len(unique), "cached": cached,
+             "offline": offline_hits, "pending": len(pending)}
+    return pending, stats
+
+
+# ----------------------------------------------------------------------
+# 일괄 실행
+# ----------------------------------------------------------------------
+async def geocode_bulk(pending: Dict[str, str], provider: str = "google",
+                       api_key: Optional[str] = None, url: Optional[str] = None,
+                       rate: float = DEFAULT_RATE, burst: Optional[int] = None,
+                       concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+                       checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+                       cache: Optional[GeocodeCache] = None) -> Dict[str, Any]:
+    """
+    {정규화 키: 주소} 일괄 지오코딩 → 캐시에 기록
+
+    성공/주소 없음은 checkpoint_every건마다 캐시에 저장, 끝까지 실패한 주소는 저장하지 않음(다음 실행에서 재시도)
+    """
+    cache = cache or get_geocode_cache()
+    _, _, default_url, key_env = PROVIDERS[provider]
+    api_key = api_key or os.getenv(key_env) or ""
+    url = url or default_url
+
+    bucket = TokenBucket(rate, burst)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    summary = {"requested": len(pending), "found": 0, "not_found": 0, "failed": 0, "failures": []}
+    buffer: List[Tuple[str, str, str, Optional[Coordinates]]] = []
+
+    def flush():
+        if buffer:
+            cache.store_many(buffer)
+            buffer.clear()
+
+    async def worker(key: str, address: str):
+        async with semaphore:
+            try:
+                coords = await _geocode_one(client, bucket, provider, address, api_key, url, retries)
+            except GeocodingError as e:
+                return key, address, None, str(e)
+            return key, address, coords, None
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        tasks = [asyncio.create_task(worker(key, address)) for key, address in pending.items()]
+        try:
+            for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                key, address, coords, error = await task
+                if error:
+                    summary["failed"] += 1
+                    summary["failures"].append({"address": address, "error": error})
+                else:
+                    summary["found" if coords else "not_found"] += 1
+                    buffer.append((key, provider, address, coords))
+                if len(buffer) >= checkpoint_every:
+                    flush()
+                    print(f"[일괄 지오코딩] 진행 {done}/{len(tasks)} (실패 {summary['failed']})")
+        finally:
+            # 중단되어도 받은 결과는 기록
+            flush()
+            for task in tasks:
+                task.cancel()
+
+    summary["elapsed_sec"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def run_bulk_geocode(data_path: Optional[str] = None, provider: str = "google",
+                     use_offline: bool = True, limit: Optional[int] = None, **options) -> Dict[str, Any]:
+    """매장 테이블 주소 일괄 지오코딩 (캐시/오프라인 색인에 있는 주소는 요청하지 않음)"""
+    cache = options.get("cache") or get_geocode_cache()
+    options["cache"] = cache
+    pending, stats = plan_addresses(load_store_addresses(data_path), provider, cache, use_offline)
+    if limit is not None:
+        pending = dict(list(pending.items())[:limit])
+    print(f"[일괄 지오코딩] 주소 {stats['addresses']}건 → 고유 {stats['unique']}건 "
+          f"(캐시 {stats['cached']}, 오프라인 {stats['offline']}), 요청 {len(pending)}건")
+    if not pending:
+        return {**stats, "requested": 0}
+    summary = asyncio.run(geocode_bulk(pending, provider, **options))
+    return {**stats, **summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="매장 주소 일괄 지오코딩 (결과는 지오코딩 캐시에 저장)")
+    parser.add_argument("--data-path", default=None, help="final_merged_data.csv 경로")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="google")
+    parser.add_argument("--api-key", default=None, help="API 키 (기본: GOOGLE_API_KEY / KAKAO_REST_API_KEY)")
+    parser.add_argument("--google-url", default=None, help="구글 지오코딩 URL (스텁 서버 테스트용)")
+    parser.add_argument("--kakao-url", default=None, help="카카오 주소 검색 URL (스텁 서버 테스트용)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="초당 최대 요청 수")
+    parser.add_argument("--burst", type=int, default=None, help="토큰 버킷 크기 (기본: rate)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="재시도 횟수")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help="캐시에 기록할 결과 묶음 크기")
+    parser.add_argument("--no-offline", action="store_true", help="오프라인 색인에 있는 주소도 요청")
+    parser.add_argument("--limit", type=int, default=None, help="이번 실행에서 요청할 최대 주소 수")
+    args = parser.parse_args()
+
+    url = args.google_url if args.provider == "google" else args.kakao_url
+    summary = run_bulk_geocode(args.data_path, args.provider, use_offline=not args.no_offline,
+                               limit=args.limit, api_key=args.api_key, url=url, rate=args.rate,
+                               burst=args.burst, concurrency=args.concurrency, retries=args.retries,
+                               checkpoint_every=args.checkpoint_every)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
 """
 Gemini API Client using OpenAI Compatibility Layer
 Reference: https://ai.google.dev/gemini-api/docs/openai
+
+- 비동기 API(achat_completion 등)는 AsyncOpenAI로 직접 호출 (스레드 풀을 거치지 않음)
+- HTTP 연결은 프로세스 공용 keep-alive 풀 사용 (GEMINI_MAX_CONNECTIONS로 최대 연결 수 조절)
+    비동기 풀은 이벤트 루프마다 하나 (httpx 연결은 만든 루프에서만 사용 가능, asyncio.run 종료 시 루프가 닫히기 전에 닫음)
+- 모듈은 agents_new.utils.gemini_client로 import (먼저 로드되어 있으면 utils 경로의 `import gemini_client`도 같은 모듈)
+- env 파일과 키/엔드포인트 설정은 한 번만 읽고, 바뀐 키를 반영하려면 refresh_gemini_settings() 호출
+- 동기 API(chat_completion 등)는 같은 요청 구성/응답 처리를 쓰는 얇은 래퍼 (기존 호출부 그대로 동작)
 """
 import os
+import sys
 import asyncio
+import threading
+from dataclasses import dataclass
 from types import SimpleNamespace
-from typing import Optional, List, Dict, Any
-from openai import OpenAI
+from typing import Optional, List, Dict, Any, AsyncGenerator
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+import httpx
 from dotenv import load_dotenv
 from pathlib import Path
 
-# 환경변수 로드 (최신 키 사용을 위해 매번 로드)
+# 파이프라인 계측 (다른 모듈과 같은 instrumentation 모듈을 쓰도록 utils 경로 기준으로 import)
+sys.path.insert(0, str(Path(__file__).parent))
+from instrumentation import span, record_usage
+
+# 환경변수 로드 (import 시 한 번, 키를 바꾼 뒤에는 refresh_gemini_settings()로 다시 로드)
 def load_env_with_override():
     try:
         # 프로젝트 루트의 env 파일 찾기
@@ -29,41 +44,181 @@ def load_env_with_override():
 
 load_env_with_override()
 
+# OpenAI 호환 엔드포인트 (GEMINI_BASE_URL로 로컬 스텁 서버 등으로 교체 가능)
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+# 연결 풀 최대 연결 수 (동시 호출 수 상한, 초과 호출은 풀에서 대기)
+DEFAULT_MAX_CONNECTIONS = 20
+
+
+@dataclass(frozen=True)
+class GeminiSettings:
+    """환경변수에서 한 번 읽은 클라이언트 설정"""
+    api_key: Optional[str]
+    base_url: str
+    max_connections: int
+    model: str
+    thinking_model: str
+
+
+_settings: Optional[GeminiSettings] = None
+_settings_lock = threading.Lock()
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        print(f"[WARN] {name} is not an integer, using {default}")
+        return default
+
+
+def get_gemini_settings() -> GeminiSettings:
+    """현재 설정 (최초 호출 시 환경변수에서 읽음)"""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = GeminiSettings(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                base_url=os.getenv("GEMINI_BASE_URL") or DEFAULT_BASE_URL,
+                max_connections=_int_env("GEMINI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS),
+                # Default model: prefer 2.5, allow env override
+                model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+                thinking_model=os.getenv("GEMINI_THINKING_MODEL", "gemini-2.5-flash-thinking"),
+            )
+        return _settings
+
+
+def refresh_gemini_settings() -> GeminiSettings:
+    """env 파일을 다시 읽어 설정 갱신 (연결 풀은 새 설정으로 다시 생성)"""
+    global _settings
+    load_env_with_override()
+    with _settings_lock:
+        _settings = None
+    _reset_http_pools()
+    return get_gemini_settings()
+
+
+# ----------------------------------------------------------------------
+# 공용 HTTP 연결 풀
+# ----------------------------------------------------------------------
+_sync_http: Optional[httpx.Client] = None
+_async_http: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+# 루프별 풀 정리용 제너레이터 (루프는 약한 참조로만 들고 있으므로 여기서 보관)
+_loop_closers: Dict[asyncio.AbstractEventLoop, List[AsyncGenerator]] = {}
+_http_lock = threading.Lock()
+
+
+def _for_loop(clients: Dict[asyncio.AbstractEventLoop, Any], loop: asyncio.AbstractEventLoop, create):
+    """루프별 객체 조회/생성 - 닫힌 루프의 항목은 버림 (연결 풀은 루프 종료 단계에서 이미 닫힘)"""
+    client = clients.get(loop)
+    if client is None:
+        for closed in [other for other in clients if other.is_closed()]:
+            del clients[closed]
+        client = clients[loop] = create()
+    return client
+
+
+def _limits() -> httpx.Limits:
+    max_connections = get_gemini_settings().max_connections
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def _shared_sync_http() -> httpx.Client:
+    """동기 호출용 공용 연결 풀"""
+    global _sync_http
+    with _http_lock:
+        if _sync_http is None:
+            _sync_http = DefaultHttpxClient(limits=_limits())
+        return _sync_http
+
+
+async def _close_at_loop_shutdown(pool: httpx.AsyncClient):
+    """
+    루프 종료 단계(asyncio.run의 shutdown_asyncgens)에서 풀 닫기
+
+    닫힌 루프에서는 연결을 닫을 수 없으므로(transport.close가 루프에 콜백을 등록) 루프가 살아 있을 때 닫음
+    AsyncOpenAI 객체는 이 풀을 빌려 쓰기만 하므로 풀을 닫으면 함께 정리됨
+    """
+    try:
+        yield
+    finally:
+        await pool.aclose()
+
+
+def _new_async_pool(loop: asyncio.AbstractEventLoop) -> httpx.AsyncClient:
+    pool = DefaultAsyncHttpxClient(limits=_limits())
+    closer = _close_at_loop_shutdown(pool)
+    # 첫 yield까지 진행해 두면 루프가 종료 시 aclose() 해 줌
+    asyncio.ensure_future(closer.__anext__(), loop=loop)
+    _for_loop(_loop_closers, loop, list).append(closer)
+    return pool
+
+
+def _shared_async_http() -> httpx.AsyncClient:
+    """현재 이벤트 루프의 공용 연결 풀"""
+    loop = asyncio.get_running_loop()
+    with _http_lock:
+        return _for_loop(_async_http, loop, lambda: _new_async_pool(loop))
+
+
+def _reset_http_pools():
+    """
+    설정 갱신 시 이후 생성되는 클라이언트가 새 풀을 쓰도록 교체 (기존 클라이언트는 이전 풀을 계속 사용)
+
+    이전 비동기 풀도 _loop_closers에 남아 있어 루프 종료 시 닫힘
+    """
+    global _sync_http
+    with _http_lock:
+        _sync_http = None
+        _async_http.clear()
+
 
 class GeminiClient:
     """Gemini API client using OpenAI compatibility"""
-    
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize Gemini client with OpenAI compatibility layer
-        
+
         Args:
             api_key: Gemini API key (defaults to GEMINI_API_KEY env var)
         """
-        # 환경변수 다시 로드하여 최신 키 사용
-        load_env_with_override()
-        
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        
+        self.settings = get_gemini_settings()
+        self.api_key = api_key or self.settings.api_key
+
         if not self.api_key:
             raise ValueError(
                 "GEMINI_API_KEY not found. Please set it in .env file or pass as parameter"
             )
-        
+
         # API 키 로드 확인을 위한 로깅
         print(f"[GeminiClient] Using API key: {self.api_key[:20]}...")
-        
-        # Initialize OpenAI client with Gemini endpoint
+
+        # Initialize OpenAI client with Gemini endpoint (공용 연결 풀 사용)
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+            base_url=self.settings.base_url,
+            http_client=_shared_sync_http()
         )
+        self._async_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAI] = {}
+        self._async_lock = threading.Lock()
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """현재 이벤트 루프용 AsyncOpenAI (루프마다 하나, 연결 풀은 루프별 공용 풀)"""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            return _for_loop(self._async_clients, loop, lambda: AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.settings.base_url,
+                http_client=_shared_async_http()
+            ))
 
     async def generate_content_async(self, prompt: str, *, json_only: bool = True, **kwargs) -> Any:
         """
         Async helper matching google-generativeai-style API used in agents.
 
-        - Wraps chat completion call in a thread to avoid blocking.
+        - Calls the async chat completion directly (no worker thread).
         - Optionally enforces JSON-only responses to simplify downstream parsing.
 
         Returns an object with a `.text` attribute containing the model output.
@@ -75,19 +230,167 @@ class GeminiClient:
         )
         user = prompt if not json_only else f"{prompt}\n\nReturn only valid JSON. No code fences."
 
-        def _call() -> str:
-            return self.chat_completion(
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-                **kwargs,
-            )
-
-        content = await asyncio.to_thread(_call)
+        content = await self.achat_completion(
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            **kwargs,
+        )
         # Match expected interface: object with `.text`
         return SimpleNamespace(text=content or "")
-        
+
+    # ------------------------------------------------------------------
+    # 요청 구성 / 응답 처리 (동기·비동기 공용)
+    # ------------------------------------------------------------------
+    def _chat_params(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        reasoning_effort: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        params = {
+            "model": model or self.settings.model,
+            "messages": messages,
+            "temperature": temperature,
+        }
+
+        if max_tokens:
+            params["max_tokens"] = max_tokens
+
+        if reasoning_effort:
+            params["reasoning_effort"] = reasoning_effort
+
+        params.update(kwargs)
+        return params
+
+    @staticmethod
+    def _chat_content(response) -> str:
+        content = response.choices[0].message.content
+
+        # 빈 응답 체크
+        if content is None or content.strip() == "":
+            raise RuntimeError("Gemini returned empty response")
+
+        return content
+
+    @staticmethod
+    def _with_json_instruction(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        # Add JSON instruction to system message
+        if messages and messages[0].get("role") == "system":
+            messages[0]["content"] += "\n\nIMPORTANT: Respond with valid JSON only. No markdown, no explanations."
+        else:
+            messages.insert(0, {
+                "role": "system",
+                "content": "You are a helpful assistant that responds in valid JSON format only. No markdown, no explanations."
+            })
+        return messages
+
+    def _thinking_params(
+        self,
+        messages: List[Dict[str, str]],
+        thinking_budget: Optional[int],
+        include_thoughts: bool,
+        model: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        extra_body = {}
+
+        if thinking_budget is not None:
+            extra_body = {
+                'google': {
+                    'thinking_config': {
+                        'thinking_budget': thinking_budget,
+                        'include_thoughts': include_thoughts
+                    }
+                }
+            }
+
+        params = {
+            # Default thinking model (allow env override or fallback)
+            "model": model or self.settings.thinking_model,
+            "messages": messages,
+        }
+
+        if extra_body:
+            params["extra_body"] = extra_body
+
+        params.update(kwargs)
+        return params
+
+    @staticmethod
+    def _thinking_result(response, include_thoughts: bool) -> Dict[str, Any]:
+        result = {
+            "content": response.choices[0].message.content
+        }
+
+        # Extract thoughts if included
+        if include_thoughts and hasattr(response.choices[0].message, 'thoughts'):
+            result["thoughts"] = response.choices[0].message.thoughts
+
+        return result
+
+    # ------------------------------------------------------------------
+    # 비동기 API
+    # ------------------------------------------------------------------
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """chat_completion의 비동기 버전 (이벤트 루프를 막지 않음)"""
+        params = self._chat_params(messages, model, temperature, max_tokens, reasoning_effort, kwargs)
+        try:
+            with span("gemini.chat", "llm", model=params["model"]) as current:
+                response = await self.async_client.chat.completions.create(**params)
+                record_usage(current, response)
+            return self._chat_content(response)
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {str(e)}")
+
+    async def achat_completion_json(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        temperature: float = 0.7,
+        **kwargs
+    ) -> str:
+        """chat_completion_json의 비동기 버전"""
+        return await self.achat_completion(
+            messages=self._with_json_instruction(messages),
+            model=model,
+            temperature=temperature,
+            **kwargs
+        )
+
+    async def achat_completion_with_thinking(
+        self,
+        messages: List[Dict[str, str]],
+        thinking_budget: Optional[int] = None,
+        include_thoughts: bool = False,
+        model: str = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """chat_completion_with_thinking의 비동기 버전"""
+        params = self._thinking_params(messages, thinking_budget, include_thoughts, model, kwargs)
+        try:
+            with span("gemini.chat_thinking", "llm", model=params["model"]) as current:
+                response = await self.async_client.chat.completions.create(**params)
+                record_usage(current, response)
+            return self._thinking_result(response, include_thoughts)
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # 동기 API (기존 호출부용)
+    # ------------------------------------------------------------------
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -99,48 +402,27 @@ class GeminiClient:
     ) -> str:
         """
         Generate chat completion using Gemini
-        
+
         Args:
             messages: List of message dicts with 'role' and 'content'
-            model: Gemini model name (default: gemini-2.0-flash-exp)
+            model: Gemini model name (default: GEMINI_MODEL or gemini-2.5-flash)
             temperature: Sampling temperature (0-1)
             max_tokens: Maximum tokens to generate
             reasoning_effort: Thinking level - "low", "medium", "high", or None
             **kwargs: Additional parameters
-            
+
         Returns:
             Generated text response
         """
-        # Default model: prefer 2.5, allow env override
-        if model is None:
-            model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-
-        params = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-        }
-        
-        if max_tokens:
-            params["max_tokens"] = max_tokens
-            
-        if reasoning_effort:
-            params["reasoning_effort"] = reasoning_effort
-            
-        params.update(kwargs)
-        
+        params = self._chat_params(messages, model, temperature, max_tokens, reasoning_effort, kwargs)
         try:
-            response = self.client.chat.completions.create(**params)
-            content = response.choices[0].message.content
-            
-            # 빈 응답 체크
-            if content is None or content.strip() == "":
-                raise RuntimeError("Gemini returned empty response")
-            
-            return content
+            with span("gemini.chat", "llm", model=params["model"]) as current:
+                response = self.client.chat.completions.create(**params)
+                record_usage(current, response)
+            return self._chat_content(response)
         except Exception as e:
             raise RuntimeError(f"Gemini API error: {str(e)}")
-    
+
     def chat_completion_json(
         self,
         messages: List[Dict[str, str]],
@@ -150,32 +432,23 @@ class GeminiClient:
     ) -> str:
         """
         Generate JSON-formatted response
-        
+
         Args:
             messages: List of message dicts
             model: Gemini model name
             temperature: Sampling temperature
             **kwargs: Additional parameters
-            
+
         Returns:
             JSON string response
         """
-        # Add JSON instruction to system message
-        if messages and messages[0].get("role") == "system":
-            messages[0]["content"] += "\n\nIMPORTANT: Respond with valid JSON only. No markdown, no explanations."
-        else:
-            messages.insert(0, {
-                "role": "system",
-                "content": "You are a helpful assistant that responds in valid JSON format only. No markdown, no explanations."
-            })
-        
         return self.chat_completion(
-            messages=messages,
+            messages=self._with_json_instruction(messages),
             model=model,
             temperature=temperature,
             **kwargs
         )
-    
+
     def chat_completion_with_thinking(
         self,
         messages: List[Dict[str, str]],
@@ -186,74 +459,53 @@ class GeminiClient:
     ) -> Dict[str, Any]:
         """
         Generate response with thinking/reasoning
-        
+
         Args:
             messages: List of message dicts
             thinking_budget: Exact thinking token budget (alternative to reasoning_effort)
             include_thoughts: Whether to include thought process in response
             model: Gemini thinking model name
             **kwargs: Additional parameters
-            
+
         Returns:
             Dict with 'content' and optionally 'thoughts'
         """
-        extra_body = {}
-        
-        if thinking_budget is not None:
-            extra_body = {
-                'google': {
-                    'thinking_config': {
-                        'thinking_budget': thinking_budget,
-                        'include_thoughts': include_thoughts
-                    }
-                }
-            }
-        
-        # Default thinking model (allow env override or fallback)
-        if model is None:
-            model = os.getenv("GEMINI_THINKING_MODEL", "gemini-2.5-flash-thinking")
-
-        params = {
-            "model": model,
-            "messages": messages,
-        }
-        
-        if extra_body:
-            params["extra_body"] = extra_body
-            
-        params.update(kwargs)
-        
+        params = self._thinking_params(messages, thinking_budget, include_thoughts, model, kwargs)
         try:
-            response = self.client.chat.completions.create(**params)
-            result = {
-                "content": response.choices[0].message.content
-            }
-            
-            # Extract thoughts if included
-            if include_thoughts and hasattr(response.choices[0].message, 'thoughts'):
-                result["thoughts"] = response.choices[0].message.thoughts
-                
-            return result
+            with span("gemini.chat_thinking", "llm", model=params["model"]) as current:
+                response = self.client.chat.completions.create(**params)
+                record_usage(current, response)
+            return self._thinking_result(response, include_thoughts)
         except Exception as e:
             raise RuntimeError(f"Gemini API error: {str(e)}")
 
 
 # Global client instance
 _global_client: Optional[GeminiClient] = None
+_global_lock = threading.Lock()
+
 
+def get_gemini_client(refresh: bool = False) -> GeminiClient:
+    """
+    Get or create global Gemini client instance
 
-def get_gemini_client() -> GeminiClient:
-    """Get or create global Gemini client instance (with fresh API key reload)"""
+    설정은 처음 한 번만 읽음 - env 파일의 API 키를 바꿨으면 refresh=True로 다시 로드
+    """
     global _global_client
-    
-    # 항상 새로운 환경변수로 클라이언트 재생성 (API 키 변경 대응)
-    load_env_with_override()
-    
-    # 클라이언트 강제 재생성 (API 키 변경 시 필요한 경우)
-    current_api_key = os.getenv("GEMINI_API_KEY")
-    if _global_client is None or (_global_client.api_key != current_api_key):
-        _global_client = GeminiClient()
-        print(f"[GeminiClient] Client refreshed with new API key")
-    
+
+    if refresh:
+        refresh_gemini_settings()
+
+    with _global_lock:
+        # 클라이언트 재생성 (처음 또는 설정이 갱신된 경우)
+        if _global_client is None or _global_client.settings is not get_gemini_settings():
+            _global_client = GeminiClient()
+            print(f"[GeminiClient] Client refreshed with new API key")
+
     return _global_client
 
+
+# 패키지 경로로 로드된 경우 utils 경로 이름(gemini_client)으로도 등록 → 이후 `import gemini_client`도 같은 모듈
+# (두 번 로드되면 설정/연결 풀/전역 클라이언트가 모듈마다 따로 생김, 호출부는 agents_new.utils.gemini_client로 import)
+if __name__ == "agents_new.utils.gemini_client":
+    sys.modules.setdefault("gemini_client", sys.modules[__name__])
@@ -0,0 +1,135 @@
+"""
+지오코딩 스텁 서버 (테스트/벤치마크용)
+- 구글 지오코딩(/maps/api/geocode/json)과 카카오 주소 검색(/v2/local/search/address.json) 응답 형식을 흉내냄
+- 좌표는 주소 해시로 성동구 범위 안에서 결정적으로 생성
+- 지연, 일시 오류(429/500), 주소 없음 비율 조절 가능
+
+    python geocode_stub_server.py --port 8765 --error-rate 0.1
+    python bulk_geocoder.py --google-url http://127.0.0.1:8765/maps/api/geocode/json
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+GOOGLE_PATH = "/maps/api/geocode/json"
+KAKAO_PATH = "/v2/local/search/address.json"
+
+# 성동구 대략 범위 (위도, 경도)
+LAT_RANGE = (37.530, 37.575)
+LON_RANGE = (127.010, 127.075)
+
+
+def stub_coordinates(address: str) -> Tuple[float, float]:
+    """주소 → 결정적 좌표"""
+    digest = hashlib.sha1(address.encode('utf-8')).digest()
+    u = int.from_bytes(digest[:4], 'big') / 2 ** 32
+    v = int.from_bytes(digest[4:8], 'big') / 2 ** 32
+    return (round(LAT_RANGE[0] + u * (LAT_RANGE[1] - LAT_RANGE[0]), 7),
+            round(LON_RANGE[0] + v * (LON_RANGE[1] - LON_RANGE[0]), 7))
+
+
+def _is_missing(address: str, not_found_rate: float) -> bool:
+    digest = hashlib.sha1(("missing:" + address).encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32 < not_found_rate
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # 기본 listen 대기열(5)을 넘는 동시 연결은 SYN이 버려져 클라이언트가 ~1초 뒤 재시도 → 처리량 측정이 왜곡됨
+    request_queue_size = 128
+
+
+class StubGeocodeHandler(BaseHTTPRequestHandler):
+    latency_sec = 0.0
+    error_rate = 0.0
+    not_found_rate = 0.0
+    stats = {"requests": 0, "errors": 0}
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with self._lock:
+            self.stats["requests"] += 1
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+
+        if random.random() < self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            self._send(random.choice([429, 500]), {"error": "stub transient error"})
+            return
+
+        if url.path == GOOGLE_PATH:
+            address = query.get('address', [''])[0]
+            if not address or _is_missing(address, self.not_found_rate):
+                self._send(200, {"status": "ZERO_RESULTS", "results": []})
+                return
+            lat, lng = stub_coordinates(address)
+            self._send(200, {"status": "OK", "results": [{
+                "formatted_address": address,
+                "geometry": {"location": {"lat": lat, "lng": lng}, "location_type": "ROOFTOP"},
+            }]})
+        elif url.path == KAKAO_PATH:
+            address = query.get('query', [''])[0]
+            if not address or _is_missing(address, self.not_found_rate):
+                self._send(200, {"meta": {"total_count": 0}, "documents": []})
+                return
+            lat, lng = stub_coordinates(address)
+            self._send(200, {"meta": {"total_count": 1}, "documents": [{
+                "address_name": address, "x": str(lng), "y": str(lat),
+            }]})
+        else:
+            self._send(404, {"error": "unknown path"})
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                      error_rate: float = 0.0, not_found_rate: float = 0.0) -> StubHTTPServer:
+    """백그라운드 스레드로 스텁 서버 시작 (port=0이면 빈 포트) → server.server_address로 주소 확인"""
+    handler = type("ConfiguredStubHandler", (StubGeocodeHandler,), {
+        "latency_sec": latency_ms / 1000, "error_rate": error_rate, "not_found_rate": not_found_rate,
+        "stats": {"requests": 0, "errors": 0},
+    })
+    server = StubHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지오코딩 스텁 서버 (구글/카카오 응답 형식)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="응답 지연 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 응답 비율")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="주소 없음 응답 비율 (주소별 고정)")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.latency_ms, args.error_rate, args.not_found_rate)
+    host, port = server.server_address[:2]
+    print(f"[스텁 서버] http://{host}:{port}{GOOGLE_PATH}")
+    print(f"[스텁 서버] http://{host}:{port}{KAKAO_PATH}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+공용 지오코딩 모듈
+- 주소 정규화 키 기준으로 결과를 SQLite에 영구 저장 (실행 간 / 모듈 간 공유)
+- 성공 결과와 "주소 없음" 결과를 각각 다른 TTL로 캐싱 (네트워크 오류는 캐싱하지 않음)
+- 프로세스 안에서는 LRU로 SQLite 조회도 생략
+- spatial_matcher(구글)와 panorama(카카오 → Nominatim)가 같은 캐시를 사용
+- 로컬 제공자(오프라인 주소 색인)는 캐싱 없이 HTTP 제공자보다 먼저 호출
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .instrumentation import traced
+except ImportError:
+    from instrumentation import traced
+
+# 프로젝트 루트
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "spatial_data" / ".cache" / "geocode.sqlite"
+
+POSITIVE_TTL_SEC = 180 * 24 * 3600   # 좌표는 거의 바뀌지 않음
+NEGATIVE_TTL_SEC = 24 * 3600         # 주소 없음은 하루 뒤 재시도
+LRU_SIZE = 1024
+
+# 환경변수로 로컬 스텁 서버(geocode_stub_server.py) 등으로 교체 가능
+GOOGLE_GEOCODE_URL = os.getenv('GOOGLE_GEOCODE_URL') or "https://maps.googleapis.com/maps/api/geocode/json"
+KAKAO_ADDRESS_URL = os.getenv('KAKAO_ADDRESS_URL') or "https://dapi.kakao.com/v2/local/search/address.json"
+
+# 캐싱하지 않는 로컬 제공자 (조회 비용이 캐시와 같고, 색인이 갱신되면 바로 반영)
+LOCAL_PROVIDERS = {"offline"}
+
+# 1이면 로컬 제공자만 사용 (네트워크 없이 실행/테스트)
+OFFLINE_ONLY_ENV = "GEOCODE_OFFLINE_ONLY"
+
+# 좌표는 항상 (위도, 경도)
+Coordinates = Tuple[float, float]
+# 제공자: 주소 → 좌표, 주소가 없으면 None, 일시적 오류는 예외
+Provider = Callable[[str], Optional[Coordinates]]
+
+
+class GeocodingError(Exception):
+    """일시적 지오코딩 실패 (네트워크/쿼터 등) - 캐싱하지 않음"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable   # False: 키/요청 오류처럼 재시도해도 같은 결과
+
+
+# ----------------------------------------------------------------------
+# 주소 정규화
+# ----------------------------------------------------------------------
+_SIDO_ALIASES = [
+    (re.compile(r'^서울(특별)?시\s*'), '서울 '),
+]
+
+
+def normalize_address(address: str) -> str:
+    """
+    캐시 키용 주소 정규화
+
+    전각/반각 통일, 쉼표·괄호 안 참고항목 제거, 공백 정리, 시도명 통일
+    예) "서울특별시  성동구 왕십리로 222 (사근동)" → "서울 성동구 왕십리로 222"
+    """
+    text = unicodedata.normalize('NFKC', str(address or ''))
+    text = re.sub(r'\([^)]*\)', ' ', text)
+    text = text.replace(',', ' ')
+    text = re.sub(r'\s+', ' ', text).strip()
+    for pattern, replacement in _SIDO_ALIASES:
+        text = pattern.sub(replacement, text)
+    return text.strip().lower()
+
+
+# ----------------------------------------------------------------------
+# 캐시
+# ----------------------------------------------------------------------
+class GeocodeCache:
+    """
+    (정규화 주소, 제공자)별 결과 SQLite 캐시 + 프로세스 내 LRU
+
+    - 어느 제공자든 성공 결과가 있으면 그 좌표 사용
+    - 요청한 제공자가 모두 "주소 없음"이면 None (네트워크 호출 없음)
+    """
+
+    def __init__(self, path: Optional[Path] = None,
+                 positive_ttl: float = POSITIVE_TTL_SEC,
+                 negative_ttl: float = NEGATIVE_TTL_SEC,
+                 lru_size: int = LRU_SIZE):
+        self.path = Path(path or os.getenv('GEOCODE_CACHE_PATH') or DEFAULT_CACHE_PATH)
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, Dict[str, Tuple[Optional[Coordinates], float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " address_key TEXT NOT NULL,"
+                " provider TEXT NOT NULL,"
+                " address TEXT,"
+                " lat REAL,"
+                " lon REAL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (address_key, provider))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _is_live(self, coords: Optional[Coordinates], updated_at: float, now: float) -> bool:
+        ttl = self.positive_ttl if coords is not None else self.negative_ttl
+        return now - updated_at < ttl
+
+    def entries(self, key: str) -> Dict[str, Tuple[Optional[Coordinates], float]]:
+        """키의 제공자별 (좌표 또는 None, 저장 시각) - LRU 우선"""
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT provider, lat, lon, updated_at FROM geocode WHERE address_key = ?", (key,)
+            ).fetchall()
+        entries = {
+            provider: ((lat, lon) if lat is not None else None, updated_at)
+            for provider, lat, lon, updated_at in rows
+        }
+        self._remember(key, entries)
+        return entries
+
+    def _remember(self, key: str, entries: Dict[str, Tuple[Optional[Coordinates], float]]):
+        with self._lock:
+            self._lru[key] = entries
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def lookup(self, key: str, providers: Sequence[str]) -> Tuple[bool, Optional[Coordinates]]:
+        """
+        캐시 조회 → (적중 여부, 좌표)
+
+        적중: 살아있는 성공 결과가 있거나, 요청한 제공자 전부 살아있는 "주소 없음"
+        """
+        now = time.time()
+        entries = self.entries(key)
+        live = {p: coords for p, (coords, at) in entries.items() if self._is_live(coords, at, now)}
+        for coords in live.values():
+            if coords is not None:
+                return True, coords
+        if providers and all(p in live for p in providers):
+            return True, None
+        return False, None
+
+    def pending_providers(self, key: str, providers: Sequence[str]) -> List[str]:
+        """아직 살아있는 "주소 없음" 결과가 없는 제공자 (호출 순서 유지)"""
+        now = time.time()
+        entries = self.entries(key)
+        return [p for p in providers
+                if not (p in entries and self._is_live(entries[p][0], entries[p][1], now))]
+
+    def store(self, key: str, provider: str, address: str, coords: Optional[Coordinates]):
+        """결과 저장 (coords=None이면 "주소 없음")"""
+        now = time.time()
+        lat, lon = coords if coords is not None else (None, None)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (address_key, provider, address, lat, lon, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, address, lat, lon, now),
+            )
+        with self._lock:
+            if key in self._lru:
+                self._lru[key] = dict(self._lru[key], **{provider: (coords, now)})
+
+    def store_many(self, rows: Sequence[Tuple[str, str, str, Optional[Coordinates]]]):
+        """결과 여러 건을 한 트랜잭션으로 저장 - (키, 제공자, 원본 주소, 좌표 또는 None)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO geocode (address_key, provider, address, lat, lon, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, provider, address,
+                  coords[0] if coords else None, coords[1] if coords else None, now)
+                 for key, provider, address, coords in rows],
+            )
+        with self._lock:
+            for key, provider, _, coords in rows:
+                if key in self._lru:
+                    self._lru[key] = dict(self._lru[key], **{provider: (coords, now)})
+
+    def positive_entries(self) -> List[Tuple[str, float, float]]:
+        """살아있는 성공 결과 전체 (원본 주소, 위도, 경도) - 오프라인 색인 구축용"""
+        since = time.time() - self.positive_ttl
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT address, lat, lon FROM geocode"
+                " WHERE lat IS NOT NULL AND updated_at > ? ORDER BY updated_at DESC", (since,)
+            ).fetchall()
+
+    def clear_memory(self):
+        """프로세스 내 LRU 비우기"""
+        with self._lock:
+            self._lru.clear()
+
+
+_cache: Optional[GeocodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """프로세스 공용 캐시 (최초 호출 시 생성)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+        return _cache
+
+
+# ----------------------------------------------------------------------
+# 응답 해석 (동기 제공자 / bulk_geocoder 공용)
+# ----------------------------------------------------------------------
+# 재시도해도 결과가 같은 구글 상태값
+GOOGLE_FATAL_STATUSES = {'REQUEST_DENIED', 'INVALID_REQUEST'}
+
+
+def _check_http_status(name: str, status_code: int):
+    if status_code != 200:
+        retryable = status_code == 429 or status_code >= 500
+        raise GeocodingError(f"{name} API 요청 실패: {status_code}", retryable=retryable)
+
+
+def parse_google_response(status_code: int, data: Dict) -> Optional[Coordinates]:
+    """구글 지오코딩 응답 → 좌표 / None(주소 없음) / GeocodingError"""
+    _check_http_status("구글", status_code)
+    status = data.get('status')
+    if status == 'OK' and data.get('results'):
+        location = data['results'][0]['geometry']['location']
+        return location['lat'], location['lng']
+    if status == 'ZERO_RESULTS':
+        return None
+    raise GeocodingError(f"구글 API 응답 오류: {status}", retryable=status not in GOOGLE_FATAL_STATUSES)
+
+
+def parse_kakao_response(status_code: int, data: Dict) -> Optional[Coordinates]:
+    """카카오 주소 검색 응답 → 좌표 / None(주소 없음) / GeocodingError"""
+    _check_http_status("Kakao", status_code)
+    documents = data.get('documents')
+    if not documents:
+        return None
+    return float(documents[0]['y']), float(documents[0]['x'])
+
+
+# ----------------------------------------------------------------------
+# 제공자
+# ----------------------------------------------------------------------
+def google_provider(api_key: Optional[str] = None, timeout: float = 10) -> Provider:
+    """구글 지오코딩 API 제공자"""
+    def geocode_google(address: str) -> Optional[Coordinates]:
+        import requests
+
+        params = {"address": address, "key": api_key or os.getenv('GOOGLE_API_KEY')}
+        try:
+            response = requests.get(GOOGLE_GEOCODE_URL, params=params, timeout=timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(f"구글 API 요청 실패: {e}")
+        return parse_google_response(response.status_code,
+                                     response.json() if response.status_code == 200 else {})
+
+    return geocode_google
+
+
+def kakao_provider(api_key: Optional[str] = None, timeout=(5, 15)) -> Provider:
+    """카카오 주소 검색 API 제공자"""
+    def geocode_kakao(address: str) -> Optional[Coordinates]:
+        import requests
+
+        headers = {'Authorization': f"KakaoAK {api_key or os.getenv('KAKAO_REST_API_KEY')}"}
+        try:
+            response = requests.get(KAKAO_ADDRESS_URL, headers=headers,
+                                    params={'query': address}, timeout=timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(f"Kakao API 요청 실패: {e}")
+        return parse_kakao_response(response.status_code,
+                                    response.json() if response.status_code == 200 else {})
+
+    return geocode_kakao
+
+
+def nominatim_provider(timeout: float = 15) -> Provider:
+    """Nominatim(OSM) 제공자 (무료, 느림)"""
+    def geocode_nominatim(address: str) -> Optional[Coordinates]:
+        from geopy.geocoders import Nominatim
+        from geopy.exc import GeopyError
+
+        try:
+            location = Nominatim(user_agent="street_analyzer").geocode(address, timeout=timeout)
+        except GeopyError as e:
+            raise GeocodingError(f"Nominatim 요청 실패: {e}")
+        if location is None:
+            return None
+        return location.latitude, location.longitude
+
+    return geocode_nominatim
+
+
+# ----------------------------------------------------------------------
+# 조회 API
+# ----------------------------------------------------------------------
+@traced("geocode", "geocode")
+def geocode(address: str,
+            providers: Sequence[Tuple[str, Provider]],
+            cache: Optional[GeocodeCache] = None) -> Optional[Coordinates]:
+    """
+    주소 → (위도, 경도), 캐시 우선
+
+    Args:
+        address: 도로명 주소 또는 지번 주소
+        providers: (이름, 제공자) 목록 - 캐시에 없으면 순서대로 호출
+        cache: 기본값은 프로세스 공용 캐시
+
+    Returns:
+        (위도, 경도) 또는 None (모든 제공자가 주소를 찾지 못했거나 오류)
+    """
+    cache = cache or get_geocode_cache()
+    key = normalize_address(address)
+    if not key:
+        return None
+
+    if os.getenv(OFFLINE_ONLY_ENV) == "1":
+        providers = [(name, provider) for name, provider in providers if name in LOCAL_PROVIDERS]
+    names = [name for name, _ in providers if name not in LOCAL_PROVIDERS]
+    hit, coords = cache.lookup(key, names)
+    if hit:
+        if coords is not None:
+            print(f"[지오코딩 캐시] {address} → ({coords[0]:.6f}, {coords[1]:.6f})")
+        else:
+            print(f"[지오코딩 캐시] {address} → 주소 없음 (재시도 대기)")
+        return coords
+
+    pending = set(cache.pending_providers(key, names))
+    for name, provider in providers:
+        if name not in pending and name not in LOCAL_PROVIDERS:
+            continue
+        try:
+            coords = provider(address)
+        except GeocodingError as e:
+            print(f"[WARN] {name} 지오코딩 실패: {e}")
+            continue
+        except Exception as e:
+            print(f"[WARN] {name} 지오코딩 오류: {e}")
+            continue
+
+        if name in LOCAL_PROVIDERS:
+            if coords is not None:
+                print(f"[지오코딩] {name}: {address} → ({coords[0]:.6f}, {coords[1]:.6f})")
+                return coords
+            continue
+        cache.store(key, name, address, coords)
+        if coords is not None:
+            print(f"[지오코딩] {name}: {address} → ({coords[0]:.6f}, {coords[1]:.6f})")
+            return coords
+    return None
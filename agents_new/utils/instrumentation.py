@@ -0,0 +1,247 @@
+"""
+파이프라인 계측
+- span(이름, 분류) 컨텍스트 매니저 / traced 데코레이터로 구간 측정
+    벽시계 시간, 스레드 CPU 시간, 최대 RSS 증가분, 디스크 읽기/쓰기 바이트, 토큰 수(LLM 호출에서 기록)
+- start_trace()로 추적을 시작한 동안만 기록 (추적이 없으면 측정하지 않음)
+- 추적은 프로세스 공용 (파이프라인 단계 스레드에서 기록한 구간도 같은 추적에 모임)
+- 결과: JSON lines (구간당 한 줄, 구간 종료 순서가 아닌 시작 시각 순) + 선택적으로 Chrome trace-event 파일 (chrome://tracing, Perfetto)
+
+RSS와 입출력 바이트는 프로세스 전체 값의 차이라 동시에 실행 중인 다른 구간의 사용량도 포함될 수 있음
+"""
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:
+    # psutil이 없으면 resource(유닉스)와 /proc/self/io(리눅스)로 대체
+    psutil = None
+    _process = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _peak_rss() -> Optional[int]:
+    """프로세스 최대 RSS (바이트)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # 리눅스는 KB, macOS는 바이트
+        return peak if sys.platform == "darwin" else peak * 1024
+    if _process is not None:
+        info = _process.memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def _io_bytes() -> Optional[Tuple[int, int]]:
+    """프로세스 누적 (읽기, 쓰기) 바이트"""
+    if _process is not None:
+        try:
+            counters = _process.io_counters()
+            return counters.read_bytes, counters.write_bytes
+        except (AttributeError, OSError, psutil.Error):
+            return None
+    try:
+        with open("/proc/self/io", 'r') as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class Span:
+    """측정 중인 구간 (set/add로 속성 기록 - 예: tokens_in, tokens_out, bytes)"""
+
+    __slots__ = ("name", "category", "attrs")
+
+    def __init__(self, name: str, category: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, value: float):
+        self.attrs[key] = self.attrs.get(key, 0) + value
+
+
+class Trace:
+    """한 번의 실행 동안 기록된 구간 목록"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, event: Dict[str, Any]):
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """분류별 횟수/시간/토큰/바이트 합계"""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            total = totals.setdefault(event["cat"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                                     "tokens_in": 0, "tokens_out": 0,
+                                                     "read_bytes": 0, "write_bytes": 0})
+            total["count"] += 1
+            for key in ("wall_s", "cpu_s", "tokens_in", "tokens_out", "read_bytes", "write_bytes"):
+                total[key] += event.get(key) or 0
+        for total in totals.values():
+            total["wall_s"] = round(total["wall_s"], 3)
+            total["cpu_s"] = round(total["cpu_s"], 3)
+        return totals
+
+    def format_summary(self) -> str:
+        """분류별 합계 표 (콘솔 출력용)"""
+        lines = [f"   {'category':<10} {'count':>6} {'wall(s)':>9} {'cpu(s)':>8} {'tok_in':>8} {'tok_out':>8}"
+                 f" {'read(KB)':>9} {'write(KB)':>10}"]
+        for category, total in sorted(self.summary().items()):
+            lines.append(f"   {category:<10} {total['count']:>6} {total['wall_s']:>9.2f} {total['cpu_s']:>8.2f}"
+                         f" {total['tokens_in']:>8} {total['tokens_out']:>8}"
+                         f" {total['read_bytes'] // 1024:>9} {total['write_bytes'] // 1024:>10}")
+        return "\n".join(lines)
+
+    def write(self, output_dir: Path, chrome: bool = False) -> List[Path]:
+        """trace_<이름>_<시각>.jsonl (+ .chrome.json) 저장 → 파일 경로"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+
+        base = f"trace_{self.name}_{stamp}"
+        jsonl_path = output_dir / f"{base}.jsonl"
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        paths = [jsonl_path]
+
+        if chrome:
+            pid = os.getpid()
+            chrome_events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}]
+            for event in events:
+                args = {k: v for k, v in event.items() if k not in ("name", "cat", "ts", "wall_s", "tid")}
+                chrome_events.append({
+                    "name": event["name"], "cat": event["cat"], "ph": "X", "pid": pid, "tid": event["tid"],
+                    "ts": round(event["ts"] * 1e6), "dur": round(event["wall_s"] * 1e6), "args": args,
+                })
+            chrome_path = output_dir / f"{base}.chrome.json"
+            with open(chrome_path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": chrome_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False, default=str)
+            paths.append(chrome_path)
+        return paths
+
+
+_active: Optional[Trace] = None
+_active_lock = threading.Lock()
+
+
+def start_trace(name: str) -> Trace:
+    """새 추적 시작 (이전 추적은 대체)"""
+    global _active
+    with _active_lock:
+        _active = Trace(name)
+        return _active
+
+
+def stop_trace() -> Optional[Trace]:
+    """추적 종료 → 기록된 추적"""
+    global _active
+    with _active_lock:
+        trace, _active = _active, None
+        return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _active
+
+
+@contextmanager
+def span(name: str, category: str = "function", **attrs):
+    """구간 측정 (추적 중이 아니면 빈 Span만 넘기고 측정하지 않음)"""
+    trace = _active
+    current = Span(name, category, attrs)
+    if trace is None:
+        yield current
+        return
+
+    rss_before = _peak_rss()
+    io_before = _io_bytes()
+    cpu_before = time.thread_time()
+    wall_before = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield current
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_before
+        event = {
+            "name": name,
+            "cat": category,
+            "ts": round(wall_before - trace.origin, 6),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(time.thread_time() - cpu_before, 6),
+            "tid": threading.get_ident(),
+            "thread": threading.current_thread().name,
+            "status": status,
+        }
+        rss_after = _peak_rss()
+        if rss_before is not None and rss_after is not None:
+            event["rss_peak_delta_kb"] = (rss_after - rss_before) // 1024
+        io_after = _io_bytes()
+        if io_before is not None and io_after is not None:
+            event["read_bytes"] = io_after[0] - io_before[0]
+            event["write_bytes"] = io_after[1] - io_before[1]
+        if error:
+            event["error"] = error
+        event.update(current.attrs)
+        trace.record(event)
+
+
+def traced(name: Optional[str] = None, category: str = "function"):
+    """함수 전체를 span으로 측정하는 데코레이터 (동기/비동기 함수 모두)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, category):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_usage(current: Span, response: Any):
+    """OpenAI 호환 응답의 usage → tokens_in / tokens_out"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    current.add("tokens_in", getattr(usage, "prompt_tokens", 0) or 0)
+    current.add("tokens_out", getattr(usage, "completion_tokens", 0) or 0)
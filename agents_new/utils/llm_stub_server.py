@@ -0,0 +1,184 @@
+"""
+LLM 스텁 서버 (테스트/벤치마크용)
+- OpenAI 호환 채팅 API(POST .../chat/completions) 응답 형식을 흉내냄 → base_url만 바꿔 GeminiClient, OpenAI 클라이언트에 연결
+- 응답 내용은 규칙 파일로 지정: 메시지 텍스트에 정규식이 맞는 첫 규칙의 응답 (문자열 또는 JSON 객체)
+- 지연(고정 + 무작위 흔들림), 일시 오류(429/500) 비율 조절 가능
+- usage(prompt_tokens/completion_tokens)는 글자 수로 추정
+
+    python llm_stub_server.py --port 8766 --latency-ms 300 --responses responses.json
+
+규칙 파일 형식:
+    {"rules": [{"match": "정규식", "response": {...} 또는 "문자열"}, ...], "default": "{}"}
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CHAT_SUFFIX = "/chat/completions"
+DEFAULT_RESPONSE = "{}"
+# 이미지 한 장을 토큰으로 환산한 값 (usage 추정용)
+IMAGE_TOKENS = 258
+
+Rule = Tuple[re.Pattern, str]
+
+
+def load_rules(path: Optional[str]) -> Tuple[List[Rule], str]:
+    """규칙 파일 → ([(정규식, 응답 문자열)], 기본 응답)"""
+    if not path:
+        return [], DEFAULT_RESPONSE
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+
+    def as_text(value: Any) -> str:
+        return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+    rules = [(re.compile(rule["match"], re.DOTALL), as_text(rule["response"])) for rule in spec.get("rules", [])]
+    return rules, as_text(spec.get("default", DEFAULT_RESPONSE))
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """메시지 텍스트 (이미지 파트는 제외) + 이미지 개수"""
+    texts, images = [], 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    texts.append(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    images += 1
+    return "\n".join(texts), images
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # 기본 listen 대기열(5)을 넘는 동시 연결은 SYN이 버려져 클라이언트가 ~1초 뒤 재시도 → 측정 지연이 부풀려짐
+    request_queue_size = 128
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency_sec = 0.0
+    jitter_sec = 0.0
+    error_rate = 0.0
+    rules: List[Rule] = []
+    default_response = DEFAULT_RESPONSE
+    stats = {"requests": 0, "errors": 0}
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+        if not self.path.rstrip("/").endswith(CHAT_SUFFIX):
+            self._send(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        with self._lock:
+            self.stats["requests"] += 1
+        delay = self.latency_sec + (random.uniform(0, self.jitter_sec) if self.jitter_sec else 0)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            status = random.choice([429, 500])
+            self._send(status, {"error": {"message": "stub transient error", "type": "server_error",
+                                          "code": status}})
+            return
+
+        text, images = _message_text(request.get("messages", []))
+        content = next((response for pattern, response in self.rules if pattern.search(text)),
+                       self.default_response)
+        prompt_tokens = _estimate_tokens(text) + images * IMAGE_TOKENS
+        completion_tokens = _estimate_tokens(content)
+        self._send(200, {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                      error_rate: float = 0.0, responses_path: Optional[str] = None) -> StubHTTPServer:
+    """
+    백그라운드 스레드로 스텁 서버 시작 (port=0이면 빈 포트)
+
+    base_url은 http://<host>:<port>/v1 (경로 앞부분은 상관없이 .../chat/completions로 끝나면 응답)
+    요청/오류 횟수는 server.RequestHandlerClass.stats
+    """
+    rules, default_response = load_rules(responses_path)
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {
+        "latency_sec": latency_ms / 1000, "jitter_sec": jitter_ms / 1000, "error_rate": error_rate,
+        "rules": rules, "default_response": default_response,
+        "stats": {"requests": 0, "errors": 0},
+    })
+    server = StubHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    """스텁 서버의 OpenAI 호환 base_url"""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 스텁 서버 (OpenAI 호환 chat/completions)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="추가 무작위 지연 상한 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 응답 비율")
+    parser.add_argument("--responses", default=None, help="응답 규칙 JSON 파일")
+    args = parser.parse_args()
+
+    if args.responses and not Path(args.responses).exists():
+        parser.error(f"응답 규칙 파일이 없습니다: {args.responses}")
+    server = start_stub_server(args.host, args.port, args.latency_ms, args.jitter_ms,
+                               args.error_rate, args.responses)
+    print(f"[스텁 서버] GEMINI_BASE_URL={base_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+오프라인 지오코더
+- 로컬 데이터로 "정규화 도로명주소 → 좌표" 색인 구축 (HTTP 지오코더보다 먼저 사용)
+- 소스: 주소 덤프 CSV(선택), 주소 컬럼이 있는 포인트 CSV(파노라마 등), 지오코딩 캐시의 성공 결과
+- 조회: 정확 일치 → 도로명+건물번호 → 주소 접두어 → 도로명 유사도(건물번호 일치, 도로명 숫자는 같아야 함)
+    같은 쪽 인접 건물번호(다른 건물 좌표, 최대 ~100m 오차)는 오프라인 전용 모드(GEOCODE_OFFLINE_ONLY=1)에서만
+"""
+import argparse
+import difflib
+import os
+import re
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from .geocoding import Coordinates, OFFLINE_ONLY_ENV, Provider, get_geocode_cache, normalize_address
+except ImportError:
+    from geocoding import Coordinates, OFFLINE_ONLY_ENV, Provider, get_geocode_cache, normalize_address
+
+# 프로젝트 루트
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# 주소 덤프 (도로명주소 위치정보 등, 없으면 생략)
+ADDRESS_DUMP_ENV = "OFFLINE_ADDRESS_DUMP"
+DEFAULT_ADDRESS_DUMP = PROJECT_ROOT / "spatial_data" / "address_points.csv"
+# 파노라마 포인트 CSV (analyze_area_by_address와 같은 환경변수)
+PANO_CSV_ENV = "PANOID_FILE"
+DEFAULT_PANO_CSV = PROJECT_ROOT / "agents_new" / "panorama_img_anal" / "Step1_Result_final (1).csv"
+DEFAULT_STORE_CSV = PROJECT_ROOT / "agents_new" / "store_agent" / "store_data" / "final_merged_data.csv"
+
+# 컬럼 후보 (앞에 있을수록 우선)
+ADDRESS_COLUMNS = ['도로명주소', '도로명_주소', 'road_address', '주소', 'address', '기준면적', '지번주소']
+LATLON_COLUMNS = [('pano_lat', 'pano_lon'), ('위도', '경도'), ('lat', 'lon'), ('latitude', 'longitude')]
+# 도로명주소 위치정보 DB 등은 UTM-K(EPSG:5179) 좌표
+METRIC_COLUMNS = [('X좌표', 'Y좌표'), ('x좌표', 'y좌표'), ('ent_x', 'ent_y'), ('x', 'y')]
+METRIC_CRS = "EPSG:5179"
+
+FUZZY_CUTOFF = 0.8       # 도로명 유사도 하한 (difflib ratio)
+MAX_NUMBER_GAP = 10      # 같은 도로에서 허용하는 건물번호 차이 (같은 쪽 - 홀/짝 동일)
+
+# 도로명 + 건물번호 (예: "왕십리로 222", "성수이로7길 12", "아차산로 17길 3-1")
+_ROAD_PATTERN = re.compile(
+    r'(?:^|\s)(?P<road>[가-힣a-z0-9]+?(?:로|길))\s*(?P<branch>\d+번?[가-힣]?길)?\s+'
+    r'(?P<main>\d+)(?:-(?P<sub>\d+))?(?=\s|$)'
+)
+_GU_PATTERN = re.compile(r'(?:^|\s)([가-힣]+구)(?=\s|$)')
+_ROAD_DIGITS = re.compile(r'\d+')
+
+
+class RoadAddress(NamedTuple):
+    """도로명주소 구성요소"""
+    gu: Optional[str]
+    road: str            # 공백 제거한 도로명 (예: "성수이로7길")
+    main: int
+    sub: int
+
+
+class _Entry(NamedTuple):
+    gu: Optional[str]
+    main: int
+    sub: int
+    coords: Coordinates
+
+
+def parse_road_address(address: str) -> Optional[RoadAddress]:
+    """정규화 주소 → (구, 도로명, 본번, 부번), 도로명주소가 아니면 None"""
+    key = normalize_address(address)
+    match = _ROAD_PATTERN.search(key)
+    if not match:
+        return None
+    gu = _GU_PATTERN.search(key[:match.start('road')])
+    road = match.group('road') + (match.group('branch') or '').replace('번', '')
+    return RoadAddress(gu.group(1) if gu else None, road,
+                       int(match.group('main')), int(match.group('sub') or 0))
+
+
+class OfflineGeocoder:
+    """로컬 주소 색인 (정규화 주소 / 도로명별 건물번호)"""
+
+    def __init__(self):
+        self._exact: Dict[str, Coordinates] = {}
+        self._sorted_keys: List[str] = []
+        self._roads: Dict[str, List[_Entry]] = {}
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def add(self, address: str, lat: float, lon: float):
+        """주소 1건 추가 (먼저 추가된 소스 우선)"""
+        key = normalize_address(address)
+        if not key or key in self._exact or pd.isna(lat) or pd.isna(lon):
+            return
+        coords = (float(lat), float(lon))
+        self._exact[key] = coords
+        parsed = parse_road_address(key)
+        if parsed:
+            self._roads.setdefault(parsed.road, []).append(
+                _Entry(parsed.gu, parsed.main, parsed.sub, coords))
+        self._sorted_keys = []
+
+    def add_many(self, rows: Iterable[Tuple[str, float, float]]) -> int:
+        before = len(self._exact)
+        for address, lat, lon in rows:
+            self.add(address, lat, lon)
+        return len(self._exact) - before
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def lookup(self, address: str, nearby: bool = False) -> Optional[Coordinates]:
+        """
+        주소 → (위도, 경도), 색인에 없으면 None
+
+        nearby=True면 마지막으로 같은 도로 같은 쪽의 인접 건물번호 좌표를 근사값으로 반환
+        (다른 건물 좌표이므로 HTTP 지오코더를 쓸 수 없을 때만 사용)
+        """
+        key = normalize_address(address)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+
+        parsed = parse_road_address(key)
+        if parsed:
+            coords = self._match_building(parsed, parsed.road)
+            if coords:
+                return coords
+        coords = self._match_prefix(key)
+        if coords:
+            return coords
+        if parsed:
+            coords = self._match_fuzzy(parsed)
+            if coords is None and nearby:
+                coords = self._match_nearby(parsed)
+            return coords
+        return None
+
+    def _similar_roads(self, parsed: RoadAddress) -> List[str]:
+        """
+        질의 도로명 + 표기가 비슷한 색인 도로명
+
+        숫자가 다른 도로명은 제외 (성수이로7길/성수이로9길처럼 유사도는 높아도 다른 도로)
+        """
+        digits = _ROAD_DIGITS.findall(parsed.road)
+        roads = [parsed.road] + [road for road in difflib.get_close_matches(
+            parsed.road, list(self._roads), n=3, cutoff=FUZZY_CUTOFF) if _ROAD_DIGITS.findall(road) == digits]
+        return list(dict.fromkeys(roads))
+
+    def _candidates(self, parsed: RoadAddress, road: str) -> List[_Entry]:
+        entries = self._roads.get(road, [])
+        if parsed.gu:
+            entries = [e for e in entries if e.gu in (None, parsed.gu)]
+        return entries
+
+    def _match_building(self, parsed: RoadAddress, road: str) -> Optional[Coordinates]:
+        """같은 도로의 같은 본번 (부번 일치 우선)"""
+        same_main = [e for e in self._candidates(parsed, road) if e.main == parsed.main]
+        if not same_main:
+            return None
+        same_main.sort(key=lambda e: (e.sub != parsed.sub, abs(e.sub - parsed.sub)))
+        return same_main[0].coords
+
+    def _match_prefix(self, key: str) -> Optional[Coordinates]:
+        """색인 주소가 질의로 시작하거나(건물명/층 생략), 질의가 색인 주소로 시작(상세주소 추가)"""
+        if not any(ch.isdigit() for ch in key):
+            return None   # 번지 없는 지역명만으로는 특정 불가
+        if not self._sorted_keys:
+            self._sorted_keys = sorted(self._exact)
+        pos = bisect_left(self._sorted_keys, key + ' ')
+        if pos < len(self._sorted_keys) and self._sorted_keys[pos].startswith(key + ' '):
+            return self._exact[self._sorted_keys[pos]]
+
+        words = key.split(' ')
+        for end in range(len(words) - 1, 0, -1):
+            prefix = ' '.join(words[:end])
+            if prefix in self._exact and any(ch.isdigit() for ch in prefix):
+                return self._exact[prefix]
+        return None
+
+    def _match_fuzzy(self, parsed: RoadAddress) -> Optional[Coordinates]:
+        """도로명 오타/표기 차이 → 건물번호 일치"""
+        for road in self._similar_roads(parsed):
+            coords = self._match_building(parsed, road)
+            if coords:
+                return coords
+        return None
+
+    def _match_nearby(self, parsed: RoadAddress) -> Optional[Coordinates]:
+        """같은(또는 유사한) 도로, 같은 쪽(홀/짝)의 가장 가까운 건물번호 - 근사값"""
+        for road in self._similar_roads(parsed):
+            nearby = [e for e in self._candidates(parsed, road)
+                      if e.main % 2 == parsed.main % 2 and abs(e.main - parsed.main) <= MAX_NUMBER_GAP]
+            if nearby:
+                return min(nearby, key=lambda e: abs(e.main - parsed.main)).coords
+        return None
+
+
+# ----------------------------------------------------------------------
+# 소스
+# ----------------------------------------------------------------------
+def _read_csv(path: Path) -> pd.DataFrame:
+    try:
+        return pd.read_csv(path, encoding='utf-8-sig', low_memory=False)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding='cp949', low_memory=False)
+
+
+def load_point_csv(path: Path) -> List[Tuple[str, float, float]]:
+    """
+    주소 + 좌표 CSV → (주소, 위도, 경도) 목록
+
+    좌표는 위도/경도 컬럼 또는 UTM-K(EPSG:5179) X/Y 컬럼. 주소 또는 좌표 컬럼이 없으면 빈 목록
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+    df = _read_csv(path)
+    address_col = next((c for c in ADDRESS_COLUMNS if c in df.columns), None)
+    if address_col is None:
+        print(f"[INFO] {path.name}: 주소 컬럼 없음, 오프라인 색인에서 제외")
+        return []
+
+    latlon = next(((la, lo) for la, lo in LATLON_COLUMNS if la in df.columns and lo in df.columns), None)
+    if latlon:
+        lats, lons = df[latlon[0]].to_numpy(dtype=float), df[latlon[1]].to_numpy(dtype=float)
+    else:
+        xy = next(((x, y) for x, y in METRIC_COLUMNS if x in df.columns and y in df.columns), None)
+        if xy is None:
+            print(f"[INFO] {path.name}: 좌표 컬럼 없음, 오프라인 색인에서 제외")
+            return []
+        from pyproj import Transformer
+        to_wgs84 = Transformer.from_crs(METRIC_CRS, "EPSG:4326", always_xy=True)
+        lons, lats = to_wgs84.transform(df[xy[0]].to_numpy(dtype=float), df[xy[1]].to_numpy(dtype=float))
+        lons, lats = lons.round(7), lats.round(7)   # 변환 오차 정리 (1cm 단위)
+
+    return list(zip(df[address_col].astype(str), lats, lons))
+
+
+def _default_sources() -> List[Path]:
+    dump = os.getenv(ADDRESS_DUMP_ENV)
+    pano = os.getenv(PANO_CSV_ENV)
+    return [Path(dump) if dump else DEFAULT_ADDRESS_DUMP,
+            Path(pano) if pano else DEFAULT_PANO_CSV]
+
+
+def build_offline_geocoder(sources: Optional[List[Path]] = None,
+                           include_cache: bool = True) -> OfflineGeocoder:
+    """소스 CSV(앞쪽 우선) + 지오코딩 캐시 성공 결과로 색인 구축"""
+    geocoder = OfflineGeocoder()
+    for path in (sources if sources is not None else _default_sources()):
+        added = geocoder.add_many(load_point_csv(path))
+        if added:
+            print(f"[오프라인 지오코더] {Path(path).name}: {added}개 주소")
+    if include_cache:
+        try:
+            added = geocoder.add_many(get_geocode_cache().positive_entries())
+            if added:
+                print(f"[오프라인 지오코더] 지오코딩 캐시: {added}개 주소")
+        except Exception as e:
+            print(f"[WARN] 지오코딩 캐시 읽기 실패: {e}")
+    return geocoder
+
+
+_geocoder: Optional[OfflineGeocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_offline_geocoder() -> OfflineGeocoder:
+    """프로세스 공용 오프라인 지오코더 (최초 호출 시 구축)"""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = build_offline_geocoder()
+        return _geocoder
+
+
+def offline_provider(geocoder: Optional[OfflineGeocoder] = None) -> Provider:
+    """
+    오프라인 색인 제공자 (geocoding.geocode의 "offline" 제공자, HTTP 제공자보다 먼저 호출)
+
+    인접 건물번호 근사는 오프라인 전용 모드에서만 - 평소에는 정확히 찾지 못한 주소를 HTTP 제공자로 넘김
+    """
+    def geocode_offline(address: str) -> Optional[Coordinates]:
+        nearby = os.getenv(OFFLINE_ONLY_ENV) == "1"
+        return (geocoder or get_offline_geocoder()).lookup(address, nearby=nearby)
+
+    return geocode_offline
+
+
+def self_check():
+    """조회 규칙 회귀 확인 (네트워크/데이터 파일 없이 실행)"""
+    geocoder = OfflineGeocoder()
+    geocoder.add("서울 성동구 성수이로9길 12", 37.5440, 127.0560)
+    geocoder.add("서울 성동구 아차산로11길 3", 37.5470, 127.0600)
+    geocoder.add("서울 성동구 왕십리로 222", 37.5610, 127.0370)
+
+    # 번호가 다른 길은 유사도가 높아도 다른 도로 → HTTP 제공자로 넘김
+    assert geocoder.lookup("서울 성동구 성수이로7길 12") is None
+    assert geocoder.lookup("서울 성동구 아차산로17길 3") is None
+    assert geocoder.lookup("서울 성동구 아차산로17길 3", nearby=True) is None
+    # 같은 도로의 표기 차이 / 상세주소 추가 / 인접 건물번호(근사 모드)
+    assert geocoder.lookup("서울 성동구 성수일로9길 12") == (37.5440, 127.0560)
+    assert geocoder.lookup("서울 성동구 성수이로9길 12 2층") == (37.5440, 127.0560)
+    assert geocoder.lookup("서울 성동구 왕십리로 226") is None
+    assert geocoder.lookup("서울 성동구 왕십리로 226", nearby=True) == (37.5610, 127.0370)
+    print("[OK] 오프라인 지오코더 조회 규칙 확인 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 지오코더 색인 구축 + 매장 주소 커버리지 확인")
+    parser.add_argument("--dump", action="append", default=None, help="주소 덤프 CSV (여러 번 지정 가능)")
+    parser.add_argument("--store-data", default=str(DEFAULT_STORE_CSV), help="final_merged_data.csv 경로")
+    parser.add_argument("--self-check", action="store_true", help="조회 규칙 회귀 확인만 실행")
+    args = parser.parse_args()
+
+    if args.self_check:
+        self_check()
+        return
+
+    geocoder = build_offline_geocoder([Path(p) for p in args.dump] if args.dump else None)
+    print(f"[오프라인 지오코더] 색인 주소 수: {len(geocoder)}")
+
+    store_csv = Path(args.store_data)
+    if store_csv.exists():
+        addresses = pd.read_csv(store_csv, usecols=['기준면적'])['기준면적'].dropna().astype(str)
+        unique = {normalize_address(a): a for a in addresses}
+        found = sum(1 for a in unique.values() if geocoder.lookup(a))
+        print(f"[오프라인 지오코더] 매장 주소 {len(unique)}개 중 {found}개 오프라인 변환 가능")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+오프라인 성능 벤치마크
+- 외부 호출을 로컬 스텁 서버로 대체 (네트워크 없이 실행)
+    LLM: agents_new/utils/llm_stub_server.py (OpenAI 호환, GEMINI_BASE_URL로 연결)
+    지오코딩: agents_new/utils/geocode_stub_server.py (GOOGLE_GEOCODE_URL / KAKAO_ADDRESS_URL로 연결)
+- 파노라마 이미지는 매장 주변 지점마다 합성 이미지를 만들어 사용 (지점 CSV는 저장소의 것)
+- 캐시(지오코딩/이미지 분석/산출물/타일)는 벤치마크 전용 폴더로 분리, 단계 캐시는 사용 안 함
+    준비 실행(--warmup) 이후에는 지오코딩·이미지 분석 캐시가 채워진 반복 실행 상태를 측정
+- 고정 매장 코드로 store / marketing / panorama / full 시나리오 반복 실행
+- 시나리오별 p50/p95 지연, 처리량(회/분), 최대 RSS, LLM 호출 수 → 저장된 기준선과 비교
+    허용 범위(--tolerance)를 넘어 나빠진 지표가 있으면 종료 코드 1
+
+    python benchmark.py
+    python benchmark.py --scenario panorama --iterations 5 --llm-latency-ms 300
+    python benchmark.py --save-baseline
+
+매장 데이터(store_agent/store_data/final_merged_data.csv)는 실제 파이프라인과 같이 필요
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import zlib
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "agents_new" / "utils"))
+from geocode_stub_server import GOOGLE_PATH, KAKAO_PATH
+from geocode_stub_server import start_stub_server as start_geocode_stub
+from llm_stub_server import base_url
+from llm_stub_server import start_stub_server as start_llm_stub
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:
+    # psutil이 없으면 /proc/self/statm(리눅스), 그것도 없으면 resource의 프로세스 최대 RSS 사용
+    psutil = None
+    _process = None
+
+SCENARIOS = ("store", "marketing", "panorama", "full")
+DEFAULT_STORE_CODES = ["000F03E44A", "002816BA73"]
+DEFAULT_RESPONSES_PATH = Path(__file__).parent / "benchmark_responses.json"
+DEFAULT_BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "output" / "benchmark"
+WORK_DIR = Path(__file__).parent / ".cache" / "benchmark"
+PANO_CSV_PATH = PROJECT_ROOT / "agents_new" / "panorama_img_anal" / "Step1_Result_final (1).csv"
+STORE_CSV_PATH = PROJECT_ROOT / "agents_new" / "store_agent" / "store_data" / "final_merged_data.csv"
+
+# run_panorama_analysis의 반경/이미지 수와 같게
+PANORAMA_BUFFER_M = 300
+PANORAMA_IMAGES = 5
+FIXTURE_IMAGE_SIZE = (2048, 1024)
+
+# 지표별 좋은 방향 (기준선 비교용)
+LOWER_IS_BETTER = ("p50_s", "p95_s", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_per_min",)
+
+
+# ----------------------------------------------------------------------
+# 메모리 측정
+# ----------------------------------------------------------------------
+def _current_rss() -> Optional[int]:
+    """현재 RSS (바이트)"""
+    if _process is not None:
+        return _process.memory_info().rss
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _lifetime_peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakMemorySampler:
+    """구간 동안 RSS를 주기적으로 읽어 최댓값 기록 (현재 RSS를 못 읽으면 프로세스 최대 RSS)"""
+
+    def __init__(self, interval_sec: float = 0.02):
+        self.interval_sec = interval_sec
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        rss = _current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            self._sample()
+
+    def __enter__(self) -> "PeakMemorySampler":
+        self._sample()
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._sample()
+        else:
+            self.peak = _lifetime_peak_rss()
+
+
+# ----------------------------------------------------------------------
+# 환경 구성
+# ----------------------------------------------------------------------
+def configure_environment(llm_server, geocode_server, image_folder: Path) -> Dict[str, str]:
+    """스텁 서버 주소, 가짜 API 키, 벤치마크 전용 캐시 경로를 환경변수로 설정"""
+    host, port = geocode_server.server_address[:2]
+    env = {
+        "GEMINI_BASE_URL": base_url(llm_server),
+        "GEMINI_API_KEY": "benchmark-key",
+        "GOOGLE_API_KEY": "benchmark-key",
+        "KAKAO_REST_API_KEY": "benchmark-key",
+        "GOOGLE_GEOCODE_URL": f"http://{host}:{port}{GOOGLE_PATH}",
+        "KAKAO_ADDRESS_URL": f"http://{host}:{port}{KAKAO_PATH}",
+        "PIPELINE_CACHE_PATH": str(WORK_DIR / "pipeline_steps.sqlite"),
+        "GEOCODE_CACHE_PATH": str(WORK_DIR / "geocode.sqlite"),
+        "PANORAMA_CACHE_PATH": str(WORK_DIR / "panorama_analysis.sqlite"),
+        "PANORAMA_TILE_DIR": str(WORK_DIR / "tiles"),
+        "ARTIFACT_STORE_DIR": str(WORK_DIR / "artifacts"),
+        "PANOID_FILE": str(PANO_CSV_PATH),
+        "IMAGE_FOLDER": str(image_folder),
+    }
+    os.environ.update(env)
+    # 시뮬레이션 모드면 LLM 호출 자체를 건너뛰므로 끔
+    os.environ.pop("SIMULATE_OPENAI", None)
+    return env
+
+
+def build_panorama_fixture(addresses: Dict[str, str], image_folder: Path) -> Dict[str, int]:
+    """매장 좌표 주변의 가까운 지점마다 합성 파노라마 이미지 생성 → 매장별 이미지 수"""
+    import run_analysis
+    from PIL import Image
+    from pano_index import PanoramaIndex
+
+    panorama = run_analysis._load_module("analyze_area_by_address", run_analysis.PANORAMA_MODULE_PATH)
+    index = PanoramaIndex(str(PANO_CSV_PATH), str(image_folder))
+    image_folder.mkdir(parents=True, exist_ok=True)
+    width, height = FIXTURE_IMAGE_SIZE
+
+    counts = {}
+    for store_code, address in addresses.items():
+        # 파노라마 분석과 같은 경로로 지오코딩 (스텁 서버 + 벤치마크 캐시)
+        lon, lat = panorama.address_to_coordinates(address)
+        points = index.query(lon, lat, PANORAMA_BUFFER_M, require_image=False)[:PANORAMA_IMAGES]
+        for point in points:
+            path = Path(point['image_path'])
+            if path.exists():
+                continue
+            rng = np.random.default_rng(zlib.crc32(point['pano_id'].encode('utf-8')))
+            pixels = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+            Image.fromarray(pixels).resize((width, height), Image.BILINEAR).save(path, quality=90)
+        counts[store_code] = len(points)
+    return counts
+
+
+# ----------------------------------------------------------------------
+# 시나리오
+# ----------------------------------------------------------------------
+class BenchmarkContext:
+    """시나리오 준비 결과 (매장 주소, 마케팅 입력용 매장 리포트)"""
+
+    def __init__(self):
+        self.addresses: Dict[str, str] = {}
+        self.store_reports: Dict[str, Dict[str, Any]] = {}
+
+
+async def _scenario_store(ctx: BenchmarkContext, store_code: str) -> bool:
+    import run_analysis
+    return await run_analysis.run_store_analysis(store_code) is not None
+
+
+async def _scenario_marketing(ctx: BenchmarkContext, store_code: str) -> bool:
+    import run_analysis
+    report = ctx.store_reports.get(store_code)
+    if report is None:
+        return False
+    return await run_analysis.run_marketing_analysis(report) is not None
+
+
+async def _scenario_panorama(ctx: BenchmarkContext, store_code: str) -> bool:
+    import run_analysis
+    result = await run_analysis.run_panorama_analysis(ctx.addresses[store_code])
+    return result.get("status") != "failed"
+
+
+async def _scenario_full(ctx: BenchmarkContext, store_code: str) -> bool:
+    import run_analysis
+    result = await run_analysis.run_full_analysis_pipeline(store_code, use_cache=False)
+    return result.get("status") == "success"
+
+
+SCENARIO_FUNCS: Dict[str, Callable[[BenchmarkContext, str], Awaitable[bool]]] = {
+    "store": _scenario_store,
+    "marketing": _scenario_marketing,
+    "panorama": _scenario_panorama,
+    "full": _scenario_full,
+}
+
+
+async def prepare_context(store_codes: List[str], scenarios: List[str]) -> BenchmarkContext:
+    """매장 주소 조회 + 마케팅 시나리오용 매장 리포트 생성"""
+    import run_analysis
+
+    ctx = BenchmarkContext()
+    for store_code in store_codes:
+        address = run_analysis._get_address_from_store_code(store_code)
+        if address:
+            ctx.addresses[store_code] = address
+        if "marketing" in scenarios:
+            analysis = await run_analysis.run_store_analysis(store_code)
+            if analysis is not None:
+                ctx.store_reports[store_code] = run_analysis.convert_store_to_marketing_format(analysis)
+    return ctx
+
+
+def summarize(latencies: List[float], failures: int, wall_sec: float, peak_rss: Optional[int],
+              llm_requests: int, llm_errors: int) -> Dict[str, Any]:
+    runs = len(latencies)
+    return {
+        "runs": runs,
+        "failures": failures,
+        "p50_s": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+        "p95_s": round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+        "mean_s": round(float(np.mean(latencies)), 3) if latencies else None,
+        "throughput_per_min": round(runs / wall_sec * 60, 2) if wall_sec > 0 else None,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss is not None else None,
+        "llm_requests_per_run": round(llm_requests / runs, 2) if runs else None,
+        "llm_errors": llm_errors,
+    }
+
+
+async def run_scenario(name: str, ctx: BenchmarkContext, store_codes: List[str], iterations: int,
+                       warmup: int, llm_stats: Dict[str, int], log) -> Dict[str, Any]:
+    """시나리오 하나: 준비 실행 후 (반복 × 매장) 실행 시간 측정"""
+    func = SCENARIO_FUNCS[name]
+    codes = [code for code in store_codes if name != "panorama" or code in ctx.addresses]
+
+    with redirect_stdout(log), redirect_stderr(log):
+        for _ in range(warmup):
+            for store_code in codes:
+                await func(ctx, store_code)
+
+    latencies, failures = [], 0
+    requests_before, errors_before = llm_stats["requests"], llm_stats["errors"]
+    started = time.perf_counter()
+    with PeakMemorySampler() as memory:
+        for iteration in range(iterations):
+            for store_code in codes:
+                print(f"--- {name} #{iteration + 1} {store_code}", file=log, flush=True)
+                run_started = time.perf_counter()
+                with redirect_stdout(log), redirect_stderr(log):
+                    try:
+                        ok = await func(ctx, store_code)
+                    except Exception as e:
+                        print(f"[ERROR] {name} {store_code}: {type(e).__name__}: {e}")
+                        ok = False
+                latencies.append(time.perf_counter() - run_started)
+                failures += 0 if ok else 1
+    wall_sec = time.perf_counter() - started
+
+    return summarize(latencies, failures, wall_sec, memory.peak,
+                     llm_stats["requests"] - requests_before, llm_stats["errors"] - errors_before)
+
+
+# ----------------------------------------------------------------------
+# 기준선 비교
+# ----------------------------------------------------------------------
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+                        tolerance: float) -> Dict[str, Dict[str, Any]]:
+    """시나리오별 지표 변화율 (+는 나빠짐) 및 허용 범위 초과 여부"""
+    comparison = {}
+    for scenario, stats in results.items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        rows = {}
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            current, previous = stats.get(metric), base.get(metric)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = change if metric in LOWER_IS_BETTER else -change
+            rows[metric] = {"baseline": previous, "current": current,
+                            "change_pct": round(change * 100, 1), "regression": worse > tolerance}
+        comparison[scenario] = rows
+    return comparison
+
+
+def format_report(results: Dict[str, Dict[str, Any]], comparison: Dict[str, Dict[str, Any]]) -> str:
+    lines = [f"{'scenario':<10} {'runs':>5} {'fail':>5} {'p50(s)':>8} {'p95(s)':>8} {'runs/min':>9}"
+             f" {'peakMB':>8} {'llm/run':>8}"]
+    for scenario, stats in results.items():
+        lines.append(f"{scenario:<10} {stats['runs']:>5} {stats['failures']:>5} {stats['p50_s'] or 0:>8.3f}"
+                     f" {stats['p95_s'] or 0:>8.3f} {stats['throughput_per_min'] or 0:>9.2f}"
+                     f" {stats['peak_rss_mb'] or 0:>8.1f} {stats['llm_requests_per_run'] or 0:>8.2f}")
+    for scenario, rows in comparison.items():
+        for metric, row in rows.items():
+            tag = "[REGRESSION]" if row["regression"] else "[OK]"
+            lines.append(f"{tag} {scenario}.{metric}: {row['baseline']} → {row['current']} ({row['change_pct']:+.1f}%)")
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------------------
+# 실행
+# ----------------------------------------------------------------------
+async def run_benchmark(args) -> Dict[str, Any]:
+    if WORK_DIR.exists():
+        shutil.rmtree(WORK_DIR)
+    WORK_DIR.mkdir(parents=True)
+    image_folder = WORK_DIR / "images"
+
+    llm_server = start_llm_stub(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                                error_rate=args.llm_error_rate, responses_path=args.responses)
+    geocode_server = start_geocode_stub(latency_ms=args.geocode_latency_ms)
+    env = configure_environment(llm_server, geocode_server, image_folder)
+    llm_stats = llm_server.RequestHandlerClass.stats
+
+    # 스텁 주소/캐시 경로를 읽도록 환경변수 설정 후 import
+    # gemini_client는 import 시 env 파일을 override로 한 번 읽으므로 먼저 import 후 다시 적용
+    sys.path.insert(0, str(Path(__file__).parent))
+    sys.path.insert(0, str(PROJECT_ROOT))
+    import run_analysis  # noqa: F401
+    import agents_new.utils.gemini_client  # noqa: F401
+    os.environ.update(env)
+
+    log_path = WORK_DIR / "benchmark.log"
+    scenarios = args.scenario or list(SCENARIOS)
+    with open(log_path, 'w', encoding='utf-8') as log:
+        with redirect_stdout(log), redirect_stderr(log):
+            ctx = await prepare_context(args.codes, scenarios)
+            fixture = build_panorama_fixture(ctx.addresses, image_folder) if ctx.addresses else {}
+        print(f"[INFO] Stores: {', '.join(args.codes)} (addresses {len(ctx.addresses)}, "
+              f"panorama images {fixture})")
+
+        results = {}
+        for name in scenarios:
+            print(f"[INFO] Scenario {name}: {args.iterations} iterations (+{args.warmup} warm-up)", flush=True)
+            results[name] = await run_scenario(name, ctx, args.codes, args.iterations, args.warmup,
+                                               llm_stats, log)
+
+    llm_server.shutdown()
+    geocode_server.shutdown()
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "store_codes": args.codes,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "geocode_latency_ms": args.geocode_latency_ms,
+        },
+        "scenarios": results,
+        "log_file": str(log_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 파이프라인 벤치마크 (로컬 스텁 서버)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, default=None,
+                        help="실행할 시나리오 (반복 지정 가능, 기본: 전체)")
+    parser.add_argument("--codes", nargs="+", default=DEFAULT_STORE_CODES, help="매장 코드")
+    parser.add_argument("--iterations", type=int, default=3, help="매장별 측정 반복 수")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 준비 실행 수")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="LLM 스텁 응답 지연 (ms)")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0, help="LLM 스텁 추가 무작위 지연 상한 (ms)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="LLM 스텁 429/500 응답 비율")
+    parser.add_argument("--geocode-latency-ms", type=float, default=20.0, help="지오코딩 스텁 응답 지연 (ms)")
+    parser.add_argument("--responses", default=str(DEFAULT_RESPONSES_PATH), help="LLM 응답 규칙 JSON")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE_PATH), help="기준선 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준선으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="나빠짐 허용 비율 (0.2 = 20%%)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: output/benchmark/bench_<시각>.json)")
+    args = parser.parse_args()
+
+    # 파이프라인 모듈은 스텁 주소를 환경변수로 설정한 뒤 import (run_benchmark)
+    if not STORE_CSV_PATH.exists():
+        parser.error(f"매장 데이터가 없습니다: {STORE_CSV_PATH}")
+
+    report = asyncio.run(run_benchmark(args))
+
+    baseline_path = Path(args.baseline)
+    comparison = {}
+    if baseline_path.exists():
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print(f"[WARN] Baseline config differs: {baseline.get('config')}")
+        comparison = compare_to_baseline(report["scenarios"], baseline, args.tolerance)
+        report["baseline"] = str(baseline_path)
+    else:
+        print(f"[INFO] No baseline at {baseline_path} (save one with --save-baseline)")
+    report["comparison"] = comparison
+
+    output_path = Path(args.output) if args.output else \
+        DEFAULT_OUTPUT_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(format_report(report["scenarios"], comparison))
+    print(f"[OK] Results: {output_path} (log: {report['log_file']})")
+
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump({k: report[k] for k in ("created_at", "config", "scenarios")}, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Baseline saved: {baseline_path}")
+
+    regressions = [f"{scenario}.{metric}" for scenario, rows in comparison.items()
+                   for metric, row in rows.items() if row["regression"]]
+    if regressions:
+        print(f"[ERROR] Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
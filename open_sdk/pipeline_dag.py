@@ -0,0 +1,329 @@
+"""
+분석 파이프라인 DAG 스케줄러
+- 단계(Step)는 이름, 입력 값 이름, 출력 값 이름을 선언 → 의존 관계는 입력/출력으로 자동 결정
+- 입력이 준비된 단계부터 이벤트 루프에서 동시에 실행
+- 블로킹 단계(blocking=True)는 스레드 풀에서 실행 (코루틴 함수는 스레드 안의 별도 이벤트 루프에서 실행)
+- 단계별 제한 시간과 실패 정책
+    abort    : 파이프라인 중단 (실행 중인 단계 취소, 아직 시작 안 한 단계는 skipped)
+    continue : fallback 값을 출력으로 내보내고 후속 단계 계속 진행
+- 함수가 None을 반환해도 실패로 취급 (기존 단계 함수들은 실패 시 None 반환)
+- 단계 지문(fingerprint): 단계 이름/버전 + 입력 지문 + 단계별 추가 재료
+  입력 지문은 캐시에 저장된 상위 단계 출력이면 그 단계 지문, 그 외(외부 값, fallback, 캐시 안 하는 단계)는 값 내용 해시
+  cache=True 단계는 지문이 같으면 저장된 출력을 재사용 (force로 지정한 단계와 그 하위 단계는 다시 실행)
+- 단계마다 instrumentation span("step") 기록 (추적 중일 때만)
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# 파이프라인 계측 (agents_new/utils/instrumentation.py)
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents_new" / "utils"))
+from instrumentation import span
+
+FAIL_ABORT = "abort"
+FAIL_CONTINUE = "continue"
+
+
+@dataclass
+class Step:
+    """파이프라인 단계 선언"""
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()        # 기본: (name,) / 2개 이상이면 func가 출력 이름을 키로 하는 dict 반환
+    timeout: Optional[float] = None      # 초 (스레드에서 실행 중인 작업은 중단되지 않고 결과만 버림)
+    on_failure: str = FAIL_ABORT
+    fallback: Any = None                 # continue 정책일 때 출력 값 (출력이 여러 개면 출력 이름별 dict)
+    blocking: bool = False
+    cache: bool = False                  # 지문이 같으면 저장된 출력 재사용
+    fingerprint: Optional[Callable[..., Any]] = None   # 입력 kwargs → 추가 지문 재료 (JSON 직렬화 가능한 값)
+    version: str = "1"                   # 단계 로직/프롬프트/모델이 바뀌면 올림
+
+    def __post_init__(self):
+        self.inputs = tuple(self.inputs)
+        self.outputs = tuple(self.outputs) or (self.name,)
+        if self.on_failure not in (FAIL_ABORT, FAIL_CONTINUE):
+            raise ValueError(f"알 수 없는 실패 정책: {self.on_failure}")
+
+
+@dataclass
+class StepResult:
+    """단계 실행 결과 (status: success / cached / failed / timeout / skipped / cancelled)"""
+    name: str
+    status: str
+    elapsed: float = 0.0
+    started_at: Optional[float] = None
+    error: Optional[str] = None
+    fingerprint: Optional[str] = None
+
+
+@dataclass
+class PipelineRun:
+    """파이프라인 실행 결과"""
+    status: str                                  # success / failed
+    values: Dict[str, Any]
+    steps: Dict[str, StepResult]
+    failed_step: Optional[str] = None
+    elapsed: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+
+
+class PipelineAborted(Exception):
+    """abort 정책 단계 실패로 파이프라인 중단 (후속 단계 입력으로 전달)"""
+
+    def __init__(self, step: str):
+        super().__init__(f"{step} 단계 실패로 중단")
+        self.step = step
+
+
+def _digest(material: Any) -> str:
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _step_fingerprint(step: Step, input_fingerprints: List[Optional[str]], kwargs: Dict[str, Any]) -> Optional[str]:
+    """단계 지문 (입력 지문이 없거나 추가 재료를 만들 수 없으면 None → 캐시 사용 안 함)"""
+    if any(fp is None for fp in input_fingerprints):
+        return None
+    try:
+        extra = step.fingerprint(**kwargs) if step.fingerprint else None
+    except Exception as e:
+        # 지문을 못 만들면 캐시 없이 실행
+        print(f"[WARN] Step '{step.name}' fingerprint failed, running without cache: {e}")
+        return None
+    return _digest([step.name, step.version, input_fingerprints, extra])
+
+
+def _call_blocking(name: str, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+    """스레드에서 실행 - 코루틴 함수는 전용 이벤트 루프에서 완료까지 실행"""
+    with span(name, "step"):
+        if inspect.iscoroutinefunction(func):
+            return asyncio.run(func(**kwargs))
+        return func(**kwargs)
+
+
+async def _call_inline(name: str, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+    """이벤트 루프에서 직접 실행"""
+    with span(name, "step"):
+        if inspect.iscoroutinefunction(func):
+            return await func(**kwargs)
+        return func(**kwargs)
+
+
+class PipelineDAG:
+    """단계 의존 그래프 (선언 순서는 의미 없음, 입력/출력으로 순서 결정)"""
+
+    def __init__(self, steps: List[Step], max_workers: Optional[int] = None):
+        self.steps: Dict[str, Step] = {}
+        self.producers: Dict[str, str] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"단계 이름 중복: {step.name}")
+            self.steps[step.name] = step
+            for output in step.outputs:
+                if output in self.producers:
+                    raise ValueError(f"출력 '{output}'을 두 단계가 생성: {self.producers[output]}, {step.name}")
+                self.producers[output] = step.name
+        self.max_workers = max_workers or max(1, sum(1 for s in steps if s.blocking))
+        self.order = self.topological_order()
+
+    def dependencies(self, name: str) -> Set[str]:
+        """단계가 직접 의존하는 단계 이름"""
+        return {self.producers[i] for i in self.steps[name].inputs if i in self.producers}
+
+    def downstream(self, names) -> Set[str]:
+        """지정 단계와 그 출력을 (간접적으로라도) 사용하는 모든 단계"""
+        result = set(names)
+        for name in self.order:
+            if self.dependencies(name) & result:
+                result.add(name)
+        return result
+
+    def topological_order(self) -> List[str]:
+        """의존 순서 (순환이 있으면 ValueError)"""
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"단계 순환 의존: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dep in sorted(self.dependencies(name)):
+                visit(dep, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.steps:
+            visit(name, ())
+        return order
+
+    def external_inputs(self) -> Set[str]:
+        """어느 단계도 생성하지 않는 입력 (run에 초기 값으로 전달해야 함)"""
+        return {i for s in self.steps.values() for i in s.inputs if i not in self.producers}
+
+    def critical_path(self, steps: Dict[str, StepResult]) -> List[str]:
+        """실행 시간 기준 가장 긴 의존 경로"""
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for name in self.order:
+            elapsed = steps[name].elapsed if name in steps else 0.0
+            prev = max((best[d] for d in self.dependencies(name)), key=lambda b: b[0], default=(0.0, []))
+            best[name] = (prev[0] + elapsed, prev[1] + [name])
+        return max(best.values(), key=lambda b: b[0], default=(0.0, []))[1]
+
+    def resolve_force(self, force) -> Set[str]:
+        """--force 단계 목록 → 다시 실행할 단계 (하위 단계 포함, 'all'은 전체)"""
+        force = set(force or ())
+        if "all" in force:
+            return set(self.steps)
+        unknown = force - set(self.steps)
+        if unknown:
+            raise ValueError(f"알 수 없는 단계: {sorted(unknown)}")
+        return self.downstream(force)
+
+    async def run(self, initial: Dict[str, Any], cache=None, force=None) -> PipelineRun:
+        """
+        초기 값(외부 입력)으로 전체 단계 실행
+
+        Args:
+            cache: get(step, fingerprint) / put(step, fingerprint, outputs)를 가진 단계 캐시 (None이면 사용 안 함)
+            force: 캐시를 무시하고 다시 실행할 단계 이름 (하위 단계도 함께 다시 실행)
+        """
+        missing = self.external_inputs() - set(initial)
+        if missing:
+            raise ValueError(f"초기 값 누락: {sorted(missing)}")
+        forced = self.resolve_force(force)
+
+        loop = asyncio.get_running_loop()
+        values: Dict[str, asyncio.Future] = {}
+        fingerprints: Dict[str, Optional[str]] = {}
+        for name, value in initial.items():
+            values[name] = loop.create_future()
+            values[name].set_result(value)
+            fingerprints[name] = _digest(["input", name, value])
+        for output in self.producers:
+            values[output] = loop.create_future()
+
+        results: Dict[str, StepResult] = {}
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+        tasks: Dict[str, asyncio.Task] = {}
+        failed_step: Optional[str] = None
+
+        def publish(step: Step, value: Any, fingerprint: Optional[str] = None):
+            """출력 값 전달 - fingerprint가 없으면 출력 내용 해시를 지문으로 사용"""
+            if len(step.outputs) == 1:
+                value = {step.outputs[0]: value}
+            for output in step.outputs:
+                output_value = value.get(output) if isinstance(value, dict) else None
+                fingerprints[output] = _digest([fingerprint, output] if fingerprint else ["value", output_value])
+                if not values[output].done():
+                    values[output].set_result(value.get(output) if isinstance(value, dict) else None)
+
+        def abort(step: Step):
+            nonlocal failed_step
+            if failed_step is None:
+                failed_step = step.name
+            error = PipelineAborted(step.name)
+            for future in values.values():
+                if not future.done():
+                    future.set_exception(error)
+            for name, task in tasks.items():
+                if name != step.name and not task.done():
+                    task.cancel()
+
+        async def execute(step: Step):
+            try:
+                kwargs = {name: await values[name] for name in step.inputs}
+            except PipelineAborted as e:
+                results[step.name] = StepResult(step.name, "skipped", error=str(e))
+                return
+
+            step_started = time.perf_counter()
+            status, error, value, fingerprint = "success", None, None, None
+            try:
+                input_fingerprints = [fingerprints.get(name) for name in step.inputs]
+                if step.blocking and step.fingerprint:
+                    fingerprint = await loop.run_in_executor(executor, _step_fingerprint, step,
+                                                             input_fingerprints, kwargs)
+                else:
+                    fingerprint = _step_fingerprint(step, input_fingerprints, kwargs)
+                if cache is not None and step.cache and fingerprint and step.name not in forced:
+                    with span("cache.get", "cache", step=step.name) as current:
+                        cached = cache.get(step.name, fingerprint)
+                        current.set(hit=cached is not None)
+                    if cached is not None:
+                        results[step.name] = StepResult(step.name, "cached", time.perf_counter() - step_started,
+                                                        step_started - started, fingerprint=fingerprint)
+                        print(f"[CACHE] Step '{step.name}' reused ({fingerprint[:12]})")
+                        publish(step, cached if len(step.outputs) > 1 else cached[step.outputs[0]], fingerprint)
+                        return
+                if step.blocking:
+                    call = loop.run_in_executor(executor, _call_blocking, step.name, step.func, kwargs)
+                else:
+                    call = _call_inline(step.name, step.func, kwargs)
+                value = await asyncio.wait_for(call, timeout=step.timeout)
+                if value is None:
+                    status, error = "failed", "결과 없음"
+            except asyncio.TimeoutError:
+                status, error = "timeout", f"{step.timeout}초 초과"
+            except asyncio.CancelledError:
+                results[step.name] = StepResult(step.name, "cancelled", time.perf_counter() - step_started,
+                                                step_started - started)
+                raise
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+
+            results[step.name] = StepResult(step.name, status, time.perf_counter() - step_started,
+                                            step_started - started, error, fingerprint)
+            if status == "success":
+                # 캐시에 저장된 출력만 단계 지문으로 식별 (저장 안 된 출력은 다음 실행에서 달라질 수 있으므로 내용 해시)
+                stored = False
+                if cache is not None and step.cache and fingerprint:
+                    outputs = value if len(step.outputs) > 1 else {step.outputs[0]: value}
+                    stored = cache.put(step.name, fingerprint, {name: outputs.get(name) for name in step.outputs})
+                publish(step, value, fingerprint if stored or not step.cache else None)
+            elif step.on_failure == FAIL_CONTINUE:
+                print(f"[WARN] Step '{step.name}' {status} ({error}), continuing with fallback")
+                publish(step, step.fallback)
+            else:
+                print(f"[ERROR] Step '{step.name}' {status} ({error}), aborting pipeline")
+                abort(step)
+
+        try:
+            for name in self.order:
+                tasks[name] = asyncio.ensure_future(execute(self.steps[name]))
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        finally:
+            # 제한 시간 초과로 버려진 스레드 작업은 기다리지 않음
+            executor.shutdown(wait=False)
+
+        for name in self.order:
+            results.setdefault(name, StepResult(name, "skipped"))
+        done_values = {name: f.result() for name, f in values.items()
+                       if f.done() and not f.cancelled() and f.exception() is None}
+        return PipelineRun(
+            status="failed" if failed_step else "success",
+            values=done_values,
+            steps={name: results[name] for name in self.order},
+            failed_step=failed_step,
+            elapsed=time.perf_counter() - started,
+            critical_path=self.critical_path(results),
+        )
+
+
+def format_step_timings(run: PipelineRun) -> str:
+    """단계별 시작 시점/소요 시간 표 (콘솔 출력용)"""
+    lines = [f"   {'step':<18} {'status':<10} {'start':>8} {'elapsed':>9}"]
+    for result in run.steps.values():
+        start = f"{result.started_at:7.1f}s" if result.started_at is not None else "-"
+        lines.append(f"   {result.name:<18} {result.status:<10} {start:>8} {result.elapsed:8.1f}s")
+    lines.append(f"   total {run.elapsed:.1f}s, critical path: {' -> '.join(run.critical_path)}")
+    return "\n".join(lines)
@@ -0,0 +1,279 @@
+"""
+다중 매장 파이프라인 실행기
+- 워커 프로세스 풀을 한 번 띄워 여러 매장 코드를 연속 처리 (매장마다 새 파이썬 프로세스를 띄우지 않음)
+- 워커는 시작 시 한 번만 준비: 매장 테이블, 공간 레이어(SHP), 분석 모듈 import(geopandas/matplotlib/langchain 등), LLM 클라이언트
+- 워커마다 이벤트 루프 하나를 계속 사용 (루프에 묶인 클라이언트도 작업 간 재사용)
+- 매장 코드는 인자, 파일, 표준입력(한 줄에 하나, 들어오는 대로 처리)으로 받음
+- 매장별 상태/소요 시간은 끝나는 대로 콘솔과 JSONL에 기록, 상세 로그는 매장별 파일로 분리
+    (시간 초과로 남은 단계 스레드가 매장 처리 후에 출력하면 워커 로그로)
+
+    python pipeline_runner.py 000F03E44A 002816BA73
+    python pipeline_runner.py --codes-file codes.txt --workers 4
+    cat codes.txt | python pipeline_runner.py --codes-file -
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "output" / "runner"
+
+
+# ----------------------------------------------------------------------
+# 워커 프로세스
+# ----------------------------------------------------------------------
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_log_dir: Optional[Path] = None
+_worker_log = None
+
+
+class _StoreLog:
+    """
+    매장별 로그 파일 - 닫힌 뒤에 들어온 출력은 워커 로그로 보냄
+
+    시간 초과로 버려진 단계 스레드는 매장 처리가 끝난 뒤에도 출력할 수 있고,
+    그 사이 만들어진 로깅 핸들러 등은 이 객체를 계속 들고 있으므로 파일 대신 이 객체를 stdout/stderr로 씀
+    """
+
+    def __init__(self, path: Path, fallback):
+        self._file = open(path, 'w', encoding='utf-8')
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self.encoding = self._file.encoding
+
+    def _target(self):
+        return self._fallback if self._file.closed else self._file
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            return self._target().write(text)
+
+    def flush(self):
+        with self._lock:
+            self._target().flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        return self._target().fileno()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "_StoreLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _warm_llm_client():
+    """마케팅 단계와 같은 경로로 Gemini 클라이언트 생성 (공용 설정/연결 풀 적재)"""
+    from dynamic_persona_generator import DynamicPersonaGenerator
+
+    if DynamicPersonaGenerator().gemini_client is None:
+        raise RuntimeError("GeminiClient 초기화 실패")
+
+
+def _warm_up():
+    """분석에 쓰는 무거운 상태를 미리 적재 (실패한 항목은 첫 분석 때 다시 시도됨)"""
+    import run_analysis
+
+    tasks = [
+        ("store table", lambda: __import__("store_table").get_store_table(str(run_analysis.STORE_CSV_PATH))),
+        ("spatial layers", lambda: __import__("spatial_matcher").load_shp_files()),
+        ("store agent", lambda: run_analysis._load_module("store_agent_module", run_analysis.STORE_AGENT_MODULE_PATH)),
+        ("panorama", lambda: run_analysis._load_module("analyze_area_by_address", run_analysis.PANORAMA_MODULE_PATH)),
+        ("marketing agent", lambda: __import__("marketing_agent")),
+        ("gemini client", _warm_llm_client),
+    ]
+    for name, task in tasks:
+        started = time.perf_counter()
+        try:
+            task()
+            print(f"[OK] warm-up {name}: {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"[WARN] warm-up {name} failed: {e}")
+
+
+def _init_worker(log_dir: str):
+    """워커마다 한 번: 이벤트 루프 생성 + 상태 적재 (로그는 worker_<pid>.log, 워커가 끝날 때까지 열어 둠)"""
+    global _worker_loop, _worker_log_dir, _worker_log
+    sys.path.insert(0, str(Path(__file__).parent))
+    _worker_log_dir = Path(log_dir)
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    # 매장 처리 밖의 출력(준비 단계, 늦게 끝난 단계 스레드)은 모두 워커 로그로
+    _worker_log = open(_worker_log_dir / f"worker_{os.getpid()}.log", 'a', encoding='utf-8', buffering=1)
+    sys.stdout = sys.stderr = _worker_log
+    _warm_up()
+
+
+def _run_store(store_code: str, force: Optional[List[str]], use_cache: bool) -> Dict[str, Any]:
+    """매장 하나 분석 → 결과 레코드 (파이프라인 출력은 매장별 로그 파일로)"""
+    from run_analysis import run_full_analysis_pipeline
+
+    log_path = _worker_log_dir / f"{store_code}.log"
+    started = time.perf_counter()
+    with _StoreLog(log_path, _worker_log) as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            result = _worker_loop.run_until_complete(run_full_analysis_pipeline(store_code, force, use_cache))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "store_code": store_code,
+        "status": result.get("status", "failed"),
+        "failed_step": result.get("step"),
+        "error": result.get("error"),
+        "output_file": result.get("output_file"),
+        "elapsed_sec": round(time.perf_counter() - started, 2),
+        "step_timings": result.get("step_timings"),
+        "trace_files": result.get("trace_files"),
+        "log_file": str(log_path),
+        "worker_pid": os.getpid(),
+    }
+
+
+# ----------------------------------------------------------------------
+# 실행기
+# ----------------------------------------------------------------------
+class PipelineRunner:
+    """
+    장기 실행 워커 풀
+
+        with PipelineRunner(workers=4) as runner:
+            for record in runner.run(codes):
+                ...
+    """
+
+    def __init__(self, workers: Optional[int] = None, log_dir: Optional[str] = None,
+                 force: Optional[List[str]] = None, use_cache: bool = True):
+        self.workers = workers or DEFAULT_WORKERS
+        self.force = list(force or [])
+        if self.force:
+            # 단계 이름은 작업 제출 전에 한 번 확인 (잘못되면 매장마다 워커에서 실패하므로)
+            sys.path.insert(0, str(Path(__file__).parent))
+            from run_analysis import build_analysis_pipeline
+            build_analysis_pipeline().resolve_force(self.force)
+        self.log_dir = Path(log_dir) if log_dir else DEFAULT_OUTPUT_DIR / "logs"
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.use_cache = use_cache
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(str(self.log_dir),))
+
+    def submit(self, store_code: str) -> Future:
+        """매장 하나 제출 → 결과 레코드 Future"""
+        return self.executor.submit(_run_store, store_code, self.force, self.use_cache)
+
+    def run(self, store_codes: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        매장 코드를 받는 대로 제출하고 끝나는 순서대로 결과 레코드 반환
+
+        동시에 대기하는 작업은 워커 수의 2배까지만 유지 (표준입력처럼 끝이 없는 입력도 처리)
+        """
+        max_in_flight = self.workers * 2
+        in_flight: Dict[Future, str] = {}
+        seen = set()
+
+        def drain(block_until_below: int) -> Iterator[Dict[str, Any]]:
+            while len(in_flight) > block_until_below:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    store_code = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        # 워커 프로세스 자체가 죽은 경우 등
+                        yield {"store_code": store_code, "status": "failed",
+                               "error": f"{type(e).__name__}: {e}"}
+
+        for store_code in store_codes:
+            store_code = store_code.strip()
+            if not store_code or store_code.startswith("#") or store_code in seen:
+                continue
+            seen.add(store_code)
+            in_flight[self.submit(store_code)] = store_code
+            yield from drain(max_in_flight - 1)
+        yield from drain(0)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> "PipelineRunner":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_codes(codes: List[str], codes_file: Optional[str]) -> Iterable[str]:
+    """인자 → 파일/표준입력 순으로 매장 코드 (파일은 한 줄씩 읽어 바로 넘김)"""
+    yield from codes
+    if codes_file == "-":
+        yield from sys.stdin
+    elif codes_file:
+        with open(codes_file, 'r', encoding='utf-8') as f:
+            yield from f
+
+
+def main():
+    from run_analysis import STEP_VERSIONS
+
+    parser = argparse.ArgumentParser(description="여러 매장 통합 분석 (워커 풀 재사용)")
+    parser.add_argument("store_codes", nargs="*", help="매장 코드")
+    parser.add_argument("--codes-file", default=None, help="매장 코드 파일 (한 줄에 하나, '-'는 표준입력)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="워커 프로세스 수")
+    parser.add_argument("--output", default=None, help="결과 JSONL 경로 (기본: output/runner/run_<시각>.jsonl)")
+    parser.add_argument("--log-dir", default=None, help="매장별 로그 폴더 (기본: output/runner/logs)")
+    parser.add_argument("--force", action="append", default=[], metavar="STEP",
+                        choices=sorted(STEP_VERSIONS) + ["all"],
+                        help="캐시를 무시하고 다시 실행할 단계 (하위 단계 포함, 'all'은 전체)")
+    parser.add_argument("--no-cache", action="store_true", help="단계 캐시 사용 안 함")
+    args = parser.parse_args()
+
+    if not args.store_codes and not args.codes_file:
+        parser.error("매장 코드 또는 --codes-file을 지정하세요")
+
+    output_path = Path(args.output) if args.output else \
+        DEFAULT_OUTPUT_DIR / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    summary = {"succeeded": 0, "failed": 0, "output_path": str(output_path)}
+    started = time.perf_counter()
+    print(f"[INFO] Workers: {args.workers}, results: {output_path}")
+    with PipelineRunner(args.workers, args.log_dir, args.force, not args.no_cache) as runner, \
+            open(output_path, 'a', encoding='utf-8') as out:
+        for record in runner.run(_read_codes(args.store_codes, args.codes_file)):
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+
+            ok = record["status"] == "success"
+            summary["succeeded" if ok else "failed"] += 1
+            done = summary["succeeded"] + summary["failed"]
+            detail = record.get("output_file") if ok else (record.get("failed_step") or record.get("error"))
+            print(f"[{'OK' if ok else 'ERROR'}] {record['store_code']} {record['status']} "
+                  f"{record.get('elapsed_sec', 0):.1f}s (#{done}) {detail or ''}", flush=True)
+
+    elapsed = time.perf_counter() - started
+    done = summary["succeeded"] + summary["failed"]
+    summary["elapsed_sec"] = round(elapsed, 2)
+    summary["stores_per_min"] = round(done / elapsed * 60, 2) if elapsed > 0 else None
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
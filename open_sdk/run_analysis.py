@@ -3,6 +3,7 @@ Integrated Analysis Pipeline - Store Agent → Marketing Agent Direct Connection
 Implemented as regular Python functions, not Agent format
 """
 import asyncio
+import os
 import sys
 import json
 from pathlib import Path
@@ -17,10 +18,39 @@ sys.path.insert(0, str(project_root / "agents_new" / "store_agent" / "report_bui
 sys.path.insert(0, str(project_root / "agents_new" / "marketing_agent"))
 sys.path.insert(0, str(project_root / "agents_new" / "panorama_img_anal"))
 sys.path.insert(0, str(project_root / "open_sdk"))  # For spatial_matcher module
+sys.path.insert(0, str(project_root / "agents_new" / "utils"))  # For artifact_store module
+
+# 단계 간 산출물은 내용 주소 저장소의 하드링크로 배치 (같은 파일을 여러 번 복사하지 않음)
+from artifact_store import get_artifact_store, link_file, link_tree
+from pipeline_dag import PipelineDAG, Step, FAIL_CONTINUE, format_step_timings
+from step_cache import get_step_cache
+from instrumentation import start_trace, stop_trace
 
 # matplotlib은 store_agent_module에서만 사용 (여기서는 제거)
 MATPLOTLIB_AVAILABLE = False
 
+STORE_AGENT_MODULE_PATH = project_root / "agents_new" / "store_agent" / "report_builder" / "store_agent_module.py"
+PANORAMA_MODULE_PATH = project_root / "agents_new" / "panorama_img_anal" / "analyze_area_by_address.py"
+
+
+def _load_module(name: str, module_path: Path):
+    """Load a module from file once per process (reused by later analyses in the same process)"""
+    import importlib.util
+    
+    module = sys.modules.get(name)
+    if module is not None and Path(getattr(module, "__file__", "")).resolve() == module_path.resolve():
+        return module
+    
+    spec = importlib.util.spec_from_file_location(name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules.pop(name, None)
+        raise
+    return module
+
 
 async def run_store_analysis(store_code: str) -> Dict[str, Any]:
     """Step 1: Execute Store Agent Analysis"""
@@ -30,13 +60,7 @@ async def run_store_analysis(store_code: str) -> Dict[str, Any]:
     
     try:
         # Import module directly
-        import importlib.util
-        module_path = project_root / "agents_new" / "store_agent" / "report_builder" / "store_agent_module.py"
-        
-        spec = importlib.util.spec_from_file_location("store_agent_module", module_path)
-        store_module = importlib.util.module_from_spec(spec)
-        sys.modules["store_agent_module"] = store_module
-        spec.loader.exec_module(store_module)
+        store_module = _load_module("store_agent_module", STORE_AGENT_MODULE_PATH)
         
         StoreAgentModule = store_module.StoreAgentModule
         StoreAgentState = store_module.StoreAgentState
@@ -85,49 +109,31 @@ def _get_address_from_store_code(store_code: str) -> str:
     """Extract address from store code"""
     try:
         import pandas as pd
+        from store_table import get_store_table
         csv_path = project_root / "agents_new" / "store_agent" / "store_data" / "final_merged_data.csv"
         
         if not csv_path.exists():
             return None
         
-        # Try multiple encodings
-        encodings = ['cp949', 'utf-8', 'euc-kr', 'latin1']
-        df = None
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(csv_path, encoding=encoding, low_memory=False)
-                print(f"[INFO] CSV loaded successfully: {encoding} encoding")
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if df is None:
-            print(f"[ERROR] All encoding attempts failed")
-            return None
-        
-        # Code column name
-        code_col = '코드'
+        # Columnar cache with store-code index (CSV is parsed only when it changes)
+        store_table = get_store_table(str(csv_path))
         
-        # Find matching row
-        matched = df[df[code_col] == store_code]
-        
-        if matched.empty:
+        if store_code not in store_table:
             print(f"[ERROR] Store code {store_code} not found")
             return None
         
         # Address column
         address_col = '기준면적'
-        if address_col in df.columns:
-            address = matched[address_col].iloc[0]
-            if pd.isna(address) or not address:
-                print(f"[ERROR] Address is empty for store code {store_code}")
-                return None
-            print(f"[OK] Address extracted successfully: {address}")
-            return str(address)
-        
-        print(f"[ERROR] Address column '{address_col}' not found")
-        return None
+        if address_col not in store_table.columns:
+            print(f"[ERROR] Address column '{address_col}' not found")
+            return None
+        
+        address = store_table.get_first_value(store_code, address_col)
+        if pd.isna(address) or not address:
+            print(f"[ERROR] Address is empty for store code {store_code}")
+            return None
+        print(f"[OK] Address extracted successfully: {address}")
+        return str(address)
         
     except Exception as e:
         print(f"[WARN] Address extraction failed: {e}")
@@ -462,7 +468,6 @@ async def run_mobility_analysis(address: str, dong: str = None) -> Dict[str, Any
     print("="*60)
     
     try:
-        import shutil
         from datetime import datetime
         
         # Use dong (if already extracted) or extract from address
@@ -499,7 +504,7 @@ async def run_mobility_analysis(address: str, dong: str = None) -> Dict[str, Any
         if json_files:
             src_json = json_files[0]
             dest_json = output_dir / "mobility_data.json"
-            shutil.copy2(src_json, dest_json)
+            link_file(src_json, dest_json)
             print(f"   [OK] JSON copied: {src_json.name}")
         else:
             print(f"   [WARN] No JSON file found")
@@ -511,7 +516,7 @@ async def run_mobility_analysis(address: str, dong: str = None) -> Dict[str, Any
         
         for png_file in png_files:
             dest_png = output_dir / png_file.name
-            shutil.copy2(png_file, dest_png)
+            link_file(png_file, dest_png)
             copied_charts.append(str(dest_png))
         
         print(f"[OK] Mobility analysis completed")
@@ -546,16 +551,9 @@ async def run_panorama_analysis(address: str) -> Dict[str, Any]:
     print("="*60)
     
     try:
-        import importlib.util
-        import shutil
         from datetime import datetime
         
-        spec = importlib.util.spec_from_file_location(
-            "analyze_area_by_address",
-            project_root / "agents_new" / "panorama_img_anal" / "analyze_area_by_address.py"
-        )
-        panorama_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(panorama_module)
+        panorama_module = _load_module("analyze_area_by_address", PANORAMA_MODULE_PATH)
         
         print(f"Address: {address}")
         print("Analyzing panorama images... (3-5 minutes)")
@@ -610,13 +608,13 @@ async def run_panorama_analysis(address: str) -> Dict[str, Any]:
             # Copy HTML map
             html_file = original_folder / "analysis_map.html"
             if html_file.exists():
-                shutil.copy2(html_file, output_dir / "analysis_map.html")
+                link_file(html_file, output_dir / "analysis_map.html")
             
             # Copy images folder
             images_folder = original_folder / "images"
             if images_folder.exists():
                 dest_images = output_dir / "images"
-                shutil.copytree(images_folder, dest_images, dirs_exist_ok=True)
+                link_tree(images_folder, dest_images)
             
             print(f"   Results copied: {output_dir}")
         
@@ -646,7 +644,6 @@ def get_marketplace_json(address: str) -> Dict[str, Any]:
     
     try:
         import re
-        import shutil
         from datetime import datetime
         
         # Marketplace analysis results directory
@@ -763,7 +760,7 @@ Answer with the nearest marketplace name only."""
         output_dir.mkdir(parents=True, exist_ok=True)
         
         dest_file = output_dir / "marketplace_data.json"
-        shutil.copy2(best_match, dest_file)
+        link_file(best_match, dest_file)
         print(f"   Saved: marketplace_data.json")
         
         return {
@@ -791,9 +788,9 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
     print("[Step 7] Saving Results")
     print("="*60)
     
+    # 산출물 저장소 통계는 프로세스 누적값 → 이번 저장분만 출력하도록 시작 시점 값 보관 (워커 재사용 시)
+    stats_before = dict(get_artifact_store().stats)
     try:
-        import shutil
-        
         # 출력 폴더 생성
         output_dir = Path(__file__).parent / "output"
         output_dir.mkdir(exist_ok=True)
@@ -881,7 +878,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
             original_report = Path(store_analysis["output_file_path"])
             if original_report.exists():
                 dest_report = result_dir / "store_analysis_report.json"
-                shutil.copy2(original_report, dest_report)
+                link_file(original_report, dest_report)
                 print(f"[OK] Store analysis original: store_analysis_report.json")
         
         # Copy Store charts
@@ -894,7 +891,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
             for chart_name, chart_path in chart_files.items():
                 if chart_path and Path(chart_path).exists():
                     dest = chart_dir / Path(chart_path).name
-                    shutil.copy2(chart_path, dest)
+                    link_file(chart_path, dest)
             
             print(f"[OK] Store charts: {len(chart_files)} -> store_charts/")
         
@@ -910,7 +907,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
             mobility_charts = Path(mobility_result["output_dir"])
             if mobility_charts.exists():
                 dest_mobility = result_dir / "mobility_charts"
-                shutil.copytree(mobility_charts, dest_mobility, dirs_exist_ok=True)
+                link_tree(mobility_charts, dest_mobility)
                 print(f"[OK] Mobility charts: {len(list(mobility_charts.glob('*.png')))} -> mobility_charts/")
         
         # Copy Panorama results (already in open_sdk/output)
@@ -918,7 +915,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
             panorama_folder = Path(panorama_result["copied_output_folder"])
             if panorama_folder.exists():
                 dest_panorama = result_dir / "panorama"
-                shutil.copytree(panorama_folder, dest_panorama, dirs_exist_ok=True)
+                link_tree(panorama_folder, dest_panorama)
                 print(f"[OK] Panorama results -> panorama/")
         
         # Copy Marketplace data
@@ -926,7 +923,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
             marketplace_folder = Path(marketplace_result["output_dir"])
             if marketplace_folder.exists():
                 dest_marketplace = result_dir / "marketplace"
-                shutil.copytree(marketplace_folder, dest_marketplace, dirs_exist_ok=True)
+                link_tree(marketplace_folder, dest_marketplace)
                 print(f"[OK] Marketplace results -> marketplace/")
         
         # Copy Spatial visualization files
@@ -938,7 +935,7 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
                 map_src = Path(viz_files["map_file"])
                 if map_src.exists():
                     map_dest = result_dir / "spatial_map.html"
-                    shutil.copy2(map_src, map_dest)
+                    link_file(map_src, map_dest)
                     print(f"[OK] Spatial map: spatial_map.html")
             
             # Copy chart file
@@ -946,9 +943,13 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
                 chart_src = Path(viz_files["chart_file"])
                 if chart_src.exists():
                     chart_dest = result_dir / "spatial_analysis.png"
-                    shutil.copy2(chart_src, chart_dest)
+                    link_file(chart_src, chart_dest)
                     print(f"[OK] Spatial chart: spatial_analysis.png")
         
+        stats = {key: value - stats_before.get(key, 0) for key, value in get_artifact_store().stats.items()}
+        print(f"[OK] Artifacts: {stats['linked']} linked, {stats['copied']} copied, "
+              f"{stats['stored']} new objects ({stats['stored_bytes'] / 1024 / 1024:.1f} MB)")
+        
         print(f"\n[SAVE] All results saved successfully: {result_dir.name}/")
         
         return str(output_file)
@@ -960,90 +961,209 @@ def save_results(store_code: str, store_analysis: Dict[str, Any],
         return None
 
 
-async def run_full_analysis_pipeline(store_code: str) -> Dict[str, Any]:
-    """Execute full analysis pipeline (integrated with spatial_matcher)"""
-    print("\n" + "="*60)
-    print("INTEGRATED ANALYSIS PIPELINE START")
-    print("="*60)
-    print(f"\n[INFO] Store code: {store_code}")
-    print(f"[INFO] Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Step 0: Address information analysis (using spatial_matcher)
+# 단계별 제한 시간 (초)
+STEP_TIMEOUTS = {
+    "address_extraction": 60,
+    "spatial": 180,
+    "store_analysis": 900,
+    "data_conversion": 30,
+    "marketing": 900,
+    "mobility": 120,
+    "panorama": 1200,
+    "marketplace": 120,
+    "save": 300,
+}
+DEFAULT_DONG = "왕십리2동"
+
+# 단계 버전 - 단계 로직, 프롬프트, 모델이 바뀌면 올려서 이전 캐시 무효화
+STEP_VERSIONS = {
+    "address_extraction": "1",
+    "spatial": "1",
+    "store_analysis": "1",
+    "data_conversion": "1",
+    "marketing": "1",
+    "mobility": "1",
+    "panorama": "1",
+    "marketplace": "1",
+    "save": "1",
+}
+STORE_CSV_PATH = project_root / "agents_new" / "store_agent" / "store_data" / "final_merged_data.csv"
+MOBILITY_DATA_DIR = project_root / "agents_new" / "data outputs" / "이동분석_결과"
+MARKETPLACE_DATA_DIR = project_root / "agents_new" / "data outputs" / "상권분석서비스_결과"
+# 실행별 계측 기록 (trace_analysis_<매장코드>_<시각>.jsonl) - 결과 폴더에 저장, 저장 단계가 실패하면 이 폴더
+TRACE_OUTPUT_DIR = Path(__file__).parent / "output" / "traces"
+
+
+def _dir_fingerprint(path: Path) -> list:
+    """폴더 안 파일 목록 (이름, mtime, 크기) - 원본 데이터가 바뀌면 값이 바뀜"""
+    if not path.exists():
+        return []
+    return sorted((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in path.iterdir() if p.is_file())
+
+
+def _store_fingerprint(store_code: str, **_) -> Dict[str, Any]:
+    from store_table import get_store_table
+    return {"store": get_store_table(str(STORE_CSV_PATH)).fingerprint(store_code),
+            "model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash")}
+
+
+def _model_fingerprint(**_) -> Dict[str, Any]:
+    return {"model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash")}
+
+
+def _spatial_fingerprint(**_) -> Dict[str, Any]:
+    # 행정동/상권 SHP 레이어가 바뀌면 동/상권 매칭을 다시 계산
+    from spatial_matcher import layer_fingerprint
+    return layer_fingerprint()
+
+
+def _mobility_fingerprint(dong: str, **_) -> list:
+    return _dir_fingerprint(MOBILITY_DATA_DIR / dong) if dong else []
+
+
+def _marketplace_fingerprint(**_) -> list:
+    return _dir_fingerprint(MARKETPLACE_DATA_DIR)
+
+
+def _path_stat(path) -> Any:
+    if not path or not Path(path).exists():
+        return None
+    stat = Path(path).stat()
+    return [str(path), stat.st_mtime_ns, stat.st_size]
+
+
+def _panorama_fingerprint(**_) -> Dict[str, Any]:
+    # 파노라마 포인트 CSV, 이미지 폴더(이미지 추가/삭제 시 mtime 변경)
+    return {"panoid_file": _path_stat(os.getenv('PANOID_FILE')),
+            "image_folder": _path_stat(os.getenv('IMAGE_FOLDER')),
+            "model": os.getenv("GEMINI_MODEL", "gemini-2.5-flash")}
+
+
+def run_spatial_analysis(address: str) -> Dict[str, Any]:
+    """Step 0: Address information analysis (spatial_matcher) - returns spatial_info and dong"""
     print("\n" + "="*60)
     print("[Step 0] Address Information Analysis (spatial_matcher)")
     print("="*60)
     
-    # Extract address from Store Agent
-    address = _get_address_from_store_code(store_code)
-    if not address:
-        print(f"\n[ERROR] Failed to extract address from store code {store_code}")
-        return {"status": "failed", "step": "address_extraction"}
-    
-    print(f"[INFO] Analysis address: {address}")
-    
-    # Analyze address with spatial_matcher
     try:
         from spatial_matcher import get_location_info
         
         spatial_info = get_location_info(address, create_visualization=True)
         
         if spatial_info["status"] == "success":
-            dong = spatial_info["dong"]
-            marketplace_info = spatial_info["marketplace"]
-            visualization_files = spatial_info["visualization"]
-            
-            print(f"[OK] Administrative dong: {dong}")
-            print(f"[OK] Marketplace: {marketplace_info.get('상권명') if marketplace_info else 'N/A'}")
+            print(f"[OK] Administrative dong: {spatial_info['dong']}")
+            print(f"[OK] Marketplace: {spatial_info['marketplace'].get('상권명') if spatial_info['marketplace'] else 'N/A'}")
             print(f"[OK] Visualization: map/chart generated")
-        else:
-            print(f"[WARN] spatial_matcher failed, using default values")
-            dong = "왕십리2동"  # Default
-            marketplace_info = None
-            visualization_files = None
-            
+            return {"spatial_info": spatial_info, "dong": spatial_info["dong"]}
+        
+        print(f"[WARN] spatial_matcher failed, using default values")
+        return {"spatial_info": spatial_info, "dong": DEFAULT_DONG}
+        
     except Exception as e:
         print(f"[WARN] spatial_matcher error: {e}")
-        dong = "왕십리2동"  # Default
-        marketplace_info = None
-        visualization_files = None
-    
-    # Step 1: Store Agent analysis
-    store_analysis = await run_store_analysis(store_code)
-    if not store_analysis:
-        print("\n[ERROR] Pipeline interrupted due to Store Agent analysis failure")
-        return {"status": "failed", "step": "store_analysis"}
+        return {"spatial_info": None, "dong": DEFAULT_DONG}
+
+
+def build_analysis_pipeline() -> PipelineDAG:
+    """
+    Analysis pipeline as a dependency graph
     
-    # Step 2: Data conversion
-    store_report = convert_store_to_marketing_format(store_analysis)
-    if not store_report:
-        print("\n[ERROR] Pipeline interrupted due to data conversion failure")
-        return {"status": "failed", "step": "data_conversion"}
+    store_code → address_extraction → spatial(dong) → mobility
+                                    → panorama, marketplace
+               → store_analysis → data_conversion → marketing
+    all → save
     
-    # Step 3: Marketing Agent analysis
-    marketing_result = await run_marketing_analysis(store_report)
-    if not marketing_result:
-        print("\n[WARN] Marketing Agent failed, continuing pipeline")
-        marketing_result = {"status": "failed"}
+    Cached steps are reused when their fingerprint (inputs + step version + source data) is unchanged
+    """
+    failed = {"status": "failed"}
+    steps = [
+        Step("address_extraction", _get_address_from_store_code, inputs=("store_code",), outputs=("address",),
+             timeout=STEP_TIMEOUTS["address_extraction"], blocking=True,
+             fingerprint=_store_fingerprint),
+        Step("spatial", run_spatial_analysis, inputs=("address",), outputs=("spatial_info", "dong"),
+             timeout=STEP_TIMEOUTS["spatial"], blocking=True, on_failure=FAIL_CONTINUE,
+             fallback={"spatial_info": None, "dong": DEFAULT_DONG}, cache=True,
+             fingerprint=_spatial_fingerprint),
+        Step("store_analysis", run_store_analysis, inputs=("store_code",),
+             timeout=STEP_TIMEOUTS["store_analysis"], blocking=True, cache=True,
+             fingerprint=_store_fingerprint),
+        Step("data_conversion", convert_store_to_marketing_format, inputs=("store_analysis",), outputs=("store_report",),
+             timeout=STEP_TIMEOUTS["data_conversion"]),
+        Step("marketing", run_marketing_analysis, inputs=("store_report",), outputs=("marketing_result",),
+             timeout=STEP_TIMEOUTS["marketing"], blocking=True, on_failure=FAIL_CONTINUE, fallback=failed,
+             cache=True, fingerprint=_model_fingerprint),
+        Step("mobility", run_mobility_analysis, inputs=("address", "dong"), outputs=("mobility_result",),
+             timeout=STEP_TIMEOUTS["mobility"], blocking=True, on_failure=FAIL_CONTINUE, fallback=failed,
+             cache=True, fingerprint=_mobility_fingerprint),
+        Step("panorama", run_panorama_analysis, inputs=("address",), outputs=("panorama_result",),
+             timeout=STEP_TIMEOUTS["panorama"], blocking=True, on_failure=FAIL_CONTINUE, fallback=failed,
+             cache=True, fingerprint=_panorama_fingerprint),
+        Step("marketplace", get_marketplace_json, inputs=("address",), outputs=("marketplace_result",),
+             timeout=STEP_TIMEOUTS["marketplace"], blocking=True, on_failure=FAIL_CONTINUE, fallback=failed,
+             cache=True, fingerprint=_marketplace_fingerprint),
+        Step("save", save_results,
+             inputs=("store_code", "store_analysis", "marketing_result", "mobility_result",
+                     "panorama_result", "marketplace_result", "spatial_info"),
+             outputs=("output_file",), timeout=STEP_TIMEOUTS["save"], blocking=True,
+             on_failure=FAIL_CONTINUE, cache=True),
+    ]
+    for step in steps:
+        step.version = STEP_VERSIONS[step.name]
+    return PipelineDAG(steps)
+
+
+async def run_full_analysis_pipeline(store_code: str, force=None, use_cache: bool = True,
+                                     chrome_trace: bool = None) -> Dict[str, Any]:
+    """
+    Execute full analysis pipeline (integrated with spatial_matcher)
     
-    # Step 4: Mobility analysis (Mandatory)
-    mobility_result = await run_mobility_analysis(address, dong)
+    Args:
+        store_code: Store code
+        force: Step names to re-run regardless of cache (their downstream steps re-run too, "all" for every step)
+        use_cache: Reuse outputs of steps whose fingerprint is unchanged
+        chrome_trace: Also write a Chrome trace-event file (default: PIPELINE_CHROME_TRACE=1)
+    """
+    if chrome_trace is None:
+        chrome_trace = os.getenv('PIPELINE_CHROME_TRACE') == '1'
+
+    print("\n" + "="*60)
+    print("INTEGRATED ANALYSIS PIPELINE START")
+    print("="*60)
+    print(f"\n[INFO] Store code: {store_code}")
+    print(f"[INFO] Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Step 5: Panorama analysis (Mandatory)
-    panorama_result = await run_panorama_analysis(address)
+    # Independent steps (store/marketing, spatial/mobility, panorama, marketplace) run concurrently
+    start_trace(f"analysis_{store_code}")
+    try:
+        run = await build_analysis_pipeline().run({"store_code": store_code},
+                                                  cache=get_step_cache() if use_cache else None,
+                                                  force=force)
+    finally:
+        trace = stop_trace()
+    values = run.values
+    # 계측 기록은 분석 결과(analysis_result.json)와 같은 폴더에
+    output_file = values.get("output_file")
+    trace_dir = Path(output_file).parent if output_file else TRACE_OUTPUT_DIR
+    trace_files = [str(p) for p in trace.write(trace_dir, chrome=chrome_trace)]
     
-    # Step 6: Marketplace analysis (Mandatory)
-    marketplace_result = get_marketplace_json(address)
+    if run.failed_step:
+        messages = {
+            "address_extraction": f"Failed to extract address from store code {store_code}",
+            "store_analysis": "Pipeline interrupted due to Store Agent analysis failure",
+            "data_conversion": "Pipeline interrupted due to data conversion failure",
+        }
+        print(f"\n[ERROR] {messages.get(run.failed_step, f'Pipeline interrupted at step {run.failed_step}')}")
+        print(format_step_timings(run))
+        print(trace.format_summary())
+        return {"status": "failed", "step": run.failed_step, "trace_files": trace_files}
     
-    # Step 7: Save results (including visualization files)
-    output_file = save_results(
-        store_code, 
-        store_analysis, 
-        marketing_result,
-        mobility_result,
-        panorama_result,
-        marketplace_result,
-        spatial_info=spatial_info if 'spatial_info' in locals() else None
-    )
+    dong = values["dong"]
+    spatial_info = values["spatial_info"]
+    marketing_result = values["marketing_result"]
+    mobility_result = values["mobility_result"]
+    panorama_result = values["panorama_result"]
+    marketplace_result = values["marketplace_result"]
+    visualization_files = spatial_info.get("visualization") if spatial_info and spatial_info.get("status") == "success" else None
     
     # Completion summary
     print("\n" + "="*60)
@@ -1057,6 +1177,11 @@ async def run_full_analysis_pipeline(store_code: str) -> Dict[str, Any]:
     print(f"   [WARN] Panorama: {panorama_result.get('status', 'unknown')}")
     print(f"   [INFO] Marketplace: {marketplace_result.get('status', 'unknown')}")
     
+    print(f"\n[TIMING] Steps:")
+    print(format_step_timings(run))
+    print(f"\n[TRACE] Instrumentation: {trace_files[0]}")
+    print(trace.format_summary())
+    
     if output_file:
         print(f"\n[OUTPUT] Output file: {output_file}")
     
@@ -1070,23 +1195,32 @@ async def run_full_analysis_pipeline(store_code: str) -> Dict[str, Any]:
         "status": "success",
         "store_code": store_code,
         "output_file": output_file,
-        "store_analysis": store_analysis,
+        "store_analysis": values["store_analysis"],
         "marketing_result": marketing_result,
-        "spatial_info": spatial_info if 'spatial_info' in locals() else None
+        "spatial_info": spatial_info,
+        "step_timings": {name: {"status": r.status, "elapsed": round(r.elapsed, 2)} for name, r in run.steps.items()},
+        "trace_files": trace_files,
     }
 
 
 async def main():
     """Main function"""
-    # Default test store code
-    store_code = "000F03E44A"
+    import argparse
     
-    # Use command line argument if available
-    if len(sys.argv) > 1:
-        store_code = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Integrated store analysis pipeline")
+    # Default test store code
+    parser.add_argument("store_code", nargs="?", default="000F03E44A")
+    parser.add_argument("--force", action="append", default=[], metavar="STEP",
+                        choices=sorted(STEP_VERSIONS) + ["all"],
+                        help="Re-run a step (and everything downstream of it) ignoring the cache; repeatable")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the step cache")
+    parser.add_argument("--chrome-trace", action="store_true", default=None,
+                        help="Also write a Chrome trace-event file (open in chrome://tracing or Perfetto)")
+    args = parser.parse_args()
     
     # Execute full pipeline
-    result = await run_full_analysis_pipeline(store_code)
+    result = await run_full_analysis_pipeline(args.store_code, force=args.force, use_cache=not args.no_cache,
+                                              chrome_trace=args.chrome_trace)
     
     return result
 
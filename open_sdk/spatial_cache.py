@@ -0,0 +1,178 @@
+"""
+공간 레이어 캐시 모듈
+- SHP(cp949) → Arrow IPC 캐시 (속성 + 정규화된 이름 + WGS84/미터 좌표계 WKB)
+- 원본 .shp/.dbf 등의 mtime/크기가 바뀌면 자동 재생성
+- 캐시는 memory-map으로 읽으므로 프로세스마다 SHP를 다시 파싱하지 않음
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, NamedTuple, Optional
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # pyarrow가 없으면 캐시 없이 SHP를 직접 읽음
+    PYARROW_AVAILABLE = False
+
+# 프로젝트 루트
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_DIR = PROJECT_ROOT / "spatial_data" / ".cache"
+
+CACHE_VERSION = 1
+SOURCE_SUFFIXES = ['.shp', '.dbf', '.shx', '.prj', '.cpg']
+NAME_COLUMN = "name"
+WGS84_WKB_COLUMN = "geometry_wgs84"
+METRIC_WKB_COLUMN = "geometry_metric"
+
+
+class SpatialLayer(NamedTuple):
+    """공간 레이어 (원본 WGS84 + 미터 좌표계 + 행별 이름)"""
+    gdf: gpd.GeoDataFrame          # 원본 속성 + WGS84 geometry (지도 시각화용)
+    metric: gpd.GeoDataFrame       # name + 미터 좌표계 geometry (행 순서 동일)
+    names: List[Optional[str]]
+
+
+def resolve_names(gdf: gpd.GeoDataFrame, name_columns: List[str], strip: bool = False) -> List[Optional[str]]:
+    """행별 이름 (후보 컬럼 중 처음으로 값이 있는 컬럼, 없으면 None)"""
+    names = []
+    for _, row in gdf.drop(columns='geometry').iterrows():
+        name = None
+        for col in name_columns:
+            if col in row and row[col] and (not strip or str(row[col]).strip()):
+                name = str(row[col]).strip() if strip else str(row[col])
+                break
+        names.append(name)
+    return names
+
+
+def _cache_paths(shp_path: Path, cache_dir: Path):
+    return cache_dir / f"{shp_path.stem}.arrow", cache_dir / f"{shp_path.stem}.meta.json"
+
+
+def source_stat(shp_path: Path) -> Dict[str, Dict[str, int]]:
+    """SHP 구성 파일별 mtime/크기"""
+    stat = {}
+    for suffix in SOURCE_SUFFIXES:
+        path = shp_path.with_suffix(suffix)
+        if path.exists():
+            st = path.stat()
+            stat[suffix] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return stat
+
+
+def _cache_settings(name_columns: List[str], strip: bool, metric_crs: str, encoding: str) -> Dict[str, Any]:
+    return {"version": CACHE_VERSION, "name_columns": list(name_columns), "strip": strip,
+            "metric_crs": metric_crs, "encoding": encoding}
+
+
+def _read_meta(meta_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(shp_path: Path, settings: Dict[str, Any], cache_dir: Path = CACHE_DIR) -> bool:
+    """캐시가 원본 SHP·설정과 일치하는지 확인"""
+    table_path, meta_path = _cache_paths(shp_path, cache_dir)
+    if not table_path.exists():
+        return False
+    meta = _read_meta(meta_path)
+    if meta is None:
+        return False
+    return meta.get("settings") == settings and meta.get("source") == source_stat(shp_path)
+
+
+def _read_shp(shp_path: Path, name_columns: List[str], strip: bool, metric_crs: str, encoding: str) -> SpatialLayer:
+    gdf = gpd.read_file(shp_path, encoding=encoding)
+    names = resolve_names(gdf, name_columns, strip=strip)
+    metric = gpd.GeoDataFrame({NAME_COLUMN: names}, geometry=gdf.geometry.values, crs=gdf.crs).to_crs(metric_crs)
+    return SpatialLayer(gdf, metric, names)
+
+
+def build_layer_cache(shp_path: Path, name_columns: List[str], strip: bool = False,
+                      metric_crs: str = "EPSG:5179", encoding: str = 'cp949',
+                      cache_dir: Path = CACHE_DIR) -> SpatialLayer:
+    """SHP → Arrow IPC 캐시 생성"""
+    shp_path = Path(shp_path)
+    settings = _cache_settings(name_columns, strip, metric_crs, encoding)
+    layer = _read_shp(shp_path, name_columns, strip, metric_crs, encoding)
+    if not PYARROW_AVAILABLE:
+        return layer
+
+    attributes = pd.DataFrame(layer.gdf.drop(columns='geometry'))
+    table = pa.Table.from_pandas(attributes, preserve_index=False)
+    table = table.append_column(NAME_COLUMN, pa.array(layer.names, type=pa.string()))
+    table = table.append_column(WGS84_WKB_COLUMN, pa.array(shapely.to_wkb(layer.gdf.geometry.values), type=pa.binary()))
+    table = table.append_column(METRIC_WKB_COLUMN, pa.array(shapely.to_wkb(layer.metric.geometry.values), type=pa.binary()))
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    table_path, meta_path = _cache_paths(shp_path, cache_dir)
+    tmp_path = table_path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, table_path)
+
+    meta = {
+        "settings": settings,
+        "source": source_stat(shp_path),
+        "crs": layer.gdf.crs.to_string() if layer.gdf.crs else None,
+        "rows": len(layer.gdf),
+    }
+    tmp_meta = meta_path.with_suffix(".tmp")
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_meta, meta_path)
+
+    print(f"[SHP 캐시] 생성 완료: {table_path.name} ({len(layer.gdf)}개 행)")
+    return layer
+
+
+def _read_cache(shp_path: Path, metric_crs: str, cache_dir: Path) -> SpatialLayer:
+    table_path, meta_path = _cache_paths(shp_path, cache_dir)
+    meta = _read_meta(meta_path)
+    with pa.memory_map(str(table_path), 'r') as source:
+        table = pa_ipc.open_file(source).read_all()
+        wgs84 = shapely.from_wkb(table.column(WGS84_WKB_COLUMN).to_numpy(zero_copy_only=False))
+        metric_geoms = shapely.from_wkb(table.column(METRIC_WKB_COLUMN).to_numpy(zero_copy_only=False))
+        names = table.column(NAME_COLUMN).to_pylist()
+        attributes = table.drop_columns([NAME_COLUMN, WGS84_WKB_COLUMN, METRIC_WKB_COLUMN]).to_pandas()
+        del table
+
+    gdf = gpd.GeoDataFrame(attributes, geometry=wgs84, crs=meta.get("crs"))
+    metric = gpd.GeoDataFrame({NAME_COLUMN: names}, geometry=metric_geoms, crs=metric_crs)
+    return SpatialLayer(gdf, metric, names)
+
+
+def load_layer(shp_path: Path, name_columns: List[str], strip: bool = False,
+               metric_crs: str = "EPSG:5179", encoding: str = 'cp949',
+               cache_dir: Path = CACHE_DIR) -> SpatialLayer:
+    """공간 레이어 로드 (캐시가 최신이면 캐시, 아니면 SHP 파싱 후 캐시 재생성)"""
+    shp_path = Path(shp_path)
+    settings = _cache_settings(name_columns, strip, metric_crs, encoding)
+    if PYARROW_AVAILABLE and is_fresh(shp_path, settings, cache_dir):
+        try:
+            return _read_cache(shp_path, metric_crs, cache_dir)
+        except Exception as e:
+            print(f"[WARN] SHP 캐시 읽기 실패, 원본 재파싱: {e}")
+    return build_layer_cache(shp_path, name_columns, strip, metric_crs, encoding, cache_dir)
+
+
+if __name__ == "__main__":
+    # 캐시 생성 단계 (배포/배치 실행 전 한 번)
+    import spatial_matcher
+
+    for shp_path, name_columns, strip in [
+        (spatial_matcher.DONG_SHP, spatial_matcher.DONG_NAME_COLUMNS, False),
+        (spatial_matcher.MARKET_SHP, spatial_matcher.MARKET_NAME_COLUMNS, True),
+    ]:
+        build_layer_cache(shp_path, name_columns, strip, spatial_matcher.METRIC_CRS)
@@ -4,17 +4,33 @@
 - SHP 파일: 좌표 → 행정동/상권 매칭
 """
 import os
-import requests
+import sys
+import numpy as np
+import pandas as pd
 import geopandas as gpd
 import folium
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from pathlib import Path
 from shapely.geometry import Point
-from typing import Optional, Tuple, Dict, Any
+from shapely import STRtree
+import shapely
+from pyproj import Transformer
+from typing import Optional, Tuple, Dict, Any, List
 from dotenv import load_dotenv
 import platform
 
+try:
+    from .spatial_cache import load_layer, source_stat
+except ImportError:
+    from spatial_cache import load_layer, source_stat
+
+# 공용 지오코딩 (agents_new/utils/geocoding.py - panorama와 캐시 공유)
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents_new" / "utils"))
+from geocoding import geocode, google_provider
+from instrumentation import traced
+from offline_geocoder import offline_provider
+
 # 한글 폰트 설정
 system = platform.system()
 if system == "Windows":
@@ -46,19 +62,46 @@ print(f"[ENV] GOOGLE API KEY 설정: {GOOGLE_API_KEY[:20]}...")
 DONG_SHP = PROJECT_ROOT / "spatial_data" / "성동구_행정동_4.shp"
 MARKET_SHP = PROJECT_ROOT / "spatial_data" / "성동구상권_4.shp"
 
+# 미터 단위 거리 계산용 좌표계 (파노라마 버퍼 검색과 동일)
+METRIC_CRS = "EPSG:5179"
+
+# 이름 컬럼 후보 (앞에 있을수록 우선)
+DONG_NAME_COLUMNS = ['ADM_NM', 'EMD_NM', '동명', 'DONG_NM', 'adm_nm', 'emd_nm']
+MARKET_NAME_COLUMNS = ['TRDAR_SE_C', 'TRDAR_SE_1', '상권명', 'TRDAR_NM', '상권_명', 'name', 'trdar_nm']
+
 # 캐시 (SHP 파일은 한 번만 로드)
 _dong_gdf = None
 _market_gdf = None
 
+# 미터 좌표계로 변환한 레이어(이름 컬럼 포함) + 공간 인덱스 (load_shp_files에서 함께 생성)
+# 원본 레이어(_dong_gdf/_market_gdf)는 WGS84 그대로 지도 시각화에 사용
+_dong_layer = None
+_market_layer = None
+_dong_tree = None
+_market_tree = None
+_dong_names = []
+_market_names = []
+
+# WGS84(경도, 위도) → 미터 좌표계
+_to_metric = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+
+
+def _metric_point(lat: float, lon: float) -> Point:
+    """WGS84 좌표 → 미터 좌표계 포인트"""
+    x, y = _to_metric.transform(lon, lat)
+    return Point(x, y)
+
 
 def load_shp_files():
-    """SHP 파일 로드 (캐싱)"""
-    global _dong_gdf, _market_gdf
+    """SHP 레이어 로드 (Arrow 캐시 우선) + STRtree 공간 인덱스 생성 (캐싱)"""
+    global _dong_gdf, _market_gdf, _dong_layer, _market_layer, _dong_tree, _market_tree, _dong_names, _market_names
     
     if _dong_gdf is None and DONG_SHP.exists():
         print(f"[SHP] 행정동 경계 로드: {DONG_SHP.name}")
         try:
-            _dong_gdf = gpd.read_file(DONG_SHP, encoding='cp949')
+            layer = load_layer(DONG_SHP, DONG_NAME_COLUMNS, metric_crs=METRIC_CRS)
+            _dong_gdf, _dong_layer, _dong_names = layer.gdf, layer.metric, layer.names
+            _dong_tree = STRtree(_dong_layer.geometry.values)
             print(f"   총 {len(_dong_gdf)}개 행정동")
             print(f"   컬럼: {list(_dong_gdf.columns)}")
         except Exception as e:
@@ -67,16 +110,31 @@ def load_shp_files():
     if _market_gdf is None and MARKET_SHP.exists():
         print(f"[SHP] 상권 영역 로드: {MARKET_SHP.name}")
         try:
-            _market_gdf = gpd.read_file(MARKET_SHP, encoding='cp949')
+            layer = load_layer(MARKET_SHP, MARKET_NAME_COLUMNS, strip=True, metric_crs=METRIC_CRS)
+            _market_gdf, _market_layer, _market_names = layer.gdf, layer.metric, layer.names
+            _market_tree = STRtree(_market_layer.geometry.values)
             print(f"   총 {len(_market_gdf)}개 상권")
             print(f"   컬럼: {list(_market_gdf.columns)}")
         except Exception as e:
             print(f"[ERROR] 상권 SHP 로드 실패: {e}")
 
 
+def layer_fingerprint() -> Dict[str, Any]:
+    """행정동/상권 SHP 구성 파일별 mtime/크기 (레이어를 갱신하면 값이 바뀜 - 단계 캐시 키용)"""
+    return {shp_path.name: source_stat(shp_path) for shp_path in (DONG_SHP, MARKET_SHP)}
+
+
+def _first_named(indices, names) -> Optional[int]:
+    """인덱스 후보 중 원본 행 순서상 처음으로 이름이 있는 행"""
+    for idx in sorted(int(i) for i in indices):
+        if names[idx]:
+            return idx
+    return None
+
+
 def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
-    주소 → 좌표 변환 (구글 지오코딩 API)
+    주소 → 좌표 변환 (오프라인 색인 → 구글 지오코딩 API, 공용 지오코딩 캐시 경유)
     
     Args:
         address: 도로명 주소 또는 지번 주소
@@ -84,41 +142,14 @@ def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     Returns:
         (위도, 경도) 튜플 또는 None
     """
-    # 구글 지오코딩 API 사용
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": address,
-        "key": GOOGLE_API_KEY
-    }
-    
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get('status') == 'OK' and data.get('results'):
-                result = data['results'][0]
-                location = result['geometry']['location']
-                
-                lat = location['lat']  # 위도
-                lng = location['lng']  # 경도
-                
-                print(f"[구글 지오코딩] 주소 → 좌표 변환 성공")
-                print(f"   주소: {address}")
-                print(f"   좌표: 위도 {lat:.6f}, 경도 {lng:.6f}")
-                
-                return (lat, lng)  # (lat, lon)
-            else:
-                print(f"[ERROR] 구글 API 응답 오류: {data.get('status')}")
-                return None
-        else:
-            print(f"[ERROR] 구글 API 요청 실패: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"[ERROR] 구글 지오코딩 오류: {e}")
-        return None
+    coords = geocode(address, [("offline", offline_provider()),
+                               ("google", google_provider(GOOGLE_API_KEY))])
+    if coords:
+        lat, lng = coords
+        print(f"[구글 지오코딩] 주소 → 좌표 변환 성공")
+        print(f"   주소: {address}")
+        print(f"   좌표: 위도 {lat:.6f}, 경도 {lng:.6f}")
+    return coords
 
 
 def match_coordinates_to_dong(lat: float, lon: float) -> Optional[str]:
@@ -140,24 +171,17 @@ def match_coordinates_to_dong(lat: float, lon: float) -> Optional[str]:
             print(f"[ERROR] 행정동 SHP 데이터 없음")
             return None
         
-        # 포인트 생성 (경도, 위도 순서 - Shapely 규칙)
-        point = Point(lon, lat)
-        
-        # 어느 폴리곤에 속하는지 확인
-        for idx, row in _dong_gdf.iterrows():
-            if row['geometry'].contains(point):
-                # 가능한 컬럼명들 시도
-                dong_name = None
-                for col in ['ADM_NM', 'EMD_NM', '동명', 'DONG_NM', 'adm_nm', 'emd_nm']:
-                    if col in row and row[col]:
-                        dong_name = str(row[col])
-                        break
-                
-                if dong_name:
-                    print(f"[행정동 매칭 성공!]")
-                    print(f"   좌표: ({lat:.6f}, {lon:.6f})")
-                    print(f"   행정동: {dong_name}")
-                    return dong_name
+        # 포인트 생성 (미터 좌표계)
+        point = _metric_point(lat, lon)
+        
+        # 어느 폴리곤에 속하는지 확인 (공간 인덱스 조회)
+        idx = _first_named(_dong_tree.query(point, predicate='within'), _dong_names)
+        if idx is not None:
+            dong_name = _dong_names[idx]
+            print(f"[행정동 매칭 성공!]")
+            print(f"   좌표: ({lat:.6f}, {lon:.6f})")
+            print(f"   행정동: {dong_name}")
+            return dong_name
         
         print(f"[WARN] 좌표가 성동구 경계 밖임")
         return None
@@ -188,40 +212,24 @@ def match_coordinates_to_marketplace(lat: float, lon: float) -> Optional[Dict[st
             print(f"[WARN] 상권 SHP 데이터 없음")
             return None
         
-        # 포인트 생성
-        point = Point(lon, lat)
-        
-        # 1. 먼저 포인트가 상권 내부에 있는지 확인
-        for idx, row in _market_gdf.iterrows():
-            if row['geometry'].contains(point):
-                # 상권명 찾기 (여러 컬럼 시도)
-                market_name = None
-                for col in ['TRDAR_SE_C', 'TRDAR_SE_1', '상권명', 'TRDAR_NM', '상권_명', 'name', 'trdar_nm']:
-                    if col in row and row[col] and str(row[col]).strip():
-                        market_name = str(row[col]).strip()
-                        break
-                
-                if market_name:
-                    print(f"[상권 매칭 성공!]")
-                    print(f"   포인트가 상권 내부: {market_name}")
-                    return {"상권명": market_name, "거리_m": 0}
-        
-        # 2. 내부에 없으면 가장 가까운 상권 찾기
-        min_dist = float('inf')
-        nearest_market_name = None
-        
-        for idx, row in _market_gdf.iterrows():
-            dist = row['geometry'].distance(point)
-            if dist < min_dist:
-                min_dist = dist
-                for col in ['TRDAR_SE_C', 'TRDAR_SE_1', '상권명', 'TRDAR_NM', '상권_명', 'name', 'trdar_nm']:
-                    if col in row and row[col] and str(row[col]).strip():
-                        nearest_market_name = str(row[col]).strip()
-                        break
+        # 포인트 생성 (미터 좌표계)
+        point = _metric_point(lat, lon)
+        
+        # 1. 먼저 포인트가 상권 내부에 있는지 확인 (공간 인덱스 조회)
+        idx = _first_named(_market_tree.query(point, predicate='within'), _market_names)
+        if idx is not None:
+            market_name = _market_names[idx]
+            print(f"[상권 매칭 성공!]")
+            print(f"   포인트가 상권 내부: {market_name}")
+            return {"상권명": market_name, "거리_m": 0}
+        
+        # 2. 내부에 없으면 가장 가까운 상권 찾기 (거리가 같으면 원본 행 순서 우선)
+        nearest, distances = _market_tree.query_nearest(point, return_distance=True, all_matches=True)
+        idx = _first_named(nearest, _market_names)
+        nearest_market_name = _market_names[idx] if idx is not None else None
+        dist_meters = float(distances.min()) if len(distances) else float('inf')
         
         if nearest_market_name:
-            # 거리를 미터로 변환 (대략 1도 = 111km)
-            dist_meters = min_dist * 111000
             print(f"[상권 매칭 성공!]")
             print(f"   가장 가까운 상권: {nearest_market_name}")
             print(f"   거리: {dist_meters:.0f}m")
@@ -240,6 +248,85 @@ def match_coordinates_to_marketplace(lat: float, lon: float) -> Optional[Dict[st
         return None
 
 
+def find_marketplaces_within(lat: float, lon: float, radius_m: float) -> List[Dict[str, Any]]:
+    """
+    좌표 반경 내 모든 상권 (가까운 순)
+    
+    Args:
+        lat: 위도 (WGS84)
+        lon: 경도 (WGS84)
+        radius_m: 반경 (미터)
+        
+    Returns:
+        [{"상권명": str, "거리_m": float}, ...] (상권 내부면 거리 0)
+    """
+    load_shp_files()
+    
+    if _market_gdf is None:
+        print(f"[WARN] 상권 SHP 데이터 없음")
+        return []
+    
+    point = _metric_point(lat, lon)
+    indices = np.sort(_market_tree.query(point, predicate='dwithin', distance=radius_m))
+    distances = shapely.distance(_market_layer.geometry.values[indices], point)
+    
+    markets = [
+        {"상권명": _market_names[idx], "거리_m": float(dist)}
+        for idx, dist in zip(indices.tolist(), distances.tolist())
+        if _market_names[idx]
+    ]
+    return sorted(markets, key=lambda m: m["거리_m"])
+
+
+def _first_match_names(joined: pd.DataFrame) -> pd.Series:
+    """sjoin 결과에서 포인트별로 원본 행 순서상 첫 번째 매칭만 남김"""
+    return joined.sort_values("index_right", kind="mergesort").groupby(level=0).first()
+
+
+def match_points(lats, lons) -> pd.DataFrame:
+    """
+    여러 좌표 → 행정동/상권 일괄 매칭 (sjoin / sjoin_nearest)
+    
+    Args:
+        lats: 위도 배열 (WGS84)
+        lons: 경도 배열 (WGS84)
+        
+    Returns:
+        입력 순서의 DataFrame - 컬럼: lat, lon, 행정동, 상권명, 거리_m
+        (상권 내부면 거리 0, 외부면 가장 가까운 상권까지의 거리(m), 좌표가 없으면 None/NaN)
+    """
+    load_shp_files()
+    
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    result = pd.DataFrame({"lat": lats, "lon": lons, "행정동": None, "상권명": None, "거리_m": np.nan})
+    
+    valid = np.isfinite(lats) & np.isfinite(lons)
+    x, y = _to_metric.transform(lons[valid], lats[valid])
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(x, y), index=np.flatnonzero(valid), crs=METRIC_CRS)
+    if points.empty:
+        return result
+    
+    # 1. 행정동 (포인트가 속한 폴리곤)
+    if _dong_gdf is not None:
+        dong_layer = _dong_layer[_dong_layer["name"].notna()]
+        joined = gpd.sjoin(points, dong_layer, how="inner", predicate="within")
+        dong = _first_match_names(joined[["index_right", "name"]])
+        result.loc[dong.index, "행정동"] = dong["name"]
+    
+    # 2. 상권 (내부면 거리 0, 아니면 가장 가까운 상권)
+    if _market_gdf is not None:
+        market_layer = _market_layer[_market_layer["name"].notna()]
+        joined = gpd.sjoin_nearest(points, market_layer, how="inner", distance_col="거리_m")
+        market = _first_match_names(joined[["index_right", "name", "거리_m"]])
+        result.loc[market.index, "상권명"] = market["name"]
+        result.loc[market.index, "거리_m"] = market["거리_m"]
+    
+    print(f"[일괄 매칭] {len(result)}개 좌표 - 행정동 {result['행정동'].notna().sum()}개, 상권 {result['상권명'].notna().sum()}개")
+    return result
+
+
+@traced("spatial.map", "render")
 def create_visualization_map(address: str, coords: Tuple[float, float], dong: str, marketplace: Dict[str, Any]) -> str:
     """
     공간 매칭 결과를 지도로 시각화
@@ -367,6 +454,7 @@ def create_visualization_map(address: str, coords: Tuple[float, float], dong: st
         return None
 
 
+@traced("spatial.chart", "render")
 def create_analysis_chart(address: str, dong: str, marketplace: Dict[str, Any]) -> str:
     """
     분석 결과를 차트로 시각화
@@ -407,7 +495,7 @@ def create_analysis_chart(address: str, dong: str, marketplace: Dict[str, Any])
         ax2.set_ylim(0, 1)
         ax2.axis('off')
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         # 이미지 저장
         output_dir = Path(__file__).parent / "output" / "spatial_visualization"
@@ -417,8 +505,9 @@ def create_analysis_chart(address: str, dong: str, marketplace: Dict[str, Any])
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         img_file = output_dir / f"spatial_analysis_{timestamp}.png"
         
-        plt.savefig(img_file, dpi=300, bbox_inches='tight')
-        plt.close()
+        # pyplot 현재 figure 대신 fig 직접 사용 (파이프라인 스레드에서 다른 차트와 동시에 그려도 안전)
+        fig.savefig(img_file, dpi=300, bbox_inches='tight')
+        plt.close(fig)
         
         print(f"[시각화] 차트 저장: {img_file}")
         return str(img_file)
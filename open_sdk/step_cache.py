@@ -0,0 +1,117 @@
+"""
+파이프라인 단계 결과 캐시
+- 키: (단계 이름, 단계 지문) → 값: 단계 출력 (pickle)
+- 출력에 들어 있는 결과 파일/폴더 경로가 사라졌으면 캐시 미스로 처리 (다시 실행)
+- 마지막 사용 기준으로 오래된 항목은 자동 삭제
+"""
+import os
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".cache" / "pipeline_steps.sqlite"
+DEFAULT_MAX_AGE_DAYS = 30
+
+# 단계 출력에서 결과 파일/폴더 경로를 담는 키
+PATH_KEYS = {"output_file", "output_file_path", "output_dir", "output_folder",
+             "copied_output_folder", "map_file", "chart_file"}
+
+
+def _referenced_paths(value: Any) -> Iterator[str]:
+    """출력 안의 결과 경로 (PATH_KEYS 키의 문자열 값)"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in PATH_KEYS and isinstance(item, str) and item:
+                yield item
+            else:
+                yield from _referenced_paths(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _referenced_paths(item)
+
+
+class StepCache:
+    """SQLite 기반 단계 출력 캐시 (스레드 안전 - 호출마다 연결)"""
+
+    def __init__(self, path: Optional[Path] = None, max_age_sec: Optional[float] = None):
+        self.path = Path(path or os.getenv('PIPELINE_CACHE_PATH') or DEFAULT_CACHE_PATH)
+        self.max_age_sec = max_age_sec if max_age_sec is not None else DEFAULT_MAX_AGE_DAYS * 24 * 3600
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                " step TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " outputs BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (step, fingerprint))"
+            )
+            conn.execute("DELETE FROM steps WHERE last_used < ?", (time.time() - self.max_age_sec,))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, step: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """저장된 출력 (없거나, 결과 파일이 지워졌거나, 읽을 수 없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT outputs FROM steps WHERE step = ? AND fingerprint = ?",
+                               (step, fingerprint)).fetchone()
+            if row is None:
+                return None
+            try:
+                outputs = pickle.loads(row[0])
+            except Exception as e:
+                print(f"[WARN] Step cache entry unreadable ({step}): {e}")
+                conn.execute("DELETE FROM steps WHERE step = ? AND fingerprint = ?", (step, fingerprint))
+                return None
+            if not all(Path(p).exists() for p in _referenced_paths(outputs)):
+                conn.execute("DELETE FROM steps WHERE step = ? AND fingerprint = ?", (step, fingerprint))
+                return None
+            conn.execute("UPDATE steps SET last_used = ? WHERE step = ? AND fingerprint = ?",
+                         (time.time(), step, fingerprint))
+        return outputs
+
+    def put(self, step: str, fingerprint: str, outputs: Dict[str, Any]) -> bool:
+        """
+        단계 출력 저장 → 저장 여부
+
+        실패 결과({"status": "failed"})와 직렬화할 수 없는 출력은 저장하지 않음
+        """
+        if any(isinstance(v, dict) and v.get("status") == "failed" for v in outputs.values()):
+            return False
+        try:
+            payload = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"[WARN] Step '{step}' output not cacheable: {e}")
+            return False
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO steps (step, fingerprint, outputs, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (step, fingerprint, payload, now, now),
+            )
+        return True
+
+    def invalidate(self, step: Optional[str] = None) -> int:
+        """단계(또는 전체) 캐시 삭제 → 삭제 건수"""
+        with self._connect() as conn:
+            if step is None:
+                return conn.execute("DELETE FROM steps").rowcount
+            return conn.execute("DELETE FROM steps WHERE step = ?", (step,)).rowcount
+
+
+_cache: Optional[StepCache] = None
+
+
+def get_step_cache() -> StepCache:
+    """프로세스 공용 캐시"""
+    global _cache
+    if _cache is None:
+        _cache = StepCache()
+    return _cache
@@ -73,14 +73,9 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
-# Gemini 클라이언트 import
+# Gemini 클라이언트 import (파이프라인과 같은 모듈 → 설정/연결 풀 공유)
 try:
-    import importlib.util
-    gemini_path = Path(__file__).parent.parent.parent / "agents_new" / "utils" / "gemini_client.py"
-    spec = importlib.util.spec_from_file_location("gemini_client", gemini_path)
-    gemini_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(gemini_module)
-    GeminiClient = gemini_module.GeminiClient
+    from agents_new.utils.gemini_client import GeminiClient
     GEMINI_AVAILABLE = True
 except Exception as e:
     GEMINI_AVAILABLE = False